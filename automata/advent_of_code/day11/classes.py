@@ -1,9 +1,12 @@
 import matplotlib
 import numpy
 import pygame
+import pygame.surfarray
 from pygame.surface import Surface
 
+from automata.advent_of_code.day11 import engine
 from automata.advent_of_code.game import AdventOfCodeGame
+from robingame.image import scale_image
 from robingame.input import EventQueue
 from robingame.objects import Entity
 
@@ -19,41 +22,40 @@ raw = """7777838353
 4576678341"""
 
 
-def init():
-    return [list(map(int, row)) for row in raw.splitlines()]
-
-
-class Octopus:
-    def __init__(self, energy):
-        self.energy = energy
-
-    def __repr__(self):
-        return f"{self.energy}"
-
-    def __str__(self):
-        return self.__repr__()
+def init() -> numpy.ndarray:
+    return numpy.array([list(map(int, row)) for row in raw.splitlines()])
 
 
 class OctopusBoard(Entity):
+    """
+    Animates a board of random octopuses, one step per update, using the array engine (see
+    engine.py). The energy levels are colormapped and blitted in one go, so `size` can be much
+    bigger than the puzzle's 10x10.
+    """
+
     game: AdventOfCodeGame
-    scaling = 13
+    scaling = 13  # the most pixels per octopus; big boards get fewer so that they fit
     colormap = matplotlib.cm.twilight
     energy_levels = 13
     size = 75
+    energy: numpy.ndarray  # (size, size) energy of each octopus, indexed [y, x]
+    flashes: list[int]  # number of flashes in each step so far
 
-    def __init__(self, game):
+    def __init__(self, game, size: int = None):
         self.game = game
-        self.contents = [
-            list(map(Octopus, row))
-            for row in numpy.array(
-                numpy.random.random((self.size, self.size)) * self.energy_levels, dtype=int
-            )
-        ]
+        self.size = size or self.size
+        self.scaling = max(
+            1, min(self.scaling, min(game.window_width, game.window_height) // self.size)
+        )
+        self.energy = numpy.array(
+            numpy.random.random((self.size, self.size)) * self.energy_levels, dtype=int
+        )
+        self.flashes = []
         self.calculate_colours()
         super().__init__()
 
     def __repr__(self):
-        return "\n".join("".join(map(str, row)) for row in self.contents)
+        return "\n".join("".join(map(str, row)) for row in self.energy.tolist())
 
     def update(self):
         from automata.advent_of_code.menus import MainMenu
@@ -62,74 +64,22 @@ class OctopusBoard(Entity):
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 self.game.add_scene(MainMenu())
                 self.kill()
+        return self.step()
 
-        flashes = set()
-        for oct in self.octopi:
-            oct.energy += 1
-
-        ready_to_flash = [
-            (x, y, oct)
-            for y, row in enumerate(self.contents)
-            for x, oct in enumerate(row)
-            if oct.energy > (self.energy_levels - 1) and oct not in flashes
-        ]
-        while ready_to_flash:
-            ready_to_flash = [
-                (x, y, oct)
-                for y, row in enumerate(self.contents)
-                for x, oct in enumerate(row)
-                if oct.energy > (self.energy_levels - 1) and oct not in flashes
-            ]
-            for x, y, oct in ready_to_flash:
-                flashes.add(oct)
-                for neighbour in self.get_neighbours(x, y):
-                    neighbour.energy += 1
-
-        for oct in flashes:
-            oct.energy = 0
-        return flashes
-
-    def get_neighbours(self, x, y):
-        directions = [
-            (x - 1, y - 1),
-            (x - 1, y),
-            (x - 1, y + 1),
-            (x, y - 1),
-            (x, y + 1),
-            (x + 1, y - 1),
-            (x + 1, y),
-            (x + 1, y + 1),
-        ]
-        octos = []
-        for x, y in directions:
-            if x < 0 or y < 0:
-                continue
-            try:
-                octos.append(self.contents[y][x])
-            except IndexError:
-                pass
-        return octos
-
-    @property
-    def octopi(self):
-        return [o for row in self.contents for o in row]
+    def step(self) -> numpy.ndarray:
+        """Advance the octopuses by one step. Returns a mask of the ones that flashed."""
+        self.energy, flashed = engine.step(self.energy, max_energy=self.energy_levels - 1)
+        self.flashes.append(int(flashed.sum()))
+        return flashed
 
     def calculate_colours(self):
-        """Sample a colormap based on the longest ruleset of child ants"""
+        """Sample a colormap with one colour per energy level"""
         samples = numpy.linspace(0, 1, self.energy_levels)
-        colours = {
-            ii: tuple(map(int, color[:3])) for ii, color in enumerate(self.colormap(samples) * 256)
-        }
-        # colours[0] = Color("white")
-        self.colours = colours
+        self.colours = (self.colormap(samples)[:, :3] * 255).astype(numpy.uint8)
 
     def draw(self, surface: Surface, debug: bool = False):
-        # draw base board
-        for y, row in enumerate(self.contents):
-            for x, cell in enumerate(row):
-                pixel = Surface((self.scaling, self.scaling))
-                colour = self.colours[cell.energy]
-                pixel.fill(colour[:3])
-                screen_x, screen_y = x * self.scaling, y * self.scaling
-                surface.blit(pixel, (screen_x, screen_y))
+        # surfarray indexes [x, y], so transpose
+        pixels = self.colours[self.energy.T]
+        image = scale_image(pygame.surfarray.make_surface(pixels), self.scaling)
+        surface.blit(image, (0, 0))
         super().draw(surface, debug)
@@ -0,0 +1,72 @@
+"""
+Array engine for the day 11 octopuses (https://adventofcode.com/2021/day/11).
+
+The board is a 2D numpy array of energy levels. Each step every octopus gains 1 energy; any
+octopus with more than `max_energy` flashes, giving 1 energy to each of its 8 neighbours, which
+may make them flash in turn. Each octopus flashes at most once per step, and the ones that
+flashed end the step at 0.
+
+A flash cascade is handled a wave at a time. The energy each octopus receives from a wave is the
+number of its neighbours that are flashing, i.e. a 3x3 neighbour sum. Late in a cascade only a
+few octopuses flash per wave, so rather than convolving the whole board, the board is padded and
+flattened, and 1 is added at each of the 8 neighbour offsets of the flashing octopuses. Waves
+repeat until no new octopus is ready, so a step costs a few array operations per wave, in
+proportion to the number of flashes, instead of a python loop per octopus.
+"""
+
+import numpy
+
+MAX_ENERGY = 9  # the puzzle's threshold; more than this flashes
+BORDER = numpy.iinfo(numpy.int64).min // 2
+
+
+def step(
+    energy: numpy.ndarray, max_energy: int = MAX_ENERGY
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Advance one step. Returns the new energy levels and a mask of the octopuses that flashed"""
+    height, width = energy.shape
+    # the border is so low that it never flashes, however many flashes are next to it
+    padded = numpy.full((height + 2, width + 2), BORDER, dtype=numpy.int64)
+    padded[1:-1, 1:-1] = energy + 1
+    board = padded.ravel()  # a view, so that the results can be read from `padded`
+    offsets = _offsets(width + 2)
+
+    flashed = numpy.zeros(board.shape, dtype=bool)
+    ready = numpy.flatnonzero(board > max_energy)
+    while len(ready):
+        flashed[ready] = True
+        neighbours = (ready[:, None] + offsets).ravel()
+        numpy.add.at(board, neighbours, 1)
+        neighbours = neighbours[(board[neighbours] > max_energy) & ~flashed[neighbours]]
+        ready = numpy.unique(neighbours)
+    board[flashed] = 0
+    return padded[1:-1, 1:-1].copy(), flashed.reshape(padded.shape)[1:-1, 1:-1].copy()
+
+
+def simulate(
+    energy: numpy.ndarray, steps: int, max_energy: int = MAX_ENERGY
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Advance `steps` steps. Returns the final energy levels and the number of flashes in each"""
+    flashes = numpy.zeros(steps, dtype=numpy.int64)
+    for index in range(steps):
+        energy, flashed = step(energy, max_energy)
+        flashes[index] = flashed.sum()
+    return energy, flashes
+
+
+def first_synchronised_step(
+    energy: numpy.ndarray, max_energy: int = MAX_ENERGY, limit: int = 1_000_000
+) -> int | None:
+    """The first step in which every octopus flashes (counting from 1), or None within `limit`"""
+    for number in range(1, limit + 1):
+        energy, flashed = step(energy, max_energy)
+        if flashed.all():
+            return number
+    return None
+
+
+def _offsets(width: int) -> numpy.ndarray:
+    """Flat index offsets to the 8 neighbours in a flattened board `width` wide"""
+    return numpy.array(
+        [-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1], dtype=numpy.int64
+    )
@@ -1,10 +1,15 @@
+from typing import Iterator
+
 import matplotlib
 import numpy
 import pygame
+import pygame.surfarray
 from pygame import Color
 from pygame.surface import Surface
 
+from automata.advent_of_code.day9 import engine
 from automata.advent_of_code.game import AdventOfCodeGame
+from robingame.image import scale_image
 from robingame.input import EventQueue
 from robingame.objects import Entity
 
@@ -13,7 +18,9 @@ raw = """2199943210
 9856789892
 8767896789
 9899965678"""
-raw = yangs_raw = """2127897678998676894313987643134789876543434987678932345965421298989998743210145989653456789543212456
+raw = (
+    yangs_raw
+) = """2127897678998676894313987643134789876543434987678932345965421298989998743210145989653456789543212456
 1056789569876545679524598854545689765432123996567891959895310197678998654359239879542345699765401347
 2245893458989434788965699967876789897643439875469999797689923998587899765498998765431234569543212398
 9499912967898323567976989878987895999654545997348998654567899876456789876997439876510123478954394989
@@ -115,38 +122,54 @@ raw = yangs_raw = """21278976789986768943139876431347898765434349876789323459654
 9439851012567893235999532349765432123489989679899987899432124567892359764321245789312998789899896434"""
 
 
+def parse(text: str) -> numpy.ndarray:
+    return numpy.array([list(map(int, row)) for row in text.splitlines()])
+
+
 class Caverns(Entity):
+    """
+    Animates finding the basins, one ring of one basin per update. The basins are all labelled
+    up front by the array engine (see engine.py), and the animation replays them, so inputs much
+    bigger than the puzzle's take no longer to solve than to draw.
+    """
+
     game: AdventOfCodeGame
-    scaling = 10
+    scaling = 10  # the most pixels per cell; big inputs get fewer so that they fit
     colormap = matplotlib.cm.viridis
-
-    def __init__(self, game):
-        self.raw = raw
-        self.input = [list(map(int, row)) for row in raw.splitlines()]
+    heights: numpy.ndarray  # indexed [y, x]
+    labels: numpy.ndarray  # basin number of each cell, or engine.NO_BASIN
+    basin_sizes: numpy.ndarray
+    explored: numpy.ndarray  # mask of the cells in basins that have been finished
+    basin: numpy.ndarray  # mask of the cells of the basin that is being explored
+    steps: Iterator[tuple[int, numpy.ndarray]]  # see engine.replay
+
+    def __init__(self, game, heights: numpy.ndarray = None):
+        self.game = game
+        self.heights = parse(raw) if heights is None else heights
+        height, width = self.heights.shape
+        self.scaling = max(
+            1, min(self.scaling, game.window_width // width, game.window_height // height)
+        )
         self.calculate_colours()
-        self.low_points = self.find_low_points(self.input)
-        self.basin_sizes = []
-        self.explored = set()
-        self.reset_search()
+        self.labels, self.basin_sizes = engine.label_basins(self.heights)
+        self.steps = engine.replay(self.labels, engine.basin_distances(self.heights))
+        self.current_basin = None
+        self.explored = numpy.zeros(self.heights.shape, dtype=bool)
+        self.basin = numpy.zeros(self.heights.shape, dtype=bool)
         super().__init__()
 
-    def reset_search(self):
-        low_point = self.low_points.pop()
-        self.basin = {low_point}
-
-    def bfs_step(self):
-        basin_size = len(self.basin)
-        for x, y in self.basin:
-            current_height = self.input[y][x]
-            neighbours = self.get_neighbours(self.input, x, y)
-            higher_neighbours = filter(lambda key: 9 > neighbours[key] > current_height, neighbours)
-            self.basin = self.basin.union(higher_neighbours)
-        # if self.basin didn't grow, we're done
-        if len(self.basin) == basin_size:
-            if self.low_points:
-                self.reset_search()
-            else:
-                pass  # completed puzzle
+    def replay_step(self) -> bool:
+        """Show the next ring of cells. Returns False once every basin has been shown."""
+        step = next(self.steps, None)
+        if step is None:
+            return False  # completed puzzle
+        label, xy = step
+        if label != self.current_basin:
+            self.explored |= self.basin
+            self.basin[:] = False
+            self.current_basin = label
+        self.basin[xy[:, 1], xy[:, 0]] = True
+        return True
 
     def update(self):
         from automata.advent_of_code.menus import MainMenu
@@ -156,64 +179,20 @@ class Caverns(Entity):
                 self.game.add_scene(MainMenu())
                 self.kill()
 
-        self.bfs_step()
-        self.explored = self.explored.union(self.basin)
+        self.replay_step()
         super().update()
 
     def draw(self, surface: Surface, debug: bool = False):
-        # draw base board
-        for y, row in enumerate(self.input):
-            for x, cell in enumerate(row):
-                pixel = Surface((self.scaling, self.scaling))
-                colour = self.colours[cell]
-                pixel.fill(colour[:3])
-                screen_x, screen_y = x * self.scaling, y * self.scaling
-                surface.blit(pixel, (screen_x, screen_y))
-
-        # draw explored
-        for x, y in self.explored:
-            pixel = Surface((self.scaling, self.scaling))
-            colour = Color("orange")
-            pixel.fill(colour[:3])
-            screen_x, screen_y = x * self.scaling, y * self.scaling
-            surface.blit(pixel, (screen_x, screen_y))
-
-        # draw current basin
-        for x, y in self.basin:
-            pixel = Surface((self.scaling, self.scaling))
-            colour = Color("red")
-            pixel.fill(colour[:3])
-            screen_x, screen_y = x * self.scaling, y * self.scaling
-            surface.blit(pixel, (screen_x, screen_y))
-
+        pixels = self.colours[self.heights]
+        pixels[self.explored] = Color("orange")[:3]
+        pixels[self.basin] = Color("red")[:3]
+        # surfarray indexes [x, y], so transpose
+        image = pygame.surfarray.make_surface(pixels.transpose(1, 0, 2))
+        surface.blit(scale_image(image, self.scaling), (0, 0))
         super().draw(surface, debug)
 
     def calculate_colours(self):
-        """Sample a colormap based on the longest ruleset of child ants"""
-        samples = numpy.linspace(0, 1, 9)
-        colours = {
-            ii: tuple(map(int, color[:3])) for ii, color in enumerate(self.colormap(samples) * 256)
-        }
-        colours[9] = Color("black")
-        self.colours = colours
-
-    def find_low_points(self, input):
-        low_points = []
-        for y, row in enumerate(input):
-            for x, cell in enumerate(row):
-                neighbours = self.get_neighbours(input, x, y).values()
-                if cell < min(neighbours):
-                    low_points.append((x, y))
-        return low_points
-
-    def get_neighbours(self, input, x, y):
-        neighbours = {}
-        directions = [(x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)]
-        for x, y in directions:
-            if x < 0 or y < 0:
-                continue
-            try:
-                neighbours[(x, y)] = input[y][x]
-            except IndexError:
-                pass
-        return neighbours
+        """Sample a colormap for heights 0-8; the walls (9) are black"""
+        samples = numpy.linspace(0, 1, engine.WALL)
+        colours = (self.colormap(samples)[:, :3] * 255).astype(numpy.uint8)
+        self.colours = numpy.concatenate([colours, [Color("black")[:3]]]).astype(numpy.uint8)
@@ -0,0 +1,170 @@
+"""
+Array engine for the day 9 smoke basins (https://adventofcode.com/2021/day/9).
+
+The heightmap is a 2D numpy array. A basin is a group of connected cells of height less than 9,
+which are the basins' walls, and every basin drains to a low point (a cell lower than all its
+neighbours).
+
+- `low_points`: compared with shifted copies of the heightmap, all at once
+- `label_basins`: connected-component labelling in one scan of the heightmap (Hoshen-Kopelman):
+  each cell takes the label of the cell above or to its left, and when those labels differ
+  they are merged in a union-find forest. The loop is compiled with numba if it is installed.
+- `basin_distances`: how many steps each cell is from its basin's low point, by growing every
+  basin at once a ring at a time
+- `replay`: the rings of each basin in turn, for the Caverns animation
+"""
+
+from typing import Iterator
+
+import numpy
+
+try:
+    from numba import njit
+except ImportError:  # optional; without it the same kernel runs (more slowly) in python
+    njit = None
+
+WALL = 9  # height of the cells between basins
+NO_BASIN = -1  # label of walls, and distance of cells that can't be reached
+
+
+def low_points(heights: numpy.ndarray) -> numpy.ndarray:
+    """(n, 2) xy coords of the cells lower than all their (up to 4) neighbours"""
+    padded = numpy.pad(heights, 1, constant_values=numpy.iinfo(heights.dtype).max)
+    centre = padded[1:-1, 1:-1]
+    lowest = (
+        (centre < padded[:-2, 1:-1])
+        & (centre < padded[2:, 1:-1])
+        & (centre < padded[1:-1, :-2])
+        & (centre < padded[1:-1, 2:])
+    )
+    ys, xs = numpy.nonzero(lowest)
+    return numpy.stack([xs, ys], axis=1)
+
+
+def risk_level(heights: numpy.ndarray) -> int:
+    """Part 1: the sum of (1 + height) of the low points"""
+    xs, ys = low_points(heights).T
+    return int((heights[ys, xs] + 1).sum())
+
+
+def label_basins(heights: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Label each cell with the number of its basin, numbered in the order that their first cells
+    appear scanning row by row, or NO_BASIN for walls. Returns the labels (the same shape as
+    `heights`) and the size of each basin.
+    """
+    is_open = numpy.ascontiguousarray(heights < WALL)
+    provisional = numpy.full(heights.shape, NO_BASIN, dtype=numpy.int64)
+    parents = numpy.zeros(heights.size, dtype=numpy.int64)
+    count = label_kernel(is_open, provisional, parents)
+    # every parent has a smaller label than its children, so one pass finds every root
+    roots = resolve_roots(parents, count)
+    unique_roots, basin_of_root = numpy.unique(roots, return_inverse=True)
+    labels = numpy.full(heights.shape, NO_BASIN, dtype=numpy.int64)
+    labels[is_open] = basin_of_root[provisional[is_open]]
+    return labels, numpy.bincount(labels[is_open], minlength=len(unique_roots))
+
+
+def largest_basins(heights: numpy.ndarray, number: int = 3) -> int:
+    """Part 2: the product of the sizes of the `number` largest basins"""
+    _, sizes = label_basins(heights)
+    return int(numpy.prod(numpy.sort(sizes)[-number:]))
+
+
+def basin_distances(heights: numpy.ndarray) -> numpy.ndarray:
+    """
+    The number of steps from each cell to the nearest low point without crossing a wall, or
+    NO_BASIN for walls. Basins are small, so growing them all together a ring at a time takes
+    only as many (array) steps as the widest basin.
+    """
+    height, width = heights.shape
+    is_open = numpy.pad(heights < WALL, 1).ravel()
+    distances = numpy.full(is_open.shape, NO_BASIN, dtype=numpy.int64)
+    offsets = numpy.array([1, width + 2, -1, -(width + 2)], dtype=numpy.int64)
+
+    xs, ys = low_points(heights).T
+    frontier = (ys + 1) * (width + 2) + xs + 1
+    frontier = frontier[is_open[frontier]]
+    distances[frontier] = 0
+    distance = 0
+    while len(frontier):
+        distance += 1
+        neighbours = (frontier[:, None] + offsets).ravel()
+        neighbours = neighbours[is_open[neighbours] & (distances[neighbours] == NO_BASIN)]
+        # a cell reached from two sides appears twice (sorting is faster than numpy.unique)
+        neighbours.sort()
+        frontier = neighbours[numpy.diff(neighbours, prepend=-1) != 0]
+        distances[frontier] = distance
+    return distances.reshape(height + 2, width + 2)[1:-1, 1:-1].copy()
+
+
+def replay(labels: numpy.ndarray, distances: numpy.ndarray) -> Iterator[tuple[int, numpy.ndarray]]:
+    """
+    Yield (basin, (n, 2) xy coords) for each ring of each basin: first basin 0 a ring at a time
+    outwards from its low point, then basin 1, and so on. Cells that `distances` says can't be
+    reached (a basin with a flat bottom has no low point) come first in their basin.
+    """
+    ys, xs = numpy.nonzero(labels != NO_BASIN)
+    basins, rings = labels[ys, xs], distances[ys, xs]
+    # sort by basin, then ring (rings start at NO_BASIN, so shift them to start at 0)
+    order = numpy.argsort(basins * (rings.max(initial=0) + 2) + rings + 1)
+    xy = numpy.stack([xs, ys], axis=1)[order]
+    basins, rings = basins[order], rings[order]
+    starts = numpy.flatnonzero(
+        numpy.r_[True, (basins[1:] != basins[:-1]) | (rings[1:] != rings[:-1])]
+    )
+    ends = numpy.r_[starts[1:], len(order)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(basins[start]), xy[start:end]
+
+
+def label_kernel(is_open, labels, parents):
+    """
+    First pass of Hoshen-Kopelman: give each open cell a provisional label, joining the labels
+    of its upper and left neighbours in the union-find forest `parents` when they differ.
+    Returns how many provisional labels were used.
+    """
+    height, width = is_open.shape
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if not is_open[y, x]:
+                continue
+            up = labels[y - 1, x] if y > 0 else -1
+            left = labels[y, x - 1] if x > 0 else -1
+            if up < 0 and left < 0:
+                parents[count] = count
+                labels[y, x] = count
+                count += 1
+            elif up < 0 or left < 0:
+                labels[y, x] = max(up, left)
+            else:
+                a = _root(parents, up)
+                b = _root(parents, left)
+                # the larger root points at the smaller, so parents are always smaller
+                if a < b:
+                    parents[b] = a
+                elif b < a:
+                    parents[a] = b
+                labels[y, x] = min(a, b)
+    return count
+
+
+def resolve_roots(parents, count):
+    roots = parents[:count].copy()
+    for label in range(count):
+        roots[label] = roots[roots[label]]
+    return roots
+
+
+def _root(parents, label):
+    while parents[label] != label:
+        parents[label] = parents[parents[label]]  # path halving
+        label = parents[label]
+    return label
+
+
+if njit:
+    _root = njit(cache=True, nogil=True)(_root)
+    label_kernel = njit(cache=True, nogil=True)(label_kernel)
+    resolve_roots = njit(cache=True, nogil=True)(resolve_roots)
@@ -1,17 +1,18 @@
 from typing import Protocol, runtime_checkable
 
-from robingame.utils import SparseMatrix
+from automata.chunked_matrix import ChunkedMatrix
+from automata.packed_matrix import PackedMatrix
 
 
 @runtime_checkable
 class Automaton(Protocol):
     """
-    Stores game state (in SparseMatrix and possibly other stuff too).
+    Stores game state (in ChunkedMatrix / PackedMatrix and possibly other stuff too).
     Implements iteration of the game rules.
     """
 
     # this needs to be exposed because other parts of the code want to access it
-    contents: SparseMatrix
+    contents: ChunkedMatrix | PackedMatrix
 
     def iterate(self):
         """Perform 1 iteration of the game rules."""
@@ -1,10 +1,12 @@
-from collections import deque
-
 from robingame.objects import Entity
 from robingame.utils import SparseMatrix
 
 from automata.automaton import Automaton
-from automata.timer import Timer
+from automata.cycles import Cycle, CycleDetector
+from automata.history import History
+from automata.profiler import Profiler, PROFILER
+from automata.render_cache import RenderCache
+from automata.utils import cells_to_arrays
 
 
 class Backend(Entity):
@@ -15,6 +17,10 @@ class Backend(Entity):
     Contains Automaton
     Implements update/iterate disconnect
     Implements history
+    Implements cycle detection (optional): pause when the world starts repeating itself, or
+    skip ahead without iterating
+    Implements profiling: update / iterate times are recorded as "<name>.update" etc.
+    Contains RenderCache, shared by all the Viewers drawing this backend's automaton
     """
 
     automaton: Automaton
@@ -22,27 +28,103 @@ class Backend(Entity):
     ticks_per_update: int = 1
     iterations_per_update: int = 1
     paused: bool = False
-    history: deque[SparseMatrix]
+    history: History
+    cycle_detector: CycleDetector | None
+    stop_on_cycle: bool = False  # pause once the cycle detector has confirmed a cycle
+    profiler: Profiler
+    name: str  # prefix for profiler spans
+    render_cache: RenderCache  # invalidated whenever the contents change
     _update_time = 0
 
-    def __init__(self, automaton: Automaton):
+    def __init__(
+        self,
+        automaton: Automaton,
+        cycle_detector: CycleDetector = None,
+        stop_on_cycle: bool = None,
+        profiler: Profiler = None,
+        name: str = None,
+    ):
         super().__init__()
         self.automaton = automaton
-        self.history = deque(maxlen=50)
+        self.profiler = profiler or PROFILER
+        self.name = name or self.profiler.unique_name(type(automaton).__name__)
+        self.history = History()
+        self.render_cache = RenderCache()
+        self.cycle_detector = cycle_detector
+        if stop_on_cycle is not None:
+            self.stop_on_cycle = stop_on_cycle
+        if cycle_detector:
+            cycle_detector.reset(automaton.contents)
 
     def update(self):
-        with Timer() as timer:
+        with self.profiler.span(f"{self.name}.update", "backend") as timer:
             super().update()
             if not self.paused and self.tick % self.ticks_per_update == 0:
                 for _ in range(self.iterations_per_update):
                     # delegate iteration to the automaton
                     self.iterate()
+                    if self.paused:
+                        break  # stopped on a cycle
         self._update_time = timer.time
 
     def iterate(self):
-        self.history.append(self.automaton.contents)
-        self.automaton.iterate()
+        # copy because some automata (e.g. Langton's ant) modify their contents in-place. The
+        # history doesn't need the spatial index, so a plain SparseMatrix will do.
+        with self.profiler.span(f"{self.name}.iterate", "backend"):
+            previous = SparseMatrix(self.automaton.contents)
+            self.automaton.iterate()
+            self.render_cache.invalidate()
+        with self.profiler.span(f"{self.name}.history", "backend"):
+            diff = self.history.record(previous, self.automaton.contents)
+        if self.cycle_detector:
+            with self.profiler.span(f"{self.name}.cycles", "backend"):
+                cycle = self.cycle_detector.record(diff, self.automaton.contents)
+            if cycle and self.stop_on_cycle:
+                self.paused = True
+
+    @property
+    def cycle(self) -> Cycle | None:
+        """The cycle the world has settled into, if cycle detection is on and it has"""
+        return self.cycle_detector.cycle if self.cycle_detector else None
+
+    def fast_forward(self, generations: int):
+        """
+        Move on `generations` using the confirmed cycle: whole periods are skipped by moving the
+        contents by the cycle's translation, and only the rest are iterated. This assumes all of
+        the automaton's state is in its contents (true for the game of life, but not for
+        Langton's ant). Cell values are carried over unchanged. The skip is recorded in the
+        history as a single generation.
+        """
+        if not self.cycle:
+            raise ValueError("Can't fast forward until a cycle has been detected")
+        periods = generations // self.cycle.period
+        skipped = periods * self.cycle.period
+        if periods:
+            dx, dy = self.cycle.translation
+            dx, dy = dx * periods, dy * periods
+            contents = self.automaton.contents
+            xy, values = cells_to_arrays(contents)
+            self.automaton.contents = type(contents).from_arrays(xy + (dx, dy), values)
+            self.render_cache.invalidate()
+            self.history.record(SparseMatrix(contents), self.automaton.contents)
+            self.cycle_detector.skip(skipped)
+        for _ in range(generations - skipped):
+            self.iterate()
 
     def back_one(self):
+        self.rewind(1)
+
+    def rewind(self, generations: int):
         if self.history:
-            self.automaton.contents = self.history.pop()
+            self.automaton.contents = self.history.rewind(self.automaton.contents, generations)
+            self.render_cache.invalidate()  # rewinding may have changed the contents in-place
+            if self.cycle_detector:
+                self.cycle_detector.reset(self.automaton.contents, self.history.generation)
+
+    def set_contents(self, contents: SparseMatrix):
+        """Replace the automaton's contents (e.g. when loading a file), forgetting the past"""
+        self.automaton.contents = contents
+        self.render_cache.invalidate()
+        self.history = History(self.history.max_cells, self.history.keyframe_interval)
+        if self.cycle_detector:
+            self.cycle_detector.reset(contents)
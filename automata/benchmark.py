@@ -0,0 +1,273 @@
+"""
+Headless benchmark for the automata.
+
+Runs an automaton for a number of generations without opening a window, timing
+Automaton.iterate and each Frontend.draw separately, and prints a JSON report so that engine
+changes can be compared across commits. For example:
+
+    python -m automata.benchmark game-of-life --rule 3 5 3 --pattern BLOCK -n 500
+    python -m automata.benchmark game-of-life --rule 3 5 3 --pattern BLOCK -n 500 --packed
+    python -m automata.benchmark langtons-ant --ant 0 0 lrrrl --ant -30 0 rlllr -n 20000
+    python -m automata.benchmark langtons-ant --steps-per-iteration 100000 -n 100 --draw-every 10
+"""
+
+import os
+
+# must be set before pygame is imported, so that we don't need a window, and so that pygame's
+# greeting doesn't end up in the JSON output
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import subprocess
+import sys
+import tracemalloc
+
+import matplotlib
+import numpy
+import pygame
+from pygame import Surface
+
+from automata.automaton import Automaton
+from automata.backend import Backend
+from automata.frontend import (
+    BitmapFrontend,
+    BitmapMinimap,
+    DrawRectFrontend,
+    DrawRectMinimap,
+    Frontend,
+    sample_colormap,
+)
+from automata.game_of_life import patterns, threshold
+from automata.game_of_life.automaton import GameOfLifeAutomaton
+from automata.game_of_life.rules import Rule, RuleAutomaton
+from automata.langtons_ant.automaton import LangtonsAntAutomaton
+from automata.langtons_ant.frontend import LangtonsAntFrontend
+from automata.packed_matrix import PackedMatrix
+from automata.render_cache import RenderCache
+from automata.timer import Timer
+from automata.viewport_handler import FloatRect
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+PATTERNS = {
+    name: value
+    for name, value in vars(patterns).items()
+    if name.isupper() and isinstance(value, numpy.ndarray)
+}
+FRONTENDS = {
+    "drawrect": lambda colors: DrawRectFrontend(colors=colors),
+    "bitmap": lambda colors: BitmapFrontend(),
+    "drawrect-minimap": lambda colors: DrawRectMinimap(colors=colors),
+    "bitmap-minimap": lambda colors: BitmapMinimap(),
+    "langtons-ant": lambda colors: LangtonsAntFrontend(colors=colors),
+}
+
+
+def run(
+    automaton: Automaton,
+    frontends: dict[str, Frontend],
+    generations: int,
+    viewport: FloatRect = (-50, -50, 100, 100),
+    surface_size: tuple[int, int] = (500, 500),
+    draw_every: int = 1,
+    history: bool = False,
+    trace_memory: bool = False,
+) -> dict:
+    """
+    Iterate `automaton` `generations` times, drawing with each of `frontends` every
+    `draw_every` generations. If `history` is True, iterate via a Backend so that the cost of
+    recording history is included. The frontends share a RenderCache, like Viewers sharing a
+    Backend do.
+    """
+    backend = Backend(automaton) if history else None
+    cache = RenderCache()
+    surface = Surface(surface_size)
+    iterate_time = 0.0
+    cells_processed = 0
+    draw_times = {name: [] for name in frontends}
+
+    if trace_memory:
+        tracemalloc.start()
+    for generation in range(generations):
+        cells_processed += len(automaton.contents)
+        with Timer() as timer:
+            if backend:
+                backend.iterate()
+            else:
+                automaton.iterate()
+            cache.invalidate()
+        iterate_time += timer.time
+
+        if generation % draw_every == 0:
+            for name, frontend in frontends.items():
+                with Timer() as timer:
+                    frontend.draw(surface, automaton, viewport, cache=cache)
+                draw_times[name].append(timer.time)
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    report = {
+        "automaton": type(automaton).__name__,
+        "generations": generations,
+        "final_cells": len(automaton.contents),
+        "iterate": {
+            "total_seconds": iterate_time,
+            "generations_per_second": generations / iterate_time if iterate_time else None,
+            "cells_per_second": cells_processed / iterate_time if iterate_time else None,
+        },
+        "draw": {
+            name: {
+                "draws": len(times),
+                "total_seconds": sum(times),
+                "mean_ms": 1000 * numpy.mean(times) if times else None,
+                "max_ms": 1000 * max(times) if times else None,
+                "draws_per_second": len(times) / sum(times) if sum(times) else None,
+            }
+            for name, times in draw_times.items()
+        },
+        # ru_maxrss is in kilobytes on linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+    if trace_memory:
+        report["peak_traced_bytes"] = peak_traced
+    return report
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(__file__),
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    # options shared by all automata
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-n", "--generations", type=int, default=200)
+    common.add_argument(
+        "--frontend",
+        dest="frontends",
+        action="append",
+        choices=FRONTENDS,
+        help="frontend to time (repeatable). Default: drawrect and drawrect-minimap",
+    )
+    common.add_argument("--draw-every", type=int, default=1, help="draw every N generations")
+    common.add_argument(
+        "--viewport",
+        type=float,
+        nargs=4,
+        default=(-50, -50, 100, 100),
+        metavar=("X", "Y", "W", "H"),
+    )
+    common.add_argument("--size", type=int, nargs=2, default=(500, 500), metavar=("W", "H"))
+    common.add_argument("--history", action="store_true", help="include Backend history")
+    common.add_argument("--trace-memory", action="store_true", help="use tracemalloc (slower)")
+    common.add_argument("-o", "--output", help="write the report here instead of stdout")
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subparsers = parser.add_subparsers(dest="automaton", required=True)
+
+    game_of_life = subparsers.add_parser("game-of-life", parents=[common])
+    game_of_life.add_argument(
+        "--rule",
+        type=int,
+        nargs=3,
+        default=(threshold.UNDERPOPULATION, threshold.OVERPOPULATION, threshold.REPRODUCTION),
+        metavar=("U", "O", "R"),
+        help="underpopulation, overpopulation and reproduction thresholds",
+    )
+    game_of_life.add_argument("--pattern", choices=PATTERNS, default="R_PENTOMINO")
+    game_of_life.add_argument(
+        "--packed",
+        action="store_true",
+        help="use the vectorised RuleAutomaton with PackedMatrix contents",
+    )
+
+    langtons_ant = subparsers.add_parser("langtons-ant", parents=[common])
+    langtons_ant.add_argument(
+        "--ant",
+        dest="ants",
+        nargs=3,
+        action="append",
+        metavar=("X", "Y", "RULESET"),
+        help="add an ant (repeatable). Default: one 'rl' ant at 0, 0",
+    )
+    langtons_ant.add_argument(
+        "--steps-per-iteration", type=int, default=1, help="ant steps per generation"
+    )
+    langtons_ant.add_argument("--no-skip-highways", dest="skip_highways", action="store_false")
+    return parser.parse_args(argv)
+
+
+def build(args: argparse.Namespace) -> tuple[Automaton, dict[str, Frontend]]:
+    if args.automaton == "game-of-life":
+        underpopulation, overpopulation, reproduction = args.rule
+        if args.packed:
+            automaton = RuleAutomaton(
+                contents=patterns.load(PATTERNS[args.pattern]),
+                rule=Rule.from_thresholds(underpopulation, overpopulation, reproduction),
+                contents_class=PackedMatrix,
+            )
+        else:
+            automaton = GameOfLifeAutomaton(
+                contents=patterns.load(PATTERNS[args.pattern]),
+                underpopulation_threshold=underpopulation,
+                overpopulation_threshold=overpopulation,
+                reproduction_threshold=reproduction,
+            )
+        num_colors = 50
+    else:
+        automaton = LangtonsAntAutomaton()
+        for x, y, ruleset in args.ants or [(0, 0, "rl")]:
+            automaton.add_ant((int(x), int(y)), ruleset, 0)
+        automaton.steps_per_iteration = args.steps_per_iteration
+        automaton.skip_highways = args.skip_highways
+        num_colors = max(len(ant.ruleset) for ant in automaton.ants)
+
+    colors = sample_colormap(colormap=matplotlib.cm.cividis_r, num_colors=num_colors)
+    names = args.frontends or ["drawrect", "drawrect-minimap"]
+    frontends = {name: FRONTENDS[name](colors) for name in names}
+    return automaton, frontends
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    pygame.display.init()
+    automaton, frontends = build(args)
+    report = run(
+        automaton=automaton,
+        frontends=frontends,
+        generations=args.generations,
+        viewport=tuple(args.viewport),
+        surface_size=tuple(args.size),
+        draw_every=args.draw_every,
+        history=args.history,
+        trace_memory=args.trace_memory,
+    )
+    report["commit"] = git_commit()
+    report["args"] = {
+        key: value for key, value in vars(args).items() if key not in ("output", "automaton")
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,181 @@
+from collections import defaultdict
+from itertools import count
+from typing import Iterable
+
+import numpy
+from pygame import Rect
+from robingame.utils import SparseMatrix, Coord
+
+from automata.utils import arrays_to_cells
+
+# shared by all instances so that stamps are unique even across different matrices
+_stamps = count()
+
+
+class ChunkedMatrix(SparseMatrix):
+    """
+    SparseMatrix that also keeps a spatial index: the grid is divided into square chunks of
+    `chunk_size` cells, and we keep track of which cells are in each chunk. This means we can
+    find the cells inside a rectangle (e.g. the viewport) by only looking at the chunks that
+    overlap it, instead of checking every cell in the world.
+
+    All the dict methods that add or remove keys are overridden to keep the index up to date.
+
+    Each chunk also has a stamp which changes whenever any of its cells are added, removed or
+    changed. Stamps are unique across all instances, so something that caches per-chunk work
+    (e.g. a minimap) can find out which chunks are dirty by comparing against the stamps it saw
+    last time -- even if the automaton has replaced its contents with a new matrix.
+    """
+
+    chunk_size: int = 16
+    chunks: defaultdict[Coord, set[Coord]]  # {chunk coord: {cell coords}}
+    stamps: dict[Coord, int]  # {chunk coord: stamp}
+
+    def __init__(self, contents: dict[Coord, int] | Iterable = None, chunk_size: int = None):
+        super().__init__(contents or ())
+        self.chunk_size = chunk_size or self.chunk_size
+        self.chunks = defaultdict(set)
+        size = self.chunk_size
+        for coord in self:
+            x, y = coord
+            self.chunks[(x // size, y // size)].add(coord)
+        self.stamps = {key: next(_stamps) for key in self.chunks}
+
+    @classmethod
+    def from_arrays(cls, xy: numpy.ndarray, values: numpy.ndarray) -> "ChunkedMatrix":
+        """Inverse of automata.utils.cells_to_arrays"""
+        return cls(arrays_to_cells(xy, values))
+
+    def chunk(self, coord: Coord) -> Coord:
+        """Get the coord of the chunk that contains `coord`"""
+        x, y = coord
+        return x // self.chunk_size, y // self.chunk_size
+
+    def _unindex(self, coord: Coord):
+        key = self.chunk(coord)
+        chunk = self.chunks[key]
+        chunk.discard(coord)
+        if chunk:
+            self.stamps[key] = next(_stamps)
+        else:
+            del self.chunks[key]
+            del self.stamps[key]
+
+    def __setitem__(self, coord: Coord, value: int):
+        key = self.chunk(coord)
+        if coord not in self:
+            self.chunks[key].add(coord)
+        self.stamps[key] = next(_stamps)
+        super().__setitem__(coord, value)
+
+    def __delitem__(self, coord: Coord):
+        super().__delitem__(coord)
+        self._unindex(coord)
+
+    def pop(self, coord: Coord, *default):
+        if coord in self:
+            self._unindex(coord)
+        return super().pop(coord, *default)
+
+    def popitem(self) -> tuple[Coord, int]:
+        coord, value = super().popitem()
+        self._unindex(coord)
+        return coord, value
+
+    def setdefault(self, coord: Coord, default: int = None) -> int:
+        if coord not in self:
+            self[coord] = default
+        return self[coord]
+
+    def update(self, *args, **kwargs):
+        # index in bulk rather than via __setitem__, because this is used for big updates
+        new = dict(*args, **kwargs)
+        size = self.chunk_size
+        for coord in new:
+            if coord not in self:
+                x, y = coord
+                self.chunks[(x // size, y // size)].add(coord)
+        for key in {(x // size, y // size) for x, y in new}:
+            self.stamps[key] = next(_stamps)
+        super().update(new)
+
+    def clear(self):
+        super().clear()
+        self.chunks.clear()
+        self.stamps.clear()
+
+    def copy(self) -> "ChunkedMatrix":
+        new = ChunkedMatrix.__new__(ChunkedMatrix)
+        dict.update(new, self)
+        new.chunk_size = self.chunk_size
+        new.chunks = defaultdict(set, {key: chunk.copy() for key, chunk in self.chunks.items()})
+        new.stamps = self.stamps.copy()
+        return new
+
+    @property
+    def limits(self) -> tuple[SparseMatrix.Limit, SparseMatrix.Limit]:
+        """Only the cells in the outermost chunks need checking"""
+        if not self:
+            return (None, None), (None, None)
+        cxs, cys = zip(*self.chunks)
+        cx_min, cx_max, cy_min, cy_max = min(cxs), max(cxs), min(cys), max(cys)
+        chunks = self.chunks.items()
+        xmin = min(x for (cx, _), chunk in chunks if cx == cx_min for x, _ in chunk)
+        xmax = max(x for (cx, _), chunk in chunks if cx == cx_max for x, _ in chunk)
+        ymin = min(y for (_, cy), chunk in chunks if cy == cy_min for _, y in chunk)
+        ymax = max(y for (_, cy), chunk in chunks if cy == cy_max for _, y in chunk)
+        return (xmin, xmax), (ymin, ymax)
+
+    def dirty_chunks(self, stamps: dict[Coord, int]) -> set[Coord]:
+        """
+        Get the chunks that have changed since `stamps` (a copy of self.stamps from earlier,
+        possibly from a different instance) was taken. Includes chunks that have since emptied.
+        """
+        return {
+            key
+            for key in stamps.keys() | self.stamps.keys()
+            if stamps.get(key) != self.stamps.get(key)
+        }
+
+    def crop(self, rect: Rect) -> SparseMatrix:
+        """
+        Get the cells inside `rect` (in xy coords). Only chunks that overlap `rect` are
+        searched, so this scales with the area of `rect` rather than the size of the world.
+        """
+        rect = Rect(rect)
+        cx_min, cy_min = self.chunk(rect.topleft)
+        cx_max, cy_max = self.chunk((rect.right - 1, rect.bottom - 1))
+        if (cx_max - cx_min + 1) * (cy_max - cy_min + 1) > len(self.chunks):
+            # rect covers more chunks than are occupied; just check the occupied ones
+            keys = [
+                (cx, cy)
+                for cx, cy in self.chunks
+                if cx_min <= cx <= cx_max and cy_min <= cy <= cy_max
+            ]
+        else:
+            keys = [
+                (cx, cy)
+                for cx in range(cx_min, cx_max + 1)
+                for cy in range(cy_min, cy_max + 1)
+                if (cx, cy) in self.chunks
+            ]
+
+        cropped = SparseMatrix()
+        for cx, cy in keys:
+            chunk = self.chunks[(cx, cy)]
+            chunk_rect = Rect(
+                cx * self.chunk_size, cy * self.chunk_size, self.chunk_size, self.chunk_size
+            )
+            if not rect.contains(chunk_rect):
+                chunk = [coord for coord in chunk if rect.collidepoint(coord)]
+            # map/zip keep the per-cell work in C
+            cropped.update(zip(chunk, map(self.__getitem__, chunk)))
+        return cropped
+
+    def cells_in_chunks(self, chunks: Iterable[Coord]) -> SparseMatrix:
+        """Get the cells in the chunks with coords `chunks`"""
+        cells = SparseMatrix()
+        for key in chunks:
+            chunk = self.chunks.get(key, ())
+            cells.update(zip(chunk, map(self.__getitem__, chunk)))
+        return cells
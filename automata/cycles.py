@@ -0,0 +1,214 @@
+"""
+Detect when an automaton's world has started repeating itself -- either exactly (a still life
+or oscillator) or shifted across the grid (a spaceship) -- by hashing every generation.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+
+import numpy
+from robingame.utils import SparseMatrix
+
+from automata.history import Diff
+from automata.utils import cells_to_arrays
+
+# Each cell hashes to GENERATOR ** (a*x + b*y + c*value) mod MODULUS, and the world's hash is the
+# sum of its cells' hashes. Summing makes the hash independent of the order of the cells, and
+# lets it be updated by adding / subtracting just the cells that changed. Moving the world by
+# (dx, dy) multiplies the hash by GENERATOR ** (a*dx + b*dy), so dividing that out for the top
+# left corner gives a hash that doesn't depend on where the world is.
+MODULUS = 2**31 - 1  # prime, so that every exponent (mod MODULUS - 1) is valid
+GENERATOR = 7  # a primitive root of MODULUS
+# (a, b, c) for each of the two independent hashes, which are combined into one 62 bit hash
+MULTIPLIERS = numpy.array(
+    [[1_234_567_891, 987_654_321, 555_555_557], [1_618_033_989, 271_828_183, 314_159_267]]
+)
+
+
+def _powers(base: int, count: int) -> numpy.ndarray:
+    """[base ** 0, base ** 1, ... base ** (count - 1)] mod MODULUS"""
+    powers = numpy.ones(count, dtype=numpy.int64)
+    filled = 1
+    while filled < count:
+        step = min(filled, count - filled)
+        powers[filled : filled + step] = powers[:step] * pow(base, filled, MODULUS) % MODULUS
+        filled += step
+    return powers
+
+
+# GENERATOR ** exponent == LOW_POWERS[exponent & 0xFFFF] * HIGH_POWERS[exponent >> 16]
+LOW_POWERS = _powers(GENERATOR, 2**16)
+HIGH_POWERS = _powers(pow(GENERATOR, 2**16, MODULUS), 2**15)
+
+
+class WorldHash:
+    """
+    Order-independent hash of a set of cells, which can be updated as cells change instead of
+    being recalculated. If `use_values` is False, only the cells' coords are hashed (e.g. for
+    the game of life, where the values are ages that keep going up).
+    """
+
+    use_values: bool
+    sums: list[int]  # one per row of MULTIPLIERS
+
+    def __init__(self, contents: SparseMatrix = None, use_values: bool = True):
+        self.use_values = use_values
+        self.sums = [0, 0]
+        if contents:
+            self.add(*cells_to_arrays(contents))
+
+    def add(self, xy: numpy.ndarray, values: numpy.ndarray, sign: int = 1):
+        """Add the cells at the (n, 2) coords `xy` with the (n,) `values`"""
+        if not len(xy):
+            return
+        exponent_mod = MODULUS - 1
+        xy = numpy.asarray(xy, dtype=numpy.int64) % exponent_mod
+        values = numpy.asarray(values, dtype=numpy.int64) % exponent_mod
+        if not self.use_values:
+            values = numpy.zeros_like(values)
+        for row, (a, b, c) in enumerate(MULTIPLIERS.tolist()):
+            exponents = (a * xy[:, 0] % exponent_mod + b * xy[:, 1] % exponent_mod) % exponent_mod
+            exponents = (exponents + c * values % exponent_mod) % exponent_mod
+            hashes = LOW_POWERS[exponents & 0xFFFF] * HIGH_POWERS[exponents >> 16] % MODULUS
+            self.sums[row] = (self.sums[row] + sign * int(hashes.sum())) % MODULUS
+
+    def remove(self, xy: numpy.ndarray, values: numpy.ndarray):
+        self.add(xy, values, sign=-1)
+
+    def apply(self, diff: Diff, new: SparseMatrix):
+        """Update for one generation, given its Diff (see History) and the new contents"""
+        if diff.deaths:
+            self.remove(*cells_to_arrays(diff.deaths))
+        if diff.changes:
+            self.remove(*cells_to_arrays(diff.changes))
+        if diff.offset and self.use_values:
+            # every survivor that isn't in diff.changes changed by diff.offset
+            for row, (_, _, c) in enumerate(MULTIPLIERS.tolist()):
+                self.sums[row] = self.sums[row] * self._power(c * diff.offset) % MODULUS
+        changed = [*diff.births, *diff.changes]
+        if changed:
+            self.add(*cells_to_arrays({coord: new[coord] for coord in changed}))
+
+    def translate(self, dx: int, dy: int):
+        """Update for every cell having moved by (dx, dy)"""
+        for row, (a, b, _) in enumerate(MULTIPLIERS.tolist()):
+            self.sums[row] = self.sums[row] * self._power(a * dx + b * dy) % MODULUS
+
+    def normalised(self, x: int, y: int) -> int:
+        """The hash the world would have if it were moved so that (x, y) was at (0, 0)"""
+        result = 0
+        for row, (a, b, _) in enumerate(MULTIPLIERS.tolist()):
+            result = result << 31 | self.sums[row] * self._power(-(a * x + b * y)) % MODULUS
+        return result
+
+    @staticmethod
+    def _power(exponent: int) -> int:
+        return pow(GENERATOR, exponent % (MODULUS - 1), MODULUS)
+
+
+@dataclass(frozen=True)
+class Cycle:
+    period: int  # number of generations before the world repeats
+    translation: tuple[int, int]  # how far the world moves each period; (0, 0) if it doesn't
+    start: int  # the first generation that was repeated
+
+
+class CycleDetector:
+    """
+    Hashes every generation (see WorldHash), and keeps an index of the hashes of the last
+    `max_period` generations. When a generation's hash is in the index, the world has repeated,
+    possibly shifted. The cycle counts as confirmed once it has carried on repeating for
+    `confirm_periods` more periods, which also rules out hash collisions.
+    """
+
+    max_period: int = 1000
+    confirm_periods: int = 1
+
+    world_hash: WorldHash
+    generation: int
+    index: dict[int, tuple[int, int, int]]  # {normalised hash: (generation, x, y)}
+    recent: deque[tuple[int, int]]  # (generation, normalised hash), oldest first
+    candidate: tuple[int, tuple[int, int], int] | None  # (period, translation, start)
+    matches: int  # consecutive generations that have matched the candidate
+    cycle: Cycle | None  # the confirmed cycle, if there is one
+
+    def __init__(
+        self, use_values: bool = True, max_period: int = None, confirm_periods: int = None
+    ):
+        self.use_values = use_values
+        self.max_period = max_period or self.max_period
+        self.confirm_periods = self.confirm_periods if confirm_periods is None else confirm_periods
+        self.reset()
+
+    def reset(self, contents: SparseMatrix = None, generation: int = 0):
+        """Forget everything and start again from `contents` at `generation`"""
+        self.world_hash = WorldHash(contents, use_values=self.use_values)
+        self.generation = generation
+        self.index = dict()
+        self.recent = deque()
+        self.candidate = None
+        self.matches = 0
+        self.cycle = None
+        self._observe(*self._corner(contents.limits) if contents else (0, 0))
+
+    def record(self, diff: Diff, contents: SparseMatrix) -> Cycle | None:
+        """
+        Record the next generation, given its Diff (see History.record) and new `contents`.
+        Returns the confirmed cycle, if there is one.
+        """
+        self.world_hash.apply(diff, contents)
+        self.generation += 1
+        return self._observe(*self._corner(contents.limits))
+
+    def record_arrays(self, xy: numpy.ndarray, values: numpy.ndarray) -> Cycle | None:
+        """Like `record`, but hashes the whole world from scratch"""
+        self.world_hash = WorldHash(use_values=self.use_values)
+        self.world_hash.add(xy, values)
+        self.generation += 1
+        corner = xy.min(axis=0).tolist() if len(xy) else (0, 0)
+        return self._observe(*corner)
+
+    def skip(self, generations: int):
+        """
+        Update for the world having been moved on by `generations` (a multiple of the cycle's
+        period) without iterating -- see Backend.fast_forward.
+        """
+        periods, remainder = divmod(generations, self.cycle.period)
+        assert not remainder, "can only skip whole periods"
+        dx, dy = self.cycle.translation
+        dx, dy = dx * periods, dy * periods
+        self.world_hash.translate(dx, dy)
+        self.generation += generations
+        # every stored generation would have been the same, just shifted
+        self.index = {
+            key: (generation + generations, x + dx, y + dy)
+            for key, (generation, x, y) in self.index.items()
+        }
+        self.recent = deque((generation + generations, key) for generation, key in self.recent)
+
+    def _corner(self, limits: tuple[SparseMatrix.Limit, SparseMatrix.Limit]) -> tuple[int, int]:
+        (xmin, *_), (ymin, *_) = limits
+        return (0, 0) if xmin is None else (int(xmin), int(ymin))
+
+    def _observe(self, x: int, y: int) -> Cycle | None:
+        while self.recent and self.recent[0][0] < self.generation - self.max_period:
+            generation, old_key = self.recent.popleft()
+            if self.index.get(old_key, (None,))[0] == generation:
+                del self.index[old_key]
+        key = self.world_hash.normalised(x, y)
+        previous = self.index.get(key)
+        self.index[key] = (self.generation, x, y)
+        self.recent.append((self.generation, key))
+
+        if previous is None:
+            self.candidate, self.matches, self.cycle = None, 0, None
+            return None
+        generation, x0, y0 = previous
+        period, translation = self.generation - generation, (x - x0, y - y0)
+        if self.candidate and self.candidate[:2] == (period, translation):
+            self.matches += 1
+        else:
+            self.candidate, self.matches, self.cycle = (period, translation, generation), 1, None
+        if self.matches > self.confirm_periods * period:
+            self.cycle = Cycle(*self.candidate)
+        return self.cycle
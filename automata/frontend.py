@@ -4,10 +4,15 @@ from typing import Protocol
 import matplotlib
 import numpy
 import pygame.draw
+import pygame.surfarray
 from pygame import Surface, Color, Rect
 from robingame.image import scale_image
+from robingame.utils import Coord
 
 from automata.automaton import Automaton
+from automata.chunked_matrix import ChunkedMatrix
+from automata.packed_matrix import PackedMatrix
+from automata.render_cache import RenderCache
 from automata.viewport_handler import FloatRect
 
 
@@ -18,18 +23,23 @@ class Frontend(Protocol):
         automaton: Automaton,
         viewport: FloatRect,
         debug: bool = False,
+        cache: RenderCache = None,
     ):
         """
         Do something with automaton.contents here.
         viewport is the subset of the matrix we want to draw.
+        cache is shared with the other frontends drawing the same automaton (see RenderCache).
+        Without one, a fresh cache is used, so nothing is shared.
         """
 
 
 class ColormapMixin:
     colors: list[Color]
+    lut: numpy.ndarray  # (num_colors, 3) array of RGB values; colors as a lookup table
 
     def __init__(self, colors: list[Color]):
         self.colors = colors
+        self.lut = numpy.array([color[:3] for color in colors], dtype=numpy.uint8)
 
     def get_color(self, value: int):
         try:
@@ -37,12 +47,23 @@ class ColormapMixin:
         except IndexError:
             return self.colors[-1]
 
+    def get_colors(self, values: numpy.ndarray) -> numpy.ndarray:
+        """Vectorised get_color. Returns an (n, 3) array of RGB values."""
+        return self.lut[numpy.clip(values, 0, len(self.lut) - 1)]
+
 
 def sample_colormap(num_colors: int, colormap: matplotlib.colors.Colormap) -> list[Color]:
     samples = numpy.linspace(0, 1, num_colors)
     return [Color(*map(int, color[:3])) for color in colormap(samples) * 256]
 
 
+def blank_pixels(size: tuple[int, int], color: Color) -> numpy.ndarray:
+    """(width, height, 3) array of RGB values, indexed [x, y] like pygame.surfarray"""
+    pixels = numpy.empty((*size, 3), dtype=numpy.uint8)
+    pixels[:] = color[:3]
+    return pixels
+
+
 class BitmapFrontend(ColormapMixin):
     """
     Draws using the bitmap method.
@@ -55,7 +76,7 @@ class BitmapFrontend(ColormapMixin):
 
     def __init__(self, num_colors: int = None):
         self.num_colors = num_colors or self.num_colors
-        self.colors = sample_colormap(self.num_colors, self.colormap)
+        super().__init__(colors=sample_colormap(self.num_colors, self.colormap))
 
     def draw(
         self,
@@ -63,6 +84,7 @@ class BitmapFrontend(ColormapMixin):
         automaton: Automaton,
         viewport: FloatRect,
         debug: bool = False,
+        cache: RenderCache = None,
     ):
         """
         xy = sparse matrix coordinates
@@ -90,21 +112,16 @@ class BitmapFrontend(ColormapMixin):
         i0, j0 = viewport.topleft
 
         # 4. Create small bitmap on which to draw pixels
-        small_img = Surface(viewport.size)
-        small_img.fill(self.background_color)
+        pixels = blank_pixels(viewport.size, self.background_color)
 
         # 5. Filter visible cells
-        to_draw = {
-            coord: value
-            for coord, value in automaton.contents.items()
-            if viewport.collidepoint(*coord)
-        }
+        cache = (cache or RenderCache()).get(automaton.contents)
+        xy, values = cache.crop(viewport)
+        ij = xy - (i0, j0)  # matrix coords to pixel indices
 
         # 6. Draw visible cells on small bitmap
-        for (x, y), value in to_draw.items():
-            color = self.get_color(value)
-            ij = (x - i0, y - j0)  # matrix coords to pixel indices
-            small_img.set_at(ij, color)
+        pixels[ij[:, 0], ij[:, 1]] = self.get_colors(values)
+        small_img = pygame.surfarray.make_surface(pixels)
 
         # 7. Scale small bitmap up to full size
         big_img = scale_image(small_img, scale)
@@ -128,9 +145,15 @@ class BitmapFrontend(ColormapMixin):
 class DrawRectFrontend(ColormapMixin):
     """
     Draws each cell using pygame.draw.rect directly onto the Surface passed to the draw method.
+
+    When zoomed out so far that cells are smaller than pixels, drawing individual cells is
+    wasted effort. Instead the cells are binned into one bin per pixel and blitted as a single
+    image (see draw_aggregated).
     """
 
     background_color = Color("black")
+    lod_threshold: float = 1.0  # max cells per pixel (in each direction) before aggregating
+    lod_mode: str = "max"  # colour aggregated pixels by "max" value or by "density" of cells
 
     def draw(
         self,
@@ -138,6 +161,7 @@ class DrawRectFrontend(ColormapMixin):
         automaton: Automaton,
         viewport: FloatRect,
         debug: bool = False,
+        cache: RenderCache = None,
     ):
         """
         xy = sparse matrix coordinates
@@ -146,36 +170,69 @@ class DrawRectFrontend(ColormapMixin):
         """
 
         surface.fill(self.background_color)
+        cache = (cache or RenderCache()).get(automaton.contents)
 
         # Filter for visible cells using viewport. Pad viewport 1 pixel to include any offscreen
         # "halves" of cells, and 1 pixel to account for the fact that Rect rounds the viewport to
         # ints, possibly further in the wrong direction.
         viewport_rect_xy = Rect(*viewport).inflate(4, 4)
-        visible = {
-            coord: value
-            for coord, value in automaton.contents.items()
-            if viewport_rect_xy.collidepoint(*coord)
-        }
 
         # Calculate scale
         image_rect_uv = surface.get_rect()
         transform = Transform(viewport, image_rect_uv)
 
         # Draw visible cells in screen coords
-        for (x, y), value in visible.items():
-            color = self.get_color(value)
-            u, v = transform.point((x, y))
-            draw_square(surface, color, u, v, transform.scale)
-
-        if debug:
-            world_width, world_height = automaton.contents.size
-            (xmin, xmax), (ymin, ymax) = automaton.contents.limits
-            world_rect_xy = Rect(xmin, ymin, world_width, world_height)
+        if 1 / transform.scale > self.lod_threshold:
+            # when this zoomed out, most of the world is usually visible, and it's quicker to
+            # let draw_aggregated cull cells than to crop the matrix
+            self.draw_aggregated(surface, cache, transform)
+        else:
+            xy, values = cache.crop(viewport_rect_xy)
+            for (x, y), value in zip(xy.tolist(), values.tolist()):
+                color = self.get_color(value)
+                u, v = transform.point((x, y))
+                draw_square(surface, color, u, v, transform.scale)
+
+        if debug and automaton.contents:
+            (xmin, xmax), (ymin, ymax) = cache.limits
+            world_rect_xy = Rect(xmin, ymin, xmax - xmin + 1, ymax - ymin + 1)
             world_rect_uv = transform.rect(world_rect_xy)
             viewport_rect_uv = transform.floatrect(viewport)
             pygame.draw.rect(surface, Color("red"), viewport_rect_uv, 3)
             pygame.draw.rect(surface, Color("yellow"), world_rect_uv, 1)
 
+    def draw_aggregated(self, surface: Surface, cache: RenderCache, transform: "Transform"):
+        """
+        Level-of-detail drawing: bin the cells into a grid with one bin per pixel, colour each
+        bin by the max value of its cells (or by how full it is), and blit the grid in one go.
+        The cost of the blit doesn't depend on the number of cells.
+        """
+        width, height = surface.get_size()
+        xy, _ = cache.arrays
+        # clipping to the colormap before taking the max doesn't change the result
+        values = cache.color_indices(len(self.lut))
+        u = numpy.floor(xy[:, 0] * transform.scale + transform.u_offset).astype(numpy.int64)
+        v = numpy.floor(xy[:, 1] * transform.scale + transform.v_offset).astype(numpy.int64)
+        on_screen = (u >= 0) & (u < width) & (v >= 0) & (v < height)
+        bins = u[on_screen] * height + v[on_screen]
+        values = values[on_screen]
+
+        counts = numpy.bincount(bins, minlength=width * height)
+        occupied = counts > 0
+        if self.lod_mode == "max":
+            grid = numpy.zeros(width * height, dtype=numpy.int64)
+            numpy.maximum.at(grid, bins, values)
+        elif self.lod_mode == "density":
+            cells_per_pixel = (1 / transform.scale) ** 2
+            grid = numpy.rint(counts / cells_per_pixel * (len(self.lut) - 1)).astype(numpy.int64)
+        else:
+            raise ValueError(f"Unknown lod_mode: {self.lod_mode}")
+
+        pixels = blank_pixels((width * height,), self.background_color)
+        pixels[occupied] = self.get_colors(grid[occupied])
+        image = pygame.surfarray.make_surface(pixels.reshape(width, height, 3))
+        surface.blit(image, (0, 0))
+
 
 def draw_square(surface: Surface, color: Color, u: int, v: int, size: float):
     pygame.draw.rect(
@@ -200,39 +257,146 @@ def draw_circle(surface: Surface, color: Color, u: int, v: int, size: float):
 
 
 class DrawRectMinimap(DrawRectFrontend):
+    """
+    Draws the whole world, scaled to fit the surface, with the viewport on top.
+
+    Rather than drawing every cell every frame, the world is cached as a bitmap (1 pixel per
+    `downsample` x `downsample` cells) and only the chunks of the contents that have changed
+    since the last refresh are redrawn. The bitmap is only refreshed every `redraw_interval`
+    frames, but the viewport is drawn every frame.
+    """
+
+    redraw_interval: int = 4
+    margin: int = 32  # pad the cached area, so that it doesn't need resizing as soon as it grows
+
+    frame: int
+    world_rect: Rect | None  # area covered by the cached bitmap, in xy coords
+    world_limits: Rect | None  # area occupied by cells at the last refresh, in xy coords
+    downsample: int  # cells per bitmap pixel in each direction
+    pixels: numpy.ndarray  # cached bitmap as (width, height, 3) array
+    image: Surface  # cached bitmap
+    stamps: dict[Coord, int]  # contents.stamps at the last refresh
+
+    def __init__(self, colors: list[Color], redraw_interval: int = None):
+        super().__init__(colors=colors)
+        self.redraw_interval = redraw_interval or self.redraw_interval
+        self.frame = 0
+        self.world_rect = None
+        self.world_limits = None
+        self.stamps = dict()
+
     def draw(
         self,
         surface: Surface,
         automaton: Automaton,
         viewport: FloatRect,
         debug: bool = False,
+        cache: RenderCache = None,
     ):
         """
-        1. Draw all cells irrespective of scale
-        2. Draw viewport
+        1. Refresh the cached bitmap (if it's time)
+        2. Scale the bitmap to fit the world limits to the surface
+        3. Draw viewport
         """
         surface.fill(self.background_color)
+        if self.frame % self.redraw_interval == 0 or self.world_limits is None:
+            cache = (cache or RenderCache()).get(automaton.contents)
+            self.refresh(cache, max(surface.get_size()))
+        self.frame += 1
+        if self.world_limits is None:
+            return  # nothing to draw yet
 
-        # Choose viewport in xy coordinates to filter for visible cells
         # fit viewport as tightly as possible to world limits
-        world_width, world_height = automaton.contents.size
-        (xmin, xmax), (ymin, ymax) = automaton.contents.limits
-        world_rect_xy = Rect(xmin, ymin, world_width, world_height)
         image_rect_uv = surface.get_rect()
-        transform = Transform(world_rect_xy, image_rect_uv)
+        transform = Transform(self.world_limits, image_rect_uv)
         viewport_rect_uv = transform.floatrect(viewport)
 
-        # Draw all cells in screen coords
-        for (x, y), value in automaton.contents.items():
-            color = self.get_color(value)
-            u, v = transform.point((x, y))
-            draw_square(surface, color, u, v, transform.scale)
+        # crop the bitmap to the world limits, then scale up. Cells are centred on their xy
+        # coords (see draw_square) so shift by half a cell.
+        x0, y0 = self.world_rect.topleft
+        d = self.downsample
+        i0 = (self.world_limits.left - x0) // d
+        j0 = (self.world_limits.top - y0) // d
+        i1 = (self.world_limits.right - 1 - x0) // d + 1
+        j1 = (self.world_limits.bottom - 1 - y0) // d + 1
+        cropped = self.image.subsurface(Rect(i0, j0, i1 - i0, j1 - j0))
+        cropped_rect_xy = Rect(x0 + i0 * d, y0 + j0 * d, (i1 - i0) * d, (j1 - j0) * d)
+        u, v, width_u, height_v = transform.floatrect(cropped_rect_xy)
+        scaled = pygame.transform.scale(cropped, (math.ceil(width_u), math.ceil(height_v)))
+        surface.blit(scaled, (u - transform.scale / 2, v - transform.scale / 2))
 
         pygame.draw.rect(surface, Color("white"), viewport_rect_uv, 1)
         if debug:
-            world_rect_uv = transform.rect(world_rect_xy)
+            world_rect_uv = transform.rect(self.world_limits)
             pygame.draw.rect(surface, Color("yellow"), world_rect_uv, 1)
 
+    def refresh(self, cache: RenderCache, image_size: int):
+        """Redraw the chunks that have changed since the last refresh onto the cached bitmap."""
+        contents = cache.contents
+        if contents:
+            (xmin, xmax), (ymin, ymax) = cache.limits
+            self.world_limits = Rect(xmin, ymin, xmax - xmin + 1, ymax - ymin + 1)
+            if self.world_rect is None or not self.world_rect.contains(self.world_limits):
+                self.resize(contents, image_size)
+        else:
+            self.world_limits = None
+            if self.world_rect is None:
+                return
+
+        # Clear and redraw dirty chunks. If one pixel contains cells from more than one chunk,
+        # we have to redraw all the chunks that share it, so work in blocks.
+        chunk_size = contents.chunk_size
+        d = self.downsample
+        block_size = math.lcm(d, chunk_size)
+        chunks_per_block = block_size // chunk_size
+        pixels_per_block = block_size // d
+        dirty_blocks = {
+            (cx // chunks_per_block, cy // chunks_per_block)
+            for cx, cy in contents.dirty_chunks(self.stamps)
+        }
+        x0, y0 = self.world_rect.topleft
+        dirty_chunks = []
+        for bx, by in dirty_blocks:
+            i = (bx * block_size - x0) // d
+            j = (by * block_size - y0) // d
+            self.pixels[i : i + pixels_per_block, j : j + pixels_per_block] = self.background_color[
+                :3
+            ]
+            dirty_chunks += [
+                (cx, cy)
+                for cx in range(bx * chunks_per_block, (bx + 1) * chunks_per_block)
+                for cy in range(by * chunks_per_block, (by + 1) * chunks_per_block)
+            ]
+
+        xy, values = cache.cells_in_chunks(dirty_chunks)
+        ij = (xy - (x0, y0)) // d
+        self.pixels[ij[:, 0], ij[:, 1]] = self.get_colors(values)
+        pygame.surfarray.blit_array(self.image, self.pixels)
+        self.stamps = contents.stamps.copy()
+
+    def resize(self, contents: ChunkedMatrix | PackedMatrix, image_size: int):
+        """
+        Choose a new area to cache, big enough for the current world plus a margin. Downsample
+        if necessary so that the bitmap isn't much bigger than `image_size` pixels across.
+        """
+        x, y, width, height = self.world_limits.inflate(2 * self.margin, 2 * self.margin)
+        self.downsample = 1
+        while max(width, height) / self.downsample > image_size:
+            self.downsample *= 2
+
+        # align to blocks (see refresh)
+        block_size = math.lcm(self.downsample, contents.chunk_size)
+        left = x // block_size * block_size
+        top = y // block_size * block_size
+        right = -(-(x + width) // block_size) * block_size
+        bottom = -(-(y + height) // block_size) * block_size
+        self.world_rect = Rect(left, top, right - left, bottom - top)
+
+        size = (self.world_rect.width // self.downsample, self.world_rect.height // self.downsample)
+        self.pixels = blank_pixels(size, self.background_color)
+        self.image = Surface(size)
+        self.stamps = dict()  # everything needs redrawing
+
 
 class BitmapMinimap:
     """
@@ -246,19 +410,23 @@ class BitmapMinimap:
     background_color = Color("black")
 
     def draw(
-        self, surface: Surface, automaton: Automaton, viewport: FloatRect, debug: bool = False
+        self,
+        surface: Surface,
+        automaton: Automaton,
+        viewport: FloatRect,
+        debug: bool = False,
+        cache: RenderCache = None,
     ):
         surface.fill(self.background_color)
-        img = Surface(automaton.contents.size)
-        img.fill(self.background_color)
-        (x_min, _), (y_min, _) = automaton.contents.limits
-        for (x, y), age in automaton.contents.items():
-            color = Color("white")
-            x -= x_min
-            y -= y_min
-            img.set_at((x, y), color)
-
-        img = scale_image(img, self.scale)
+        xy, _ = (cache or RenderCache()).get(automaton.contents).arrays
+        if len(xy):
+            ij = xy - xy.min(axis=0)
+            pixels = blank_pixels(ij.max(axis=0) + 1, self.background_color)
+            pixels[ij[:, 0], ij[:, 1]] = Color("white")[:3]
+        else:
+            pixels = blank_pixels((0, 0), self.background_color)
+
+        img = scale_image(pygame.surfarray.make_surface(pixels), self.scale)
         if debug:
             pygame.draw.rect(img, Color("red"), img.get_rect(), 1)
 
@@ -1,12 +1,13 @@
 from robingame.utils import SparseMatrix, Coord
 
+from automata.chunked_matrix import ChunkedMatrix
 from automata.game_of_life import threshold
 
 
 class GameOfLifeAutomaton:
     """Implements Automaton"""
 
-    contents: SparseMatrix
+    contents: ChunkedMatrix
 
     # other state / game rules also stored on this class
     overpopulation_threshold: int
@@ -20,7 +21,7 @@ class GameOfLifeAutomaton:
         overpopulation_threshold=threshold.OVERPOPULATION,
         reproduction_threshold=threshold.REPRODUCTION,
     ):
-        self.contents = SparseMatrix(contents) or SparseMatrix()
+        self.contents = ChunkedMatrix(contents)
         self.underpopulation_threshold = underpopulation_threshold
         self.overpopulation_threshold = overpopulation_threshold
         self.reproduction_threshold = reproduction_threshold
@@ -38,7 +39,8 @@ class GameOfLifeAutomaton:
                 count = live_neighbours_matrix.get(neighbour, 0)
                 live_neighbours_matrix[neighbour] = count + 1
 
-        # sparse matrix to contain the live cells for the next iteration
+        # sparse matrix to contain the live cells for the next iteration. Index it once at the
+        # end, rather than on every insertion.
         new = SparseMatrix()
 
         # Iterate once over the live_neighbours_matrix, and use each cell's number of live
@@ -60,7 +62,7 @@ class GameOfLifeAutomaton:
                 if live_neighbours == self.reproduction_threshold:
                     new[cell] = 1
 
-        self.contents = new
+        self.contents = ChunkedMatrix(new)
 
     def neighbours(self, coord: Coord) -> tuple[Coord, ...]:
         """
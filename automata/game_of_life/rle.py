@@ -0,0 +1,145 @@
+"""
+Read and write patterns in the RLE format used by Golly and the LifeWiki, e.g. a glider:
+
+    #N Glider
+    x = 3, y = 3, rule = B3/S23
+    bob$2bo$3o!
+
+Cells are run-length encoded row by row: "b" is dead, "o" is alive, "$" ends a row and "!" ends
+the pattern; any of these can be preceded by a repeat count. Files are read and written a line
+at a time, and cells are expanded with numpy, so big patterns don't need a python object per
+cell until they're put into a matrix.
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+import numpy
+from robingame.utils import SparseMatrix
+
+from automata.game_of_life.rules import Rule
+from automata.utils import cells_to_arrays, arrays_to_cells
+
+HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?", re.I)
+TOKEN = re.compile(r"(\d*)([A-Za-z.$!])")
+LINE_LENGTH = 70  # the maximum line length recommended by the format
+
+
+def read_rle(file: str | Path | TextIO) -> tuple[numpy.ndarray, Rule | None]:
+    """
+    Read an RLE pattern. Returns an (n, 2) array of the live cells' xy coords, and the rule
+    from the header (if there is one). The top left of the pattern is (0, 0), unless the file
+    has a "#R" or "#P" line saying otherwise.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file) as f:
+            return read_rle(f)
+
+    x0 = y0 = 0
+    rule = None
+    lines = iter(file)
+    for line in lines:
+        line = line.strip()
+        if line.startswith(("#R", "#P")):
+            x0, y0 = map(int, line[2:].split()[:2])
+        elif line.startswith("#") or not line:
+            continue
+        elif match := HEADER.match(line):
+            rule = Rule.from_string(match.group(3)) if match.group(3) else None
+            break
+        else:
+            raise ValueError(f"Expected an RLE header like 'x = 3, y = 3', got {line!r}")
+
+    # each run of live cells is stored as (x, y, length), and only expanded at the end
+    runs = []
+    x = y = 0
+    for count, tag in _tokens(lines):
+        if tag == "!":
+            break
+        if tag == "$":
+            x = 0
+            y += count
+        elif tag in "b.":
+            x += count
+        else:
+            runs.append((x, y, count))
+            x += count
+
+    runs = numpy.array(runs, dtype=numpy.int64).reshape(-1, 3)
+    starts, ys, lengths = runs[:, 0], runs[:, 1], runs[:, 2]
+    # x of every cell = start of its run + position within the run
+    run_index = numpy.repeat(numpy.arange(len(runs)), lengths)
+    first_cell = numpy.cumsum(lengths) - lengths  # index of each run's first cell
+    position = numpy.arange(len(run_index)) - first_cell[run_index]
+    xy = numpy.stack([starts[run_index] + position, ys[run_index]], axis=1)
+    return xy + (x0, y0), rule
+
+
+def _tokens(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        for count, tag in TOKEN.findall(line):
+            yield int(count or 1), tag
+
+
+def load_rle(file: str | Path | TextIO, shift: tuple[int, int] = (0, 0)) -> SparseMatrix:
+    """Like patterns.load, but for RLE files. Cells have a value of 1."""
+    xy, _ = read_rle(file)
+    return SparseMatrix(arrays_to_cells(xy + shift, numpy.ones(len(xy), dtype=numpy.int64)))
+
+
+def write_rle(
+    file: str | Path | TextIO,
+    contents: SparseMatrix,
+    rule: Rule | str = None,
+    name: str = None,
+):
+    """
+    Write the cells in `contents` (any value counts as alive) as an RLE pattern. The pattern's
+    top left is recorded in a "#R" line, so that reading it back gives the same coords.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file, "w") as f:
+            return write_rle(f, contents, rule, name)
+
+    xy, _ = cells_to_arrays(contents)
+    if name:
+        file.write(f"#N {name}\n")
+    rule = f", rule = {rule}" if rule else ""
+    if not len(xy):
+        file.write(f"x = 0, y = 0{rule}\n!\n")
+        return
+    (xmin, ymin), (xmax, ymax) = xy.min(axis=0).tolist(), xy.max(axis=0).tolist()
+    file.write(f"#R {xmin} {ymin}\n")
+    file.write(f"x = {xmax - xmin + 1}, y = {ymax - ymin + 1}{rule}\n")
+
+    # sort by row then column, and find where runs of adjacent live cells start
+    xy = xy[numpy.lexsort((xy[:, 0], xy[:, 1]))] - (xmin, ymin)
+    xs, ys = xy[:, 0], xy[:, 1]
+    new_run = numpy.r_[True, (ys[1:] != ys[:-1]) | (xs[1:] != xs[:-1] + 1)]
+    starts = numpy.flatnonzero(new_run)
+    lengths = numpy.diff(numpy.r_[starts, len(xy)])
+
+    line = ""
+    x = y = 0
+    for run_x, run_y, length in zip(xs[starts].tolist(), ys[starts].tolist(), lengths.tolist()):
+        tokens = []
+        if run_y > y:
+            tokens.append(_token(run_y - y, "$"))
+            x, y = 0, run_y
+        if run_x > x:
+            tokens.append(_token(run_x - x, "b"))
+        tokens.append(_token(length, "o"))
+        x = run_x + length
+        for token in tokens:
+            if len(line) + len(token) > LINE_LENGTH:
+                file.write(line + "\n")
+                line = ""
+            line += token
+    file.write(line + "!\n")
+
+
+def _token(count: int, tag: str) -> str:
+    return f"{count}{tag}" if count > 1 else tag
@@ -5,11 +5,12 @@ from robingame.objects import Group, Entity
 from robingame.text.font import fonts
 
 from automata.backend import Backend
+from automata.cycles import CycleDetector
 from automata.frontend import DrawRectFrontend, sample_colormap, DrawRectMinimap
 from automata.input_handler import KeyboardHandler
 from automata.viewer import Viewer
 from . import patterns
-from .automaton import GameOfLifeAutomaton
+from .rules import Rule, RuleAutomaton
 
 
 class GameOfLifeScene(Entity):
@@ -31,6 +32,8 @@ class GameOfLifeScene(Entity):
     253 self-similar fractal growth
     363 snowflake like growth
     353 extremely slow growing, rippling edges (483)
+
+    To classify rules in bulk, see automata.game_of_life.sweep.
     """
 
     def __init__(self):
@@ -39,14 +42,18 @@ class GameOfLifeScene(Entity):
         self.child_groups += [self.children]
 
         game_of_life_backend = Backend(
-            automaton=GameOfLifeAutomaton(
-                underpopulation_threshold=3,
-                overpopulation_threshold=5,
-                reproduction_threshold=3,
+            automaton=RuleAutomaton(
+                rule=Rule.from_thresholds(
+                    underpopulation=3,
+                    overpopulation=5,
+                    reproduction=3,
+                ),
                 contents={
                     **patterns.load(patterns.BLOCK),
                 },
-            )
+            ),
+            # cell values are ages, which never repeat
+            cycle_detector=CycleDetector(use_values=False),
         )
         main_rect = Rect(10, 100, 500, 500)
         mini_rect = Rect(0, 0, 100, 100)
@@ -0,0 +1,158 @@
+"""
+Run many Game of Life rules on the same starting pattern and classify what happens, instead of
+watching each one in the GameOfLifeScene. Rules run in parallel worker processes and each
+result (including the population curve) is printed as a line of JSON. For example:
+
+    python -m automata.game_of_life.sweep --pattern BLOCK -n 300 > sweep.jsonl
+    python -m automata.game_of_life.sweep --rule B3/S23 --rule B36/S23 --pattern R_PENTOMINO
+"""
+
+import os
+
+# pygame is imported indirectly; keep its greeting out of the JSON output
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import partial
+from typing import Iterable, Iterator
+
+import numpy
+from robingame.utils import SparseMatrix
+
+from automata.cycles import CycleDetector
+from automata.game_of_life import patterns
+from automata.game_of_life.rules import Rule, RuleAutomaton
+from automata.utils import cells_to_arrays, pack, pack_offset, unpack
+
+# how much the population must grow over the second half of the run to count as "growing"
+GROWTH_FACTOR = 1.5
+
+
+@dataclass
+class SweepResult:
+    rule: str
+    classification: str  # extinct | static | periodic | moving | growing | active
+    period: int | None  # for static / periodic / moving patterns
+    translation: tuple[int, int] | None  # how far moving patterns move each period
+    generations: int  # how many generations were actually run
+    population: list[int]  # population before each generation, and at the end
+
+
+def run_rule(rule: Rule | str, contents: SparseMatrix, generations: int) -> SweepResult:
+    """
+    Run `rule` from `contents` for up to `generations`, stopping early if the pattern dies
+    out or starts repeating itself (in the same position, or moved).
+    """
+    automaton = RuleAutomaton(rule=rule)
+    rule = str(automaton.rule)
+    xy, _ = cells_to_arrays(contents)
+    initial = keys = numpy.sort(pack(xy))
+    ages = numpy.ones(len(keys), dtype=numpy.int64)
+    population = [len(keys)]
+    # ages never repeat, so only hash the coords. The pattern is deterministic, so a repeat
+    # doesn't need confirming by waiting for more periods -- but a matching hash could still be
+    # a collision, so the repeated generation is recomputed and its cells compared exactly.
+    detector = CycleDetector(use_values=False, max_period=generations, confirm_periods=0)
+    detector.reset(contents)
+
+    for generation in range(1, generations + 1):
+        keys, ages = automaton.step(keys, ages)
+        population.append(len(keys))
+        if not len(keys):
+            return SweepResult(rule, "extinct", None, None, generation, population)
+        if cycle := detector.record_arrays(unpack(keys), ages):
+            earlier = run_keys(automaton, initial, cycle.start)
+            if not numpy.array_equal(earlier + pack_offset(*cycle.translation), keys):
+                continue  # hash collision
+            if cycle.translation != (0, 0):
+                classification = "moving"
+            else:
+                classification = "static" if cycle.period == 1 else "periodic"
+            return SweepResult(
+                rule, classification, cycle.period, cycle.translation, generation, population
+            )
+
+    half = len(population) // 2
+    growing = population[-1] > GROWTH_FACTOR * max(population[: half + 1])
+    classification = "growing" if growing else "active"
+    return SweepResult(rule, classification, None, None, generations, population)
+
+
+def run_keys(automaton: RuleAutomaton, keys: numpy.ndarray, generations: int) -> numpy.ndarray:
+    """The packed keys of the live cells `generations` generations on from `keys`"""
+    ages = numpy.ones(len(keys), dtype=numpy.int64)
+    for _ in range(generations):
+        keys, ages = automaton.step(keys, ages)
+    return keys
+
+
+def sweep(
+    rules: Iterable[Rule | str],
+    contents: SparseMatrix,
+    generations: int,
+    processes: int = None,
+) -> Iterator[SweepResult]:
+    """
+    Run each of `rules` in a pool of worker processes (default: one per CPU). Results are
+    yielded in the same order as `rules`.
+    """
+    contents = SparseMatrix(contents)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(
+            partial(run_rule, contents=contents, generations=generations), rules, chunksize=4
+        )
+
+
+def threshold_rules() -> list[Rule]:
+    """
+    All the distinct rules that can be made from GameOfLifeAutomaton's (u, o, r) thresholds.
+    """
+    rules = {
+        Rule.from_thresholds(underpopulation, overpopulation, reproduction)
+        for underpopulation in range(9)
+        for overpopulation in range(underpopulation, 9)
+        for reproduction in range(1, 9)
+    }
+    return sorted(rules, key=str)
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    pattern_names = [
+        name
+        for name, value in vars(patterns).items()
+        if name.isupper() and isinstance(value, numpy.ndarray)
+    ]
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--rule",
+        dest="rules",
+        action="append",
+        help="rule string e.g. B3/S23 (repeatable). Default: every (u, o, r) threshold rule",
+    )
+    parser.add_argument("--pattern", choices=pattern_names, default="R_PENTOMINO")
+    parser.add_argument("-n", "--generations", type=int, default=200)
+    parser.add_argument("-j", "--processes", type=int, help="default: one per CPU")
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    rules = [Rule.from_string(rule) for rule in args.rules] if args.rules else threshold_rules()
+    contents = patterns.load(getattr(patterns, args.pattern))
+    file = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for result in sweep(rules, contents, args.generations, args.processes):
+            file.write(json.dumps(asdict(result)) + "\n")
+            file.flush()
+    finally:
+        if args.output:
+            file.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
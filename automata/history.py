@@ -0,0 +1,163 @@
+from collections import Counter, deque
+from dataclasses import dataclass
+
+from robingame.utils import SparseMatrix, Coord
+
+
+@dataclass
+class Diff:
+    """
+    The changes made to a SparseMatrix by one generation, stored the other way round so that
+    they can be undone.
+
+    births: coords of cells that were added. Remove these to undo.
+    deaths: {coord: value} of cells that were removed. Restore these to undo.
+    offset: value change shared by most surviving cells (e.g. +1 for cells that aged by 1).
+    changes: {coord: old_value} of surviving cells that did not change by `offset`.
+    """
+
+    births: tuple[Coord, ...]
+    deaths: dict[Coord, int]
+    changes: dict[Coord, int]
+    offset: int = 0
+
+    @classmethod
+    def between(cls, old: SparseMatrix, new: SparseMatrix) -> "Diff":
+        births = tuple(new.keys() - old.keys())
+        deaths = {coord: old[coord] for coord in old.keys() - new.keys()}
+        deltas = {
+            coord: new[coord] - value for coord, value in old.items() - new.items() if coord in new
+        }
+
+        # If most survivors changed by the same amount (like ageing in the game of life),
+        # store that amount once instead of storing every survivor.
+        offset = 0
+        if deltas:
+            num_survivors = len(new) - len(births)
+            num_unchanged = num_survivors - len(deltas)
+            common_delta, count = Counter(deltas.values()).most_common(1)[0]
+            if count > num_unchanged:
+                offset = common_delta
+
+        changes = {coord: new[coord] - delta for coord, delta in deltas.items() if delta != offset}
+        if offset and len(deltas) < len(new) - len(births):
+            # survivors that didn't change at all also need recording
+            changes.update(
+                (coord, value)
+                for coord, value in new.items()
+                if coord not in deltas and coord in old
+            )
+        return cls(births=births, deaths=deaths, changes=changes, offset=offset)
+
+    @property
+    def size(self) -> int:
+        """Number of cells stored"""
+        return len(self.births) + len(self.deaths) + len(self.changes)
+
+    def undo(self, contents: SparseMatrix):
+        """Undo the generation in-place"""
+        for coord in self.births:
+            del contents[coord]
+        if self.offset:
+            for coord in contents:
+                contents[coord] -= self.offset
+        contents.update(self.changes)
+        contents.update(self.deaths)
+
+
+class History:
+    """
+    Stores past generations of a SparseMatrix as a chain of Diffs, so memory scales with how
+    much changes per generation instead of with the size of the world.
+
+    Every `keyframe_interval` generations a full copy is also kept, so that rewinding many
+    generations can start from the nearest keyframe instead of undoing every Diff in between.
+    When the number of stored cells exceeds `max_cells`, the oldest generations are dropped.
+    Keyframes that would take up more than half of `max_cells` are not kept, because making room
+    for them would mean dropping (nearly) every Diff: worlds that big are rewound by undoing Diffs.
+    """
+
+    max_cells: int = 1_000_000
+    keyframe_interval: int = 100
+
+    generation: int  # generation of the most recent state
+    diffs: deque[Diff]  # diffs[-1] takes the most recent state back 1 generation
+    keyframes: dict[int, SparseMatrix]  # {generation: contents}
+    size: int  # number of cells stored
+
+    def __init__(self, max_cells: int = None, keyframe_interval: int = None):
+        if max_cells is not None:
+            self.max_cells = max_cells
+        if keyframe_interval is not None:
+            if keyframe_interval < 1:
+                raise ValueError(f"keyframe_interval must be at least 1, not {keyframe_interval}")
+            self.keyframe_interval = keyframe_interval
+        self.generation = 0
+        self.diffs = deque()
+        self.keyframes = dict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        """Number of generations that can be rewound"""
+        return len(self.diffs)
+
+    @property
+    def oldest_generation(self) -> int:
+        return self.generation - len(self.diffs)
+
+    def record(self, old: SparseMatrix, new: SparseMatrix) -> Diff:
+        """
+        Record the step from `old` to `new`, and return its Diff. `old` is kept as a keyframe if
+        one is due, so it shouldn't be mutated afterwards.
+        """
+        diff = Diff.between(old, new)
+        self.diffs.append(diff)
+        self.size += diff.size
+        if (
+            self.generation % self.keyframe_interval == 0
+            and self.generation not in self.keyframes
+            and len(old) <= self.max_cells // 2
+        ):
+            self.keyframes[self.generation] = old
+            self.size += len(old)
+        self.generation += 1
+        self.trim()
+        return diff
+
+    def rewind(self, contents: SparseMatrix, generations: int = 1) -> SparseMatrix:
+        """
+        Go back `generations` generations from `contents` (which should be the most recent
+        state), and forget the generations after that. Modifies `contents` in-place unless
+        starting from a keyframe.
+        """
+        target = max(self.oldest_generation, self.generation - generations)
+        keyframe_generation = min(
+            (gen for gen in self.keyframes if target <= gen < self.generation),
+            default=None,
+        )
+        if keyframe_generation is not None:
+            contents = type(contents)(self.keyframes[keyframe_generation])
+            self.drop_newer(keyframe_generation)
+
+        while self.generation > target:
+            self.drop_newer(self.generation - 1).undo(contents)
+        return contents
+
+    def drop_newer(self, generation: int) -> Diff:
+        """Forget all generations after `generation`. Return the last Diff dropped."""
+        diff = None
+        while self.generation > generation:
+            diff = self.diffs.pop()
+            self.size -= diff.size
+            self.generation -= 1
+            if keyframe := self.keyframes.pop(self.generation + 1, None):
+                self.size -= len(keyframe)
+        return diff
+
+    def trim(self):
+        """Drop the oldest generations until we are within the memory budget"""
+        while self.size > self.max_cells and self.diffs:
+            if keyframe := self.keyframes.pop(self.oldest_generation, None):
+                self.size -= len(keyframe)
+            diff = self.diffs.popleft()
+            self.size -= diff.size
@@ -1,11 +1,15 @@
+from pathlib import Path
 from typing import Protocol
 
 import pygame
 from robingame.input import EventQueue
 
 from automata.backend import Backend
+from automata.snapshot import save_snapshot, load_snapshot
 from automata.viewport_handler import ViewportHandler
 
+DATA_DIR = Path.home() / ".automata"
+
 
 class InputHandler(Protocol):
     def update(self, viewport_handler: ViewportHandler, backend: Backend):
@@ -15,8 +19,20 @@ class InputHandler(Protocol):
 class KeyboardHandler:
     """
     Implements Controller
+
+    F5 saves the automaton's contents (and its rule, if it has one) to `snapshot_path`, and F9
+    loads them again. F12 writes the profiler's trace (see automata.profiler) to `trace_path`.
+    Both files go in ~/.automata unless other paths are given, so that they don't depend on the
+    directory the game was started from.
     """
 
+    snapshot_path: Path
+    trace_path: Path
+
+    def __init__(self, snapshot_path: str | Path = None, trace_path: str | Path = None):
+        self.snapshot_path = Path(snapshot_path or DATA_DIR / "automata.snapshot")
+        self.trace_path = Path(trace_path or DATA_DIR / "automata_trace.json")
+
     def update(self, viewport_handler: ViewportHandler, backend: Backend):
         keys_down = pygame.key.get_pressed()
         if keys_down[pygame.K_e]:
@@ -49,3 +65,33 @@ class KeyboardHandler:
                     backend.iterations_per_update *= 2
                 if event.key == pygame.K_LEFT:
                     backend.iterations_per_update = max(1, backend.iterations_per_update // 2)
+                if event.key == pygame.K_F5:
+                    self.save(backend)
+                if event.key == pygame.K_F9 and self.snapshot_path.exists():
+                    self.load(backend)
+                if event.key == pygame.K_F12:
+                    self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+                    backend.profiler.dump_trace(self.trace_path)
+
+    def save(self, backend: Backend):
+        automaton = backend.automaton
+        metadata = {"rule": str(automaton.rule)} if hasattr(automaton, "rule") else {}
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        save_snapshot(self.snapshot_path, automaton.contents, **metadata)
+
+    def load(self, backend: Backend) -> bool:
+        """
+        Replace the automaton's contents with the snapshot's, and its rule with the snapshot's
+        rule. Refuses (and returns False) if the snapshot has a rule but the automaton doesn't
+        take one, e.g. a game of life snapshot in Langton's ant.
+        """
+        automaton = backend.automaton
+        snapshot = load_snapshot(self.snapshot_path)
+        rule = snapshot.metadata.get("rule")
+        if rule is not None:
+            if not hasattr(automaton, "set_rule"):
+                print(f"Not loading {self.snapshot_path}: it was saved with rule {rule}")
+                return False
+            automaton.set_rule(rule)
+        backend.set_contents(snapshot.to_matrix(type(automaton.contents)))
+        return True
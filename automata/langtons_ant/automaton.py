@@ -1,8 +1,21 @@
+import math
 from dataclasses import dataclass
 
 import numpy
+from pygame import Rect
 from robingame.utils import SparseMatrix, Coord
 
+from automata.chunked_matrix import ChunkedMatrix
+from automata.utils import cells_to_arrays, pack, unpack
+
+try:
+    from numba import njit
+except ImportError:  # optional; without it the same kernel runs (more slowly) in python
+    njit = None
+
+# grid value for cells that have never been visited; these aren't in `contents`
+EMPTY = -1
+
 
 @dataclass
 class Ant:
@@ -10,10 +23,10 @@ class Ant:
     xy: Coord
     facing: int
     directions = (
-        numpy.array([0, -1]),  # up
-        numpy.array([1, 0]),  # right
-        numpy.array([0, 1]),  # down
-        numpy.array([-1, 0]),  # left
+        (0, -1),  # up
+        (1, 0),  # right
+        (0, 1),  # down
+        (-1, 0),  # left
     )
 
     def iterate(self, contents: SparseMatrix):
@@ -32,25 +45,438 @@ class Ant:
         self.facing %= len(self.directions)
 
         # move to next square
-        self.xy = tuple(self.directions[self.facing] + self.xy)
+        x, y = self.xy
+        dx, dy = self.directions[self.facing]
+        self.xy = (x + dx, y + dy)
+
+
+def step_ants(
+    grid, xs, ys, facings, rule_ids, turns, lengths, steps, first_ant, x0, y0, touched, log, t
+):
+    """
+    Move all the ants `steps` times, starting with ant `first_ant`. Ant positions are indices
+    into `grid`. If an ant reaches the edge of the grid, stop early and return the step and ant
+    to resume from once the grid has grown; otherwise return (steps, 0). Also returns how many
+    cells were recorded in `touched`.
+
+    The xy coord of each cell written (grid[0, 0] is at (x0, y0)) is recorded in `touched`,
+    and, if `log` isn't empty,
+    (x, y, facing, colour) before each step is recorded in the ring buffer `log` at position
+    `t` (the global step count) onwards.
+
+    This is written so that it can be compiled with numba, but also runs on memoryviews in
+    plain python.
+    """
+    width = grid.shape[0]
+    height = grid.shape[1]
+    num_ants = len(xs)
+    log_size = len(log)
+    ant = first_ant
+    num_touched = 0
+    for step in range(steps):
+        while ant < num_ants:
+            x = xs[ant]
+            y = ys[ant]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                return step, ant, num_touched
+            rule = rule_ids[ant]
+            facing = facings[ant]
+            colour = grid[x, y]
+            if log_size:
+                row = (t + step) % log_size
+                log[row, 0] = x
+                log[row, 1] = y
+                log[row, 2] = facing
+                log[row, 3] = colour
+
+            # increment colour
+            if colour < 0:
+                colour = 0
+            colour = (colour % lengths[rule] + 1) % lengths[rule]
+            grid[x, y] = colour
+            touched[num_touched, 0] = x + x0
+            touched[num_touched, 1] = y + y0
+            num_touched += 1
+
+            # turn and move
+            facing = (facing + turns[rule, colour] + 4) % 4
+            facings[ant] = facing
+            if facing == 0:
+                ys[ant] = y - 1
+            elif facing == 1:
+                xs[ant] = x + 1
+            elif facing == 2:
+                ys[ant] = y + 1
+            else:
+                xs[ant] = x - 1
+            ant += 1
+        ant = 0
+    return steps, 0, num_touched
+
+
+if njit:
+    step_ants = njit(cache=True, nogil=True)(step_ants)
 
 
 class LangtonsAntAutomaton:
-    """Implements Automaton"""
+    """
+    Implements Automaton
+
+    The ants are stored as arrays rather than objects, and the colours are stored in a dense
+    numpy grid that grows as the ants explore, so that the inner loop (step_ants) only does
+    integer arithmetic. It is compiled with numba if that is installed. Afterwards, only the
+    cells that changed are copied to `contents`. If the grid would get too big (e.g. an ant
+    travelling a long way) it is re-centred on the ants; `contents` still has everything.
 
-    contents: SparseMatrix
+    If there's only one ant and it settles into a "highway" (a sequence of moves that repeats
+    while travelling into empty space) the remaining steps are extrapolated instead of being
+    simulated.
+    """
+
+    contents: ChunkedMatrix
 
     # other state / game rules also stored on this class
-    ants: list[Ant]
+    rulesets: list[str]
+    xs: numpy.ndarray  # grid indices of each ant
+    ys: numpy.ndarray
+    facings: numpy.ndarray
+    rule_ids: numpy.ndarray  # index into rulesets
+    turns: numpy.ndarray  # turns[rule_id, colour] is 1 (right) or -1 (left)
+    lengths: numpy.ndarray  # length of each ruleset
 
-    def __init__(self, contents=None, ants=None):
-        self.contents = contents or SparseMatrix()
-        self.ants = ants or []
+    grid: numpy.ndarray  # colour of each cell, or EMPTY
+    origin: Coord  # xy coord of grid[0, 0]
+    steps: int  # total number of ant-steps taken (by all ants, counting extrapolated ones)
+    log: numpy.ndarray  # ring buffer of (x, y, facing, colour) for the last few steps
+    logged: int  # how many entries in the log are valid
+    pending: list[numpy.ndarray]  # xy coords of cells that need copying to `contents`
+    complete: bool  # False if some of `contents` is outside the grid
 
-    def iterate(self):
-        for ant in self.ants:
-            ant.iterate(self.contents)
+    # settings
+    steps_per_iteration: int = 1
+    skip_highways: bool = True
+    max_highway_period: int = 512
+    highway_check_interval: int = 10_000  # steps between looking for a highway
+    max_grid_cells: int = 2**24
+
+    def __init__(self, contents=None, ants: list[Ant] = None):
+        self.contents = ChunkedMatrix(contents)
+        self.rulesets = []
+        self.xs = numpy.zeros(0, dtype=numpy.int64)
+        self.ys = numpy.zeros(0, dtype=numpy.int64)
+        self.facings = numpy.zeros(0, dtype=numpy.int64)
+        self.rule_ids = numpy.zeros(0, dtype=numpy.int64)
+        self.turns = numpy.zeros((0, 0), dtype=numpy.int64)
+        self.lengths = numpy.zeros(0, dtype=numpy.int64)
+        self.grid = numpy.full((64, 64), EMPTY, dtype=numpy.int16)
+        self.origin = (-32, -32)
+        self.steps = 0
+        self.log = numpy.zeros((2 * self.max_highway_period, 4), dtype=numpy.int64)
+        self.logged = 0
+        self.pending = []
+        self.complete = True
+        self._synced_stamps = {}
+        for ant in ants or []:
+            self.add_ant(ant.xy, ant.ruleset, ant.facing)
+
+    @property
+    def ants(self) -> list[Ant]:
+        """A snapshot of the ants' state"""
+        x0, y0 = self.origin
+        return [
+            Ant(ruleset=self.rulesets[rule_id], xy=(x + x0, y + y0), facing=facing)
+            for x, y, facing, rule_id in zip(
+                self.xs.tolist(), self.ys.tolist(), self.facings.tolist(), self.rule_ids.tolist()
+            )
+        ]
 
     def add_ant(self, xy: Coord, ruleset: str, facing: int):
-        ant = Ant(ruleset=ruleset, xy=xy, facing=facing)
-        self.ants.append(ant)
+        if ruleset not in self.rulesets:
+            self.rulesets.append(ruleset)
+            longest = max(map(len, self.rulesets))
+            self.turns = numpy.array(
+                [
+                    [1 if char == "r" else -1 for char in rules.ljust(longest)]
+                    for rules in self.rulesets
+                ]
+            )
+            self.lengths = numpy.array([len(rules) for rules in self.rulesets])
+        x, y = xy
+        x0, y0 = self.origin
+        self.xs = numpy.append(self.xs, x - x0)
+        self.ys = numpy.append(self.ys, y - y0)
+        self.facings = numpy.append(self.facings, facing % 4)
+        self.rule_ids = numpy.append(self.rule_ids, self.rulesets.index(ruleset))
+
+    def iterate(self):
+        self.sync()
+        self.run(self.steps_per_iteration)
+        self.flush()
+
+    def flush(self):
+        """Copy the cells that have changed from the grid to `contents`"""
+        if not self.pending:
+            return
+        xy = numpy.concatenate(self.pending)
+        self.pending = []
+        if len(xy) > 64:
+            # don't update the same cell lots of times
+            xy = unpack(numpy.unique(pack(xy)))
+        x0, y0 = self.origin
+        values = self.grid[xy[:, 0] - x0, xy[:, 1] - y0]
+        self.contents.update(zip(map(tuple, xy.tolist()), values.tolist()))
+        self._synced_stamps = self.contents.stamps.copy()
+
+    def sync(self):
+        """
+        Copy any chunks of `contents` that have been changed by someone else (e.g. rewinding
+        the history) into the grid.
+        """
+        if self.contents.stamps == self._synced_stamps:
+            return
+        size = self.contents.chunk_size
+        for cx, cy in self.contents.dirty_chunks(self._synced_stamps):
+            cells = self.contents.chunks.get((cx, cy), ())
+            if cells:
+                # if this fails, the cells are outside the grid and will be loaded when an ant
+                # gets near them
+                self.grow(cx * size, cy * size, (cx + 1) * size - 1, (cy + 1) * size - 1)
+            x0, y0 = self.origin
+            width, height = self.grid.shape
+            left, top = cx * size - x0, cy * size - y0
+            self.grid[max(left, 0) : max(left + size, 0), max(top, 0) : max(top + size, 0)] = EMPTY
+            for x, y in cells:
+                if 0 <= x - x0 < width and 0 <= y - y0 < height:
+                    self.grid[x - x0, y - y0] = self.contents[(x, y)]
+                else:
+                    self.complete = False
+        self._synced_stamps = self.contents.stamps.copy()
+        # the ant's history no longer matches the grid
+        self.logged = 0
+
+    def run(self, steps: int):
+        """
+        Move every ant `steps` times, skipping ahead along highways if possible. Changed cells
+        are added to self.pending.
+        """
+        skip_highways = self.skip_highways and len(self.xs) == 1
+        if not skip_highways:
+            self.logged = 0
+            self.run_chunk(steps, log=False)
+            return
+        while steps > 0:
+            # stop every so often to look for a highway
+            chunk = min(steps, self.highway_check_interval)
+            self.run_chunk(chunk, log=True)
+            steps -= chunk
+            if steps:
+                steps -= self.skip_highway(steps)
+
+    def run_chunk(self, steps: int, log: bool):
+        """
+        Call step_ants, making room in the grid whenever an ant reaches the edge.
+        """
+        first_ant = 0
+        num_ants = len(self.xs)
+        while steps:
+            # limit the size of the buffer
+            max_steps = min(steps, max(2**20 // max(num_ants, 1), 1))
+            buffer = numpy.empty((max_steps * num_ants, 2), dtype=numpy.int64)
+            args = (
+                self.grid,
+                self.xs,
+                self.ys,
+                self.facings,
+                self.rule_ids,
+                self.turns,
+                self.lengths,
+            )
+            extra = (buffer, self.log if log else self.log[:0])
+            if not njit:
+                # indexing memoryviews is much faster than indexing numpy arrays in python
+                args = tuple(map(memoryview, args))
+                extra = tuple(map(memoryview, extra))
+            x0, y0 = self.origin
+            done, next_ant, num_touched = step_ants(
+                *args, max_steps, first_ant, x0, y0, *extra, self.steps
+            )
+            touched = buffer[:num_touched]
+            if num_touched > 64:
+                touched = unpack(numpy.unique(pack(touched)))
+            self.pending.append(touched)
+            self.steps += num_touched
+            self.logged += num_touched if log else 0
+            steps -= done
+            first_ant = next_ant
+            if done < max_steps:
+                # an ant has reached the edge of the grid
+                x, y = self.xs[first_ant] + x0, self.ys[first_ant] + y0
+                if not self.grow(x, y, x, y):
+                    self.recentre()
+
+    def recentre(self):
+        """
+        When the grid can't grow any more, replace it with one centred on the ants. The cells
+        outside it are still in `contents`, so they can be loaded again if needed.
+        """
+        self.flush()
+        x0, y0 = self.origin
+        xs, ys = self.xs + x0, self.ys + y0
+        side = math.isqrt(self.max_grid_cells) // 2
+        if xs.max() - xs.min() >= side or ys.max() - ys.min() >= side:
+            raise MemoryError(f"The ants are too far apart to fit in {self.max_grid_cells} cells")
+        left = (xs.max() + xs.min()) // 2 - side // 2
+        top = (ys.max() + ys.min()) // 2 - side // 2
+
+        self.grid = numpy.full((side, side), EMPTY, dtype=self.grid.dtype)
+        xy, values = cells_to_arrays(self.contents.crop(Rect(left, top, side, side)))
+        self.grid[xy[:, 0] - left, xy[:, 1] - top] = values
+        self.shift(x0 - left, y0 - top)
+        self.origin = (int(left), int(top))
+        self.complete = False
+
+    def skip_highway(self, max_steps: int) -> int:
+        """
+        If the (only) ant is building a highway, extrapolate it for as many whole periods as
+        possible (up to `max_steps`) without running into any existing cells. Returns the number
+        of steps skipped.
+
+        The ant is on a highway with period P if, over the whole log, every step had the same
+        move (facing, and colour under the ant) as the step P before, and the same
+        displacement. That means every period is a translated copy of the one before, and will
+        keep being so as long as each cell the ant visits has either already been visited
+        within the log (so it was written by the highway), or is empty. The latest period tells
+        us which cells will be empty when the ant reaches them, so we just need to check that
+        their translations are empty too.
+        """
+        log_size = len(self.log)
+        logged = min(self.logged, log_size)
+        # oldest to newest, in xy coords
+        log = numpy.roll(self.log, -(self.steps % log_size), axis=0)[-logged:]
+        log[:, :2] += self.origin
+        moves = log[:, 2:]
+
+        for period in range(1, min(logged // 2, max_steps) + 1):
+            if (moves[period:] != moves[:-period]).any():
+                continue
+            displacement = log[period:, :2] - log[:-period, :2]
+            dx, dy = displacement[0]
+            if (dx, dy) != (0, 0) and (displacement == displacement[0]).all():
+                break
+        else:
+            return 0
+
+        # every cell that wasn't empty in the latest period must have been visited earlier in
+        # the log
+        _, first_visits, inverse = numpy.unique(
+            pack(log[:, :2]), return_index=True, return_inverse=True
+        )
+        revisited = first_visits[inverse] < numpy.arange(logged)
+        latest = log[-period:]
+        if ((latest[:, 3] != EMPTY) & ~revisited[-period:]).any():
+            return 0
+
+        # the empty cells from the latest period, translated by 1, 2, 3... displacements, must
+        # still be empty
+        # don't go further than a recentred grid could reach
+        side = math.isqrt(self.max_grid_cells) // 2
+        num_periods = min(max_steps // period, side // max(abs(dx), abs(dy)))
+        empty = latest[latest[:, 3] == EMPTY, :2]
+        visited = numpy.unique(latest[:, :2], axis=0)
+        (xmin, ymin), (xmax, ymax) = visited.min(axis=0), visited.max(axis=0)
+        while num_periods:
+            reach_x, reach_y = num_periods * dx, num_periods * dy
+            if self.grow(
+                xmin + min(dx, reach_x),
+                ymin + min(dy, reach_y),
+                xmax + max(dx, reach_x),
+                ymax + max(dy, reach_y),
+            ):
+                break
+            num_periods //= 2
+        else:
+            return 0
+        shifts = numpy.arange(1, num_periods + 1)[:, None, None] * (dx, dy)
+        ahead = visited[None, :, :] + shifts  # (num_periods, num_visited, 2)
+        x0, y0 = self.origin
+        if len(empty):
+            empty_ahead = empty[None, :, :] + shifts
+            cells = self.grid[empty_ahead[..., 0] - x0, empty_ahead[..., 1] - y0]
+            blocked = (cells != EMPTY).any(axis=1)
+            if blocked.any():
+                num_periods = int(blocked.argmax())
+                ahead = ahead[:num_periods]
+        if not num_periods:
+            return 0
+
+        # each period leaves behind a translated copy of the cells from the latest period.
+        # Later periods overwrite earlier ones, so keep the last write to each cell
+        values = self.grid[visited[:, 0] - x0, visited[:, 1] - y0]
+        values = numpy.broadcast_to(values, ahead.shape[:2]).ravel()
+        ahead = ahead.reshape(-1, 2)
+        flat, last = numpy.unique(self.to_flat(ahead)[::-1], return_index=True)
+        self.grid.ravel()[flat] = values[::-1][last]
+        self.pending.append(ahead)
+
+        skipped = num_periods * period
+        # the ant and its log move with the highway
+        self.shift(num_periods * dx, num_periods * dy)
+        # keep each log entry at the position of its (new) step number in the ring buffer
+        self.log = numpy.roll(self.log, skipped % log_size, axis=0)
+        self.steps += skipped
+        return skipped
+
+    def grow(self, xmin: int, ymin: int, xmax: int, ymax: int) -> bool:
+        """
+        Make sure the grid contains the xy coords from (xmin, ymin) to (xmax, ymax) inclusive,
+        at least doubling its size if it needs to grow. Returns False if that would make the
+        grid larger than max_grid_cells.
+        """
+        x0, y0 = self.origin
+        width, height = self.grid.shape
+        if xmin >= x0 and ymin >= y0 and xmax < x0 + width and ymax < y0 + height:
+            return True
+        left = min(xmin, x0)
+        top = min(ymin, y0)
+        right = max(xmax + 1, x0 + width)
+        bottom = max(ymax + 1, y0 + height)
+        # pad the side(s) that need to grow so that we don't have to do this too often
+        pad_x = max(width, right - left - width)
+        pad_y = max(height, bottom - top - height)
+        left -= pad_x if xmin < x0 else 0
+        right += pad_x if xmax >= x0 + width else 0
+        top -= pad_y if ymin < y0 else 0
+        bottom += pad_y if ymax >= y0 + height else 0
+        if (right - left) * (bottom - top) > self.max_grid_cells:
+            return False
+
+        grid = numpy.full((right - left, bottom - top), EMPTY, dtype=self.grid.dtype)
+        grid[x0 - left : x0 - left + width, y0 - top : y0 - top + height] = self.grid
+        if not self.complete:
+            # load any cells in the new strips around the old grid from `contents`
+            self.flush()
+            strips = [
+                Rect(left, top, x0 - left, bottom - top),
+                Rect(x0 + width, top, right - x0 - width, bottom - top),
+                Rect(x0, top, width, y0 - top),
+                Rect(x0, y0 + height, width, bottom - y0 - height),
+            ]
+            for strip in strips:
+                if strip.width and strip.height:
+                    xy, values = cells_to_arrays(self.contents.crop(strip))
+                    grid[xy[:, 0] - left, xy[:, 1] - top] = values
+        self.grid = grid
+        self.origin = (int(left), int(top))
+        self.shift(x0 - left, y0 - top)
+        return True
+
+    def shift(self, dx: int, dy: int):
+        """Shift everything that stores grid indices, when the grid's origin changes"""
+        self.xs += dx
+        self.ys += dy
+        self.log[:, :2] += (dx, dy)
+
+    def to_flat(self, xy: numpy.ndarray) -> numpy.ndarray:
+        """Convert an (n, 2) array of xy coords to flat grid indices"""
+        x0, y0 = self.origin
+        return (xy[:, 0] - x0) * self.grid.shape[1] + (xy[:, 1] - y0)
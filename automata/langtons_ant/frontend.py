@@ -6,6 +6,7 @@ from automata.frontend import (
     draw_circle,
 )
 from automata.langtons_ant.automaton import LangtonsAntAutomaton
+from automata.render_cache import RenderCache
 from automata.viewport_handler import FloatRect
 
 
@@ -16,9 +17,10 @@ class LangtonsAntFrontend(DrawRectFrontend):
         automaton: LangtonsAntAutomaton,
         viewport: FloatRect,
         debug: bool = False,
+        cache: RenderCache = None,
     ):
         """Also draw ants"""
-        super().draw(surface, automaton, viewport, debug)
+        super().draw(surface, automaton, viewport, debug, cache)
         image_rect_uv = surface.get_rect()
         transform = Transform(viewport, image_rect_uv)
         for ant in automaton.ants:
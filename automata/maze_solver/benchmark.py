@@ -0,0 +1,137 @@
+"""
+Headless benchmark for the maze solvers.
+
+Generates mazes with each of the generators, solves each one with each of the solvers, and
+prints a JSON report of nodes expanded, path length, wall-clock time and peak memory, so that
+the algorithms can be compared at scale and across commits. For example:
+
+    python -m automata.maze_solver.benchmark --size 1001 1001
+    python -m automata.maze_solver.benchmark --generator kruskal --solver astar --seed 0 1 2
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+
+import numpy
+
+from automata.benchmark import git_commit
+from automata.maze_solver.generators import GENERATORS
+from automata.maze_solver.solver import SOLVERS, Solution
+from automata.timer import Timer
+
+
+def time_solver(solver, grid: numpy.ndarray, repeats: int = 3) -> tuple[Solution, list[float]]:
+    """Solve `grid` `repeats` times; returns the solution and the time each solve took"""
+    times = []
+    for _ in range(repeats):
+        with Timer() as timer:
+            solution = solver(grid)
+        times.append(timer.time)
+    return solution, times
+
+
+def peak_memory(solver, grid: numpy.ndarray) -> int:
+    """The most memory allocated at once while solving `grid`, in bytes, from tracemalloc"""
+    tracemalloc.start()
+    try:
+        solver(grid)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(
+    generators: list[str],
+    solvers: list[str],
+    size: tuple[int, int] = (201, 201),
+    seeds: list[int] = (0,),
+    repeats: int = 3,
+    trace_memory: bool = True,
+) -> dict:
+    """
+    Time each of `solvers` on a maze from each of `generators` for each of `seeds`. Everything
+    is run once on a tiny maze first, so that compiling the kernels isn't included.
+    """
+    height, width = size
+    for name in generators:
+        GENERATORS[name](3, 3, seed=0)
+    for name in solvers:
+        SOLVERS[name](numpy.ones((3, 3), dtype=bool))
+
+    results = []
+    for generator in generators:
+        for seed in seeds:
+            with Timer() as timer:
+                grid = GENERATORS[generator](height, width, seed=seed)
+            generate_seconds = timer.time
+            for name in solvers:
+                solution, times = time_solver(SOLVERS[name], grid, repeats)
+                result = {
+                    "generator": generator,
+                    "seed": seed,
+                    "solver": name,
+                    "open_cells": int(grid.sum()),
+                    "generate_seconds": generate_seconds,
+                    "solved": solution.solved,
+                    "nodes_expanded": len(solution.explored),
+                    "path_length": len(solution.path),
+                    "best_ms": 1000 * min(times),
+                    "mean_ms": 1000 * numpy.mean(times),
+                }
+                if trace_memory:
+                    result["peak_traced_bytes"] = peak_memory(SOLVERS[name], grid)
+                results.append(result)
+    return {"size": [height, width], "results": results}
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--generator",
+        dest="generators",
+        action="append",
+        choices=GENERATORS,
+        help="maze generator (repeatable). Default: all of them",
+    )
+    parser.add_argument(
+        "--solver",
+        dest="solvers",
+        action="append",
+        choices=SOLVERS,
+        help="solver to time (repeatable). Default: all of them",
+    )
+    parser.add_argument("--size", type=int, nargs=2, default=(201, 201), metavar=("H", "W"))
+    parser.add_argument("--seed", dest="seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--repeats", type=int, default=3, help="solves per maze, for timing")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false")
+    parser.add_argument("-o", "--output", help="write the report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    args.generators = args.generators or list(GENERATORS)
+    args.solvers = args.solvers or list(SOLVERS)
+    report = run(
+        generators=args.generators,
+        solvers=args.solvers,
+        size=tuple(args.size),
+        seeds=args.seeds,
+        repeats=args.repeats,
+        trace_memory=args.trace_memory,
+    )
+    report["commit"] = git_commit()
+    report["args"] = {key: value for key, value in vars(args).items() if key != "output"}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+"""
+Procedural mazes, as boolean grids (True = open) for the solver module.
+
+- `recursive_backtracker`: a random depth first walk; long winding corridors and few branches
+- `kruskal`: random spanning tree built by merging sets of cells; lots of short dead ends
+- `random_fill`: randomly placed walls, with a path carved from the start to the goal
+
+The first two are "perfect" mazes: cells sit on the even rows and columns, and the walls between
+neighbouring cells are knocked down so that there is exactly one route between any two cells.
+For an even height or width the last row or column of cells is doubled up, so that the bottom
+right corner is always open. Every maze is connected: all its open cells can be reached from the
+top left, and the same seed always gives the same maze.
+
+The loops are written so that they can be compiled with numba, like the solver kernels. All the
+random numbers are drawn up front with numpy, so the compiled and python versions agree.
+"""
+
+import numpy
+
+from automata.maze_solver.solver import UNREACHABLE, distance_map
+
+try:
+    from numba import njit
+except ImportError:  # optional; without it the same kernels run (more slowly) in python
+    njit = None
+
+# (row, col) steps between neighbouring cells of a perfect maze
+DIRECTIONS = numpy.array([(0, 1), (1, 0), (0, -1), (-1, 0)], dtype=numpy.int64)
+
+
+def recursive_backtracker(height: int, width: int, seed: int = None) -> numpy.ndarray:
+    """A perfect maze carved by a random depth first walk (see backtrack)"""
+    rows, cols = _cells(height, width)
+    rng = numpy.random.default_rng(seed)
+    # the walk takes at most two steps per cell: one forwards into it, and one back out
+    choices = rng.random(2 * rows * cols)
+    grid = numpy.zeros((2 * rows - 1, 2 * cols - 1), dtype=bool)
+    backtrack(grid, rows, cols, DIRECTIONS, choices)
+    return _fit(grid, height, width)
+
+
+def kruskal(height: int, width: int, seed: int = None) -> numpy.ndarray:
+    """A perfect maze made by knocking down walls in random order (see join_sets)"""
+    rows, cols = _cells(height, width)
+    rng = numpy.random.default_rng(seed)
+    # every wall between horizontally or vertically neighbouring cells, as (cell, cell) indices
+    cell = numpy.arange(rows * cols).reshape(rows, cols)
+    edges = numpy.concatenate(
+        [
+            numpy.stack([cell[:, :-1].ravel(), cell[:, 1:].ravel()], axis=1),
+            numpy.stack([cell[:-1, :].ravel(), cell[1:, :].ravel()], axis=1),
+        ]
+    )
+    edges = edges[rng.permutation(len(edges))]
+    grid = numpy.zeros((2 * rows - 1, 2 * cols - 1), dtype=bool)
+    grid[::2, ::2] = True
+    join_sets(grid, cols, edges, numpy.arange(rows * cols))
+    return _fit(grid, height, width)
+
+
+def random_fill(height: int, width: int, density: float = 0.3, seed: int = None) -> numpy.ndarray:
+    """
+    Each cell is a wall with probability `density`. A random staircase of right and down steps
+    from the top left to the bottom right is then cleared, so there is always a way through,
+    and any open pockets that can't be reached from the top left are filled in.
+    """
+    rng = numpy.random.default_rng(seed)
+    grid = rng.random((height, width)) >= density
+    downs = rng.permutation(numpy.repeat([True, False], [height - 1, width - 1]))
+    path_rows = numpy.r_[0, numpy.cumsum(downs)]
+    path_cols = numpy.r_[0, numpy.cumsum(~downs)]
+    grid[path_rows, path_cols] = True
+    return distance_map(grid) != UNREACHABLE
+
+
+def backtrack(grid, rows, cols, directions, choices):
+    """
+    Walk from cell (0, 0) to a random unvisited neighbour, knocking down the wall between
+    them, and step back along the walk whenever there are none. `choices` are random numbers
+    in [0, 1) to pick neighbours with. Cell (r, c) is grid[2r, 2c].
+    """
+    stack = numpy.zeros(rows * cols, dtype=numpy.int64)
+    options = numpy.zeros(4, dtype=numpy.int64)
+    grid[0, 0] = True
+    depth = 1
+    step = 0
+    while depth:
+        cell = stack[depth - 1]
+        row = cell // cols
+        col = cell % cols
+        num_options = 0
+        for direction in range(4):
+            next_row = row + directions[direction, 0]
+            next_col = col + directions[direction, 1]
+            if 0 <= next_row < rows and 0 <= next_col < cols:
+                if not grid[2 * next_row, 2 * next_col]:
+                    options[num_options] = direction
+                    num_options += 1
+        if num_options == 0:
+            depth -= 1
+        else:
+            direction = options[int(choices[step] * num_options)]
+            next_row = row + directions[direction, 0]
+            next_col = col + directions[direction, 1]
+            grid[row + next_row, col + next_col] = True  # the wall between the two cells
+            grid[2 * next_row, 2 * next_col] = True
+            stack[depth] = next_row * cols + next_col
+            depth += 1
+        step += 1
+
+
+def join_sets(grid, cols, edges, parents):
+    """
+    Go through `edges` (pairs of cell indices) in order, knocking down the wall between the two
+    cells if they aren't already connected. Connected cells are tracked with a union-find
+    forest in `parents`.
+    """
+    for edge in range(len(edges)):
+        a = _root(parents, edges[edge, 0])
+        b = _root(parents, edges[edge, 1])
+        if a != b:
+            parents[a] = b
+            first = edges[edge, 0]
+            second = edges[edge, 1]
+            grid[first // cols + second // cols, first % cols + second % cols] = True
+
+
+def _root(parents, cell):
+    while parents[cell] != cell:
+        parents[cell] = parents[parents[cell]]  # path halving
+        cell = parents[cell]
+    return cell
+
+
+if njit:
+    backtrack = njit(cache=True, nogil=True)(backtrack)
+    _root = njit(cache=True, nogil=True)(_root)
+    join_sets = njit(cache=True, nogil=True)(join_sets)
+
+GENERATORS = {
+    "backtracker": recursive_backtracker,
+    "kruskal": kruskal,
+    "random-fill": random_fill,
+}
+
+
+def _cells(height: int, width: int) -> tuple[int, int]:
+    """How many rows and columns of cells fit in a maze of this size"""
+    if height < 1 or width < 1:
+        raise ValueError(f"Maze size must be positive, got {height}x{width}")
+    return (height + 1) // 2, (width + 1) // 2
+
+
+def _fit(grid: numpy.ndarray, height: int, width: int) -> numpy.ndarray:
+    """Double up the last row / column of `grid` if needed to make it height x width"""
+    if grid.shape[0] < height:
+        grid = numpy.concatenate([grid, grid[-1:]], axis=0)
+    if grid.shape[1] < width:
+        grid = numpy.concatenate([grid, grid[:, -1:]], axis=1)
+    return grid
@@ -1,8 +1,11 @@
-from pygame import Color
+import numpy
+import pygame.surfarray
+from pygame import Color, Rect
 from pygame.surface import Surface
 
-from robingame.objects import Entity, Group
+from robingame.objects import Entity
 from automata.maze_solver.game import MazeSolverGame
+from automata.maze_solver.solver import SOLVERS, Coord, Solution, breadth_first_search, parse_maze
 
 
 class NodeTypes:
@@ -12,65 +15,25 @@ class NodeTypes:
     EXPLORED = "░"
 
 
-class Cell(Entity):
-    color: tuple
-    maze: "Maze"
+WALL_COLOR = Color("black")
+EMPTY_COLOR = Color("gray")
+EXPLORED_COLOR = Color("orange")
+PATH_COLOR = Color("red")
 
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
-        self.x = col
-        self.y = row
-        super().__init__()
-
-    def draw(self, surface: Surface, debug: bool = False, color: tuple = None):
-        pixel_size = self.maze.scaling * 0.99
-        pixel = Surface((pixel_size, pixel_size))
-        color = color or self.color
-        pixel.fill(color[:3])
-        screen_x = self.maze.x + (self.x * self.maze.scaling)
-        screen_y = self.maze.y + (self.y * self.maze.scaling)
-        surface.blit(pixel, (screen_x, screen_y))
-        super().draw(surface, debug)
-
-
-class Node(Cell):
-    """Represents an empty (non wall) cell in a maze"""
-
-    row: int
-    col: int
-    neighbours: list
-    up: "Node" = None
-    down: "Node" = None
-    left: "Node" = None
-    right: "Node" = None
-    is_finish: bool = False
-    explored: bool = False
-
-    @property
-    def color(self):
-        return Color("orange") if self.explored else Color("gray")
-
-    @property
-    def neighbours(self):
-        """Prioritize going right and down"""
-        return list(filter(None, [self.right, self.down, self.left, self.up]))
+# Prioritize going right and down
+NEIGHBOUR_OFFSETS = ((0, 1), (1, 0), (0, -1), (-1, 0))
 
-    def __repr__(self) -> str:
-        return NodeTypes.EXPLORED if self.explored else NodeTypes.EMPTY
 
-    def __str__(self) -> str:
-        return self.__repr__()
-
-
-class Wall(Cell):
-    color = Color("black")
-
-    def __str__(self):
-        return NodeTypes.WALL
+class Maze(Entity):
+    """
+    Animates solving a maze. "dfs" explores one cell per update; "bfs" and "astar" are solved
+    in one go on a numpy grid (see solver.py), and the order they explored the maze in is then
+    replayed one step per update.
 
+    Cells are (row, col) coords into `grid` and `explored` rather than objects, so that setting
+    up a big maze doesn't mean creating (and updating) an entity per cell.
+    """
 
-class Maze(Entity):
     is_solved: bool = False
     game: MazeSolverGame
     scaling: int
@@ -78,173 +41,198 @@ class Maze(Entity):
     y: int
     algorithm: str = "dfs"
     parental_name = "maze"
+    grid: numpy.ndarray  # True where the maze is open
+    explored: numpy.ndarray  # True where the solver has been
+    path: list[Coord]
+    solution: Solution | None = None  # for the SOLVERS algorithms; computed on the first update
+    replayed: int = 0  # how many steps of the solution have been shown
+    image: Surface | None = None  # the whole maze as it was last drawn
+    changed: set[Coord]  # cells whose colour has changed since the last draw
+    drawn_path: set[Coord]  # cells that were drawn as part of the path
 
     def __init__(self, string, game, x=0, y=0, algorithm="dfs"):
         self.x = x
         self.y = y
         self.algorithm = algorithm
         self.game = game
-        self.nodes = Group()
-        self.walls = Group()
-        self.child_groups = [self.nodes, self.walls]
+        self.changed = set()
+        self.drawn_path = set()
 
-        self.rows = self.create_cells(string)
-        self.height = len(self.rows)
-        self.width = len(self.rows[0])
-        self.create_links()
+        self.grid = parse_maze(string)
+        self.height, self.width = self.grid.shape
+        self.explored = numpy.zeros_like(self.grid)
+        self.finish = (self.height - 1, self.width - 1)
 
         # the path taken through the maze -- start at the top left
-        self.path = list()
-        self.path.append(self.rows[0][0])
-
-        self.scaling = min(
-            self.game.window_width // 2 // self.width,
-            self.game.window_height // self.height,
+        self.path = [(0, 0)]
+
+        self.scaling = max(
+            1,
+            min(
+                self.game.window_width // 2 // self.width,
+                self.game.window_height // self.height,
+            ),
         )
         super().__init__()
 
-    def create_cells(self, string):
-        rows = [
-            [
-                Node(rr, cc) if cell != NodeTypes.WALL else Wall(rr, cc)
-                for cc, cell in enumerate(row)
-            ]
-            for rr, row in enumerate(string.split("\n"))
+    def neighbours(self, cell: Coord) -> list[Coord]:
+        """The open cells next to `cell`"""
+        row, col = cell
+        return [
+            (row + dr, col + dc)
+            for dr, dc in NEIGHBOUR_OFFSETS
+            if 0 <= row + dr < self.height
+            and 0 <= col + dc < self.width
+            and self.grid[row + dr, col + dc]
         ]
-        return rows
-
-    def create_links(self):
-        """Link each cell to its neighbours"""
-        for rr, row in enumerate(self.rows):
-            for cc, cell in enumerate(row):
-                if isinstance(cell, Wall):
-                    self.add_walls(cell)
-                    continue  # walls don't have links
-
-                self.add_nodes(cell)
-                if (rr == self.height - 1) and (cc == self.width - 1):
-                    cell.is_finish = True  # this is the end of the maze
-
-                # link with node below
-                try:
-                    node_below = self.rows[rr + 1][cc]
-                    if isinstance(node_below, Node):
-                        cell.down = node_below
-                        node_below.up = cell
-                except IndexError:
-                    pass
-
-                # link with node to the right
-                try:
-                    node_right = self.rows[rr][cc + 1]
-                    if isinstance(node_right, Node):
-                        cell.right = node_right
-                        node_right.left = cell
-                except IndexError:
-                    pass
-
-    def add_nodes(self, *nodes):
-        self.add_to_group(*nodes, group=self.nodes)
-
-    def add_walls(self, *walls):
-        self.add_to_group(*walls, group=self.walls)
+
+    def explore(self, *cells: Coord):
+        for cell in cells:
+            if not self.explored[cell]:
+                self.explored[cell] = True
+                self.changed.add(cell)  # so that the maze redraws it
 
     def find_path(self, row=0, col=0):
         return self.depth_first_search(row, col)
 
-    def breadth_first_search_step(self):
-        for node in self.path:
-            node.explored = True
-        self.path = list({n for node in self.path for n in node.neighbours if not n.explored})
-        if any(node.is_finish for node in self.path):
-            self.is_solved = True
+    def replay_step(self):
+        """Show the next step of the solution: the cells explored in it are the current path"""
+        if self.solution is None:
+            self.solution = SOLVERS[self.algorithm](self.grid)
+        steps = self.solution.steps
+        if self.replayed < len(steps):
+            first = steps[self.replayed - 1] if self.replayed else 0
+            explored = self.solution.explored[first : steps[self.replayed]]
+            self.path = list(map(tuple, explored.tolist()))
+            self.explore(*self.path)
+            self.replayed += 1
+        if self.replayed == len(steps):
+            self.path = list(map(tuple, self.solution.path.tolist()))
+            self.is_solved = True  # nothing left to show, even if there was no way through
 
     def breadth_first_search(self, row=0, col=0):
-        """Get the set of open cells that are contiguous with the starting point."""
-        path = {(row, col)}
-        edge = {*path}
-        while True:
-            path_size = len(path)
-            new_cells = set()
-            for cell in edge:
-                adjacent = self.adjacent_empty(*cell)
-                new_cells = new_cells.union(adjacent)
-            edge = new_cells - path
-            path = path.union(new_cells)  # add new cells to path
-            if len(path) == path_size or ((self.height - 1, self.width - 1) in path):
-                break
-        return path
+        """Get the set of open cells explored on the way from the starting point to the finish."""
+        solution = breadth_first_search(self.grid, start=(row, col))
+        return set(map(tuple, solution.explored.tolist()))
 
     def depth_first_search_step(self):
         if not self.path:  # we backtracked all the way to the beginning. Not solvable.
             return  # not solvable
-        node = self.path[-1]
-        node.explored = True
-        if not node.neighbours:
+        cell = self.path[-1]
+        self.explore(cell)
+        neighbours = self.neighbours(cell)
+        if not neighbours:
             return  # not solvable
         # if all neighbours are visited, this is a dead end. Backtrack.
-        if all(n.explored for n in node.neighbours):
+        if all(self.explored[n] for n in neighbours):
             self.path.pop()
             return  # continue
 
         # otherwise, get the first unvisited neighbour
-        node = next(n for n in node.neighbours if not n.explored)
-        node.explored = True
-        self.path.append(node)
+        cell = next(n for n in neighbours if not self.explored[n])
+        self.explore(cell)
+        self.path.append(cell)
 
         # win condition -- quit early
-        if node.is_finish:
+        if cell == self.finish:
             self.is_solved = True
 
     def depth_first_search(self, row=0, col=0):
-        node = self.rows[row][col]
-        node.explored = True
-        self.path.append(node)
+        cell = (row, col)
+        self.explore(cell)
+        self.path.append(cell)
 
-        for _ in range(5000):
+        while True:
             if not self.path:  # we backtracked all the way to the beginning. Not solvable.
                 return self.path
-            node = self.path[-1]
-            if not node.neighbours:
+            cell = self.path[-1]
+            neighbours = self.neighbours(cell)
+            if not neighbours:
                 break
             # if all neighbours are visited, this is a dead end. Backtrack.
-            if all(n.explored for n in node.neighbours):
+            if all(self.explored[n] for n in neighbours):
                 self.path.pop()
                 continue
 
             # otherwise, get the first unvisited neighbour
-            node = next(n for n in node.neighbours if not n.explored)
-            node.explored = True
-            self.path.append(node)
+            cell = next(n for n in neighbours if not self.explored[n])
+            self.explore(cell)
+            self.path.append(cell)
 
             # win condition -- quit early
-            if node.is_finish:
+            if cell == self.finish:
                 self.is_solved = True
                 break
         return self.path
 
     def string(self, path):
-        template = [list(map(str, row)) for row in self.rows]
-        for node in path:
-            template[node.row][node.col] = NodeTypes.PATH
+        template = numpy.where(
+            self.grid,
+            numpy.where(self.explored, NodeTypes.EXPLORED, NodeTypes.EMPTY),
+            NodeTypes.WALL,
+        )
+        for cell in path:
+            template[cell] = NodeTypes.PATH
         return "\n".join("".join(row) for row in template)
 
     def can_find_path(self, row=0, col=0):
-        path = self.find_path(row, col)
-        return (0, 0) in path and (self.height - 1, self.width - 1) in path
+        return breadth_first_search(self.grid, start=(row, col)).solved
 
     def update(self):
         if self.is_solved:
             return
         if self.algorithm == "dfs":
             self.depth_first_search_step()
-        elif self.algorithm == "bfs":
-            self.breadth_first_search_step()
+        elif self.algorithm in SOLVERS:
+            self.replay_step()
         else:
             raise Exception("I got no algorithm")
         super().update()
 
+    def cell_color(self, cell: Coord) -> Color:
+        if not self.grid[cell]:
+            return WALL_COLOR
+        return EXPLORED_COLOR if self.explored[cell] else EMPTY_COLOR
+
+    @property
+    def cell_size(self) -> int:
+        """Cells are a bit smaller than the grid spacing"""
+        return max(1, int(self.scaling * 0.99))
+
+    def cell_rect(self, row: int, col: int) -> Rect:
+        """Where a cell is drawn on self.image"""
+        return Rect(col * self.scaling, row * self.scaling, self.cell_size, self.cell_size)
+
+    def render(self) -> Surface:
+        """
+        Draw every cell onto a new surface. The cells' colours are worked out as an array and
+        scaled up to pixels with numpy, rather than filling each cell's rect.
+        """
+        colors = numpy.array([WALL_COLOR[:3], EMPTY_COLOR[:3], EXPLORED_COLOR[:3]], numpy.uint8)
+        cells = colors[self.grid.astype(int) + (self.grid & self.explored)]
+        pixels = cells.repeat(self.scaling, axis=0).repeat(self.scaling, axis=1)
+        # the gap between neighbouring cells (see cell_rect) shows the background
+        gap = numpy.arange(self.scaling) >= self.cell_size
+        pixels[numpy.tile(gap, self.height)] = self.game.screen_color[:3]
+        pixels[:, numpy.tile(gap, self.width)] = self.game.screen_color[:3]
+        image = Surface((self.width * self.scaling, self.height * self.scaling))
+        pygame.surfarray.blit_array(image, pixels.transpose(1, 0, 2))  # surfarrays are (x, y)
+        return image
+
     def draw(self, surface: Surface, debug: bool = False):
-        super().draw(surface, debug)
-        for node in self.path:
-            node.draw(surface, color=Color("red"))
+        """
+        The maze is rendered once, and after that only the cells that have been explored or
+        have joined / left the path since the last frame are redrawn.
+        """
+        path = set(self.path)
+        if self.image is None:
+            self.image = self.render()
+            changed = path
+        else:
+            changed = self.changed | (path ^ self.drawn_path)
+        for cell in changed:
+            color = PATH_COLOR if cell in path else self.cell_color(cell)
+            self.image.fill(color[:3], self.cell_rect(*cell))
+        self.changed.clear()
+        self.drawn_path = path
+        surface.blit(self.image, (self.x, self.y))
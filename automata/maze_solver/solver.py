@@ -0,0 +1,283 @@
+"""
+Maze solving on a numpy boolean grid (True = open, False = wall), instead of an object per cell.
+
+- `distance_map`: the number of steps from the start to every open cell
+- `breadth_first_search`: shortest path, exploring the maze in rings of equal distance
+- `a_star`: shortest path, exploring the most promising cells first (Manhattan heuristic)
+
+The grid is padded with a border of walls and flattened, so a cell's neighbours are always at
+fixed offsets from its index and never need bounds checks. The search kernels are plain loops
+that are compiled with numba if it is installed. Without numba, BFS expands each ring as a
+handful of array operations instead, and A* runs in python with heapq.
+
+Every search records the order it explored the cells in, so that the animated Maze can replay
+it (see Solution.steps).
+"""
+
+import heapq
+from dataclasses import dataclass
+
+import numpy
+
+try:
+    from numba import njit
+except ImportError:  # optional; without it the same kernels run (more slowly) in python
+    njit = None
+
+WALL = "W"
+UNREACHABLE = -1  # distance of walls and cells that can't be reached from the start
+
+Coord = tuple[int, int]  # (row, col)
+
+
+@dataclass
+class Solution:
+    path: numpy.ndarray  # (n, 2) (row, col) coords from start to goal; empty if unsolvable
+    explored: numpy.ndarray  # (m, 2) (row, col) coords in the order they were explored
+    steps: numpy.ndarray  # explored[steps[i - 1]:steps[i]] were explored in step i
+    distances: numpy.ndarray | None = None  # BFS only: steps from the start, or UNREACHABLE
+
+    @property
+    def solved(self) -> bool:
+        return len(self.path) > 0
+
+
+def parse_maze(string: str) -> numpy.ndarray:
+    """
+    Convert a maze like "..W\\nW.." into a boolean grid where True is open. Anything except WALL
+    is open; short rows are padded with walls.
+    """
+    rows = string.split("\n")
+    width = max(map(len, rows))
+    chars = numpy.array([list(row.ljust(width, WALL)) for row in rows]).reshape(len(rows), width)
+    return chars != WALL
+
+
+def distance_map(grid: numpy.ndarray, start: Coord = (0, 0)) -> numpy.ndarray:
+    """The number of steps from `start` to each cell of `grid`, or UNREACHABLE"""
+    return _breadth_first(grid, start, goal=None).distances
+
+
+def breadth_first_search(
+    grid: numpy.ndarray, start: Coord = (0, 0), goal: Coord = None
+) -> Solution:
+    """
+    Shortest path from `start` to `goal` (by default the bottom right corner). Each step of the
+    solution is one ring of cells at the same distance from the start. Solution.distances has
+    the distances of the cells explored before reaching the goal.
+    """
+    return _breadth_first(grid, start, goal or _corner(grid))
+
+
+def a_star(grid: numpy.ndarray, start: Coord = (0, 0), goal: Coord = None) -> Solution:
+    """
+    Shortest path from `start` to `goal` (by default the bottom right corner), exploring the cell
+    with the lowest (distance so far + Manhattan distance to the goal) first, using a binary
+    heap. Ties go to the cell furthest from the start, which in a maze is usually the one
+    heading down a corridor. Each step of the solution is one cell.
+    """
+    padded, start_index, goal_index = _prepare(grid, start, goal or _corner(grid))
+    width = padded.shape[1]
+    parents = numpy.full(padded.size, -1, dtype=numpy.int64)
+    order = numpy.zeros(padded.size, dtype=numpy.int64)
+    if start_index < 0 or goal_index < 0:
+        explored = 0
+    else:
+        explored = astar_kernel(
+            padded.ravel(), _offsets(width), width, start_index, goal_index, parents, order
+        )
+    return Solution(
+        path=_path(parents, start_index, goal_index, width),
+        explored=_coords(order[:explored], width),
+        steps=numpy.arange(1, explored + 1),
+    )
+
+
+def _breadth_first(grid: numpy.ndarray, start: Coord, goal: Coord | None) -> Solution:
+    """Breadth first search towards `goal`, or of everything reachable if `goal` is None"""
+    padded, start_index, goal_index = _prepare(grid, start, goal)
+    width = padded.shape[1]
+    distances = numpy.full(padded.size, UNREACHABLE, dtype=numpy.int64)
+    parents = numpy.full(padded.size, -1, dtype=numpy.int64)
+    order = numpy.zeros(padded.size, dtype=numpy.int64)
+    if start_index < 0:
+        explored = 0
+    else:
+        explored = bfs_kernel(
+            padded.ravel(), _offsets(width), start_index, goal_index, distances, parents, order
+        )
+    order = order[:explored]
+    # rings are contiguous in `order`, so each step ends where the next distance starts
+    steps = numpy.flatnonzero(numpy.diff(distances[order])) + 1
+    steps = numpy.r_[steps, explored] if explored else steps
+    return Solution(
+        path=_path(parents, start_index, goal_index, width),
+        explored=_coords(order, width),
+        steps=steps,
+        distances=_unpad(distances, padded.shape),
+    )
+
+
+def bfs_queue(is_open, offsets, start, goal, distances, parents, order):
+    """
+    Breadth first search from `start`, one cell at a time from a queue, stopping at `goal`
+    (or when everything reachable has been explored if `goal` is -1). Fills in `distances`,
+    `parents` and the exploration `order`, and returns how many cells were explored. `is_open`
+    is the flattened padded grid; it is read only.
+    """
+    distances[start] = 0
+    order[0] = start
+    head = 0
+    tail = 1
+    while head < tail:
+        cell = order[head]
+        head += 1
+        if cell == goal:
+            return head
+        for offset in offsets:
+            neighbour = cell + offset
+            if is_open[neighbour] and distances[neighbour] < 0:
+                distances[neighbour] = distances[cell] + 1
+                parents[neighbour] = cell
+                order[tail] = neighbour
+                tail += 1
+    return tail
+
+
+def bfs_frontier(is_open, offsets, start, goal, distances, parents, order):
+    """
+    The same as bfs_queue, but expanding a whole ring of cells at once with array operations,
+    for when numba isn't there to make the loop fast.
+    """
+    unvisited = is_open.copy()
+    unvisited[start] = False
+    distances[start] = 0
+    order[0] = start
+    frontier = numpy.array([start])
+    claim = numpy.zeros(len(is_open), dtype=numpy.int64)
+    explored = 1
+    distance = 0
+    while len(frontier) and not (goal >= 0 and distances[goal] >= 0):
+        distance += 1
+        sources = numpy.repeat(frontier, len(offsets))
+        neighbours = sources + numpy.tile(offsets, len(frontier))
+        keep = unvisited[neighbours]
+        sources, neighbours = sources[keep], neighbours[keep]
+        # a cell reached from two sides appears twice; keep only the copy whose claim stuck
+        candidates = numpy.arange(len(neighbours))
+        claim[neighbours] = candidates
+        keep = claim[neighbours] == candidates
+        sources, frontier = sources[keep], neighbours[keep]
+
+        unvisited[frontier] = False
+        distances[frontier] = distance
+        parents[frontier] = sources
+        order[explored : explored + len(frontier)] = frontier
+        explored += len(frontier)
+    if goal >= 0 and distances[goal] >= 0:
+        # like bfs_queue, stop counting at the goal
+        explored = int(numpy.flatnonzero(order[:explored] == goal)[0]) + 1
+    return explored
+
+
+def astar_kernel(is_open, offsets, width, start, goal, parents, order):
+    """
+    A* from `start` to `goal`. Fills in `parents` and the exploration `order`, and returns how
+    many cells were explored.
+    """
+    goal_row = goal // width
+    goal_col = goal % width
+    costs = numpy.full(len(is_open), -1, dtype=numpy.int64)  # best distance from start so far
+    done = numpy.zeros(len(is_open), dtype=numpy.bool_)
+    costs[start] = 0
+    # (estimated total, -distance from start, cell)
+    heap = [(abs(start // width - goal_row) + abs(start % width - goal_col), 0, start)]
+    explored = 0
+    while heap:
+        _, negative_cost, cell = heapq.heappop(heap)
+        if done[cell]:
+            continue  # already explored by a shorter route
+        done[cell] = True
+        order[explored] = cell
+        explored += 1
+        if cell == goal:
+            break
+        cost = -negative_cost + 1
+        for offset in offsets:
+            neighbour = cell + offset
+            if is_open[neighbour] and not done[neighbour]:
+                if costs[neighbour] < 0 or cost < costs[neighbour]:
+                    costs[neighbour] = cost
+                    parents[neighbour] = cell
+                    estimate = abs(neighbour // width - goal_row) + abs(
+                        neighbour % width - goal_col
+                    )
+                    heapq.heappush(heap, (cost + estimate, -cost, neighbour))
+    return explored
+
+
+def trace_path(parents, start, goal, path):
+    """Follow `parents` back from `goal` to `start`, filling `path` backwards. Returns length."""
+    length = 0
+    cell = goal
+    while cell != start:
+        if cell < 0:
+            return 0  # the goal was never reached
+        path[len(path) - 1 - length] = cell
+        length += 1
+        cell = parents[cell]
+    path[len(path) - 1 - length] = start
+    return length + 1
+
+
+if njit:
+    bfs_kernel = njit(cache=True, nogil=True)(bfs_queue)
+    astar_kernel = njit(cache=True, nogil=True)(astar_kernel)
+    trace_path = njit(cache=True, nogil=True)(trace_path)
+else:
+    bfs_kernel = bfs_frontier
+
+
+# algorithms that the Maze can replay, and that the benchmark times
+SOLVERS = {"bfs": breadth_first_search, "astar": a_star}
+
+
+def _corner(grid: numpy.ndarray) -> Coord:
+    return grid.shape[0] - 1, grid.shape[1] - 1
+
+
+def _prepare(grid: numpy.ndarray, start: Coord, goal: Coord | None) -> tuple:
+    """Pad `grid` with walls, and find the flat indices of start and goal (-1 if not open)"""
+    padded = numpy.pad(numpy.asarray(grid, dtype=bool), 1, constant_values=False)
+    return padded, _index(padded, start), _index(padded, goal)
+
+
+def _index(padded: numpy.ndarray, coord: Coord | None) -> int:
+    if coord is None:
+        return -1
+    row, col = coord[0] + 1, coord[1] + 1
+    if not (0 < row < padded.shape[0] - 1 and 0 < col < padded.shape[1] - 1):
+        return -1
+    return row * padded.shape[1] + col if padded[row, col] else -1
+
+
+def _offsets(width: int) -> numpy.ndarray:
+    """Flat index offsets to the neighbours: right, down, left, up"""
+    return numpy.array([1, width, -1, -width], dtype=numpy.int64)
+
+
+def _coords(indices: numpy.ndarray, width: int) -> numpy.ndarray:
+    """(row, col) in the unpadded grid of each flat index in the padded grid"""
+    return numpy.stack([indices // width - 1, indices % width - 1], axis=1)
+
+
+def _unpad(flat: numpy.ndarray, shape: tuple[int, int]) -> numpy.ndarray:
+    return flat.reshape(shape)[1:-1, 1:-1].copy()
+
+
+def _path(parents: numpy.ndarray, start: int, goal: int, width: int) -> numpy.ndarray:
+    if start < 0 or goal < 0:
+        return numpy.zeros((0, 2), dtype=numpy.int64)
+    path = numpy.zeros(len(parents), dtype=numpy.int64)
+    length = trace_path(parents, start, goal, path)
+    return _coords(path[len(path) - length :], width)
@@ -0,0 +1,310 @@
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator
+
+import numpy
+from pygame import Rect
+from robingame.utils import SparseMatrix, Coord
+
+from automata.chunked_matrix import ChunkedMatrix, _stamps
+from automata.utils import cells_to_arrays, arrays_to_cells, pack, unpack, X_STRIDE, Y_OFFSET
+
+# marks an unused slot. This is pack((-2**31, -2**31)), so that coord can't be stored.
+EMPTY_KEY = numpy.iinfo(numpy.int64).min
+# Fibonacci hashing: multiply by 2**64 / golden ratio and keep the top bits
+HASH_MULTIPLIER = numpy.uint64(0x9E3779B97F4A7C15)
+MASK_64 = 2**64 - 1
+
+
+class PackedMatrix(MutableMapping):
+    """
+    A compact alternative to SparseMatrix / ChunkedMatrix for integer grids.
+
+    Instead of a dict of tuples, the cells are stored in an open-addressed hash table made of
+    two numpy arrays: the xy coords packed into one int64 (see automata.utils.pack), and the
+    values. That takes ~30 bytes per cell instead of ~200. Single cells can be read and
+    written like a dict, but the real speed-up comes from the array methods (from_arrays,
+    to_arrays, update_arrays), which don't loop over cells in python.
+
+    Provides the same extras as ChunkedMatrix (limits, size, crop, stamps etc.) so that it
+    can be used as Automaton.contents. `limits` is updated as cells are added, and only
+    recalculated after removing a cell on the edge.
+    """
+
+    chunk_size: int = 16  # only used for stamps
+    max_load: float = 0.7  # grow the table when it gets this full
+    min_capacity: int = 16
+
+    slots: numpy.ndarray  # packed coords, or EMPTY_KEY
+    data: numpy.ndarray  # values
+    stamps: dict[Coord, int]  # {chunk coord: stamp}; see ChunkedMatrix
+    _len: int
+    _limits: list[int] | None  # [xmin, xmax, ymin, ymax], or None if it needs recalculating
+
+    def __init__(self, contents: dict[Coord, int] | Iterable = None, dtype=numpy.int32):
+        self.slots = numpy.full(self.min_capacity, EMPTY_KEY, dtype=numpy.int64)
+        self.data = numpy.zeros(self.min_capacity, dtype=dtype)
+        self.stamps = dict()
+        self._len = 0
+        self._limits = None
+        if contents:
+            self.update(contents)
+
+    @classmethod
+    def from_arrays(cls, xy: numpy.ndarray, values: numpy.ndarray, dtype=numpy.int32):
+        new = cls(dtype=dtype)
+        new.update_arrays(xy, values)
+        return new
+
+    # ================ array interface ================
+
+    def to_arrays(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Same as automata.utils.cells_to_arrays, but much faster"""
+        used = self.slots != EMPTY_KEY
+        return unpack(self.slots[used]), self.data[used].astype(numpy.int64)
+
+    def update_arrays(self, xy: numpy.ndarray, values: numpy.ndarray):
+        """Set the value of each coord in the (n, 2) array `xy` to the matching `values`."""
+        keys = pack(xy)
+        if len(keys) == 0:
+            return
+        values = numpy.asarray(values)
+        # if a coord appears more than once, the last value wins (like dict.update). Checking
+        # with a plain sort first is much faster than unique(return_index=True).
+        ordered = numpy.sort(keys)
+        if (ordered[1:] == ordered[:-1]).any():
+            keys, last = numpy.unique(keys[::-1], return_index=True)
+            values = values[::-1][last]
+
+        found = self._find(keys)
+        existing = found >= 0
+        self.data[found[existing]] = values[existing]
+        new = ~existing
+        if new.any():
+            self._reserve(self._len + new.sum())
+            self._place(keys[new], values[new])
+            self._len += int(new.sum())
+            if self._limits is not None:
+                xy = unpack(keys[new])
+                (xmin, ymin), (xmax, ymax) = xy.min(axis=0), xy.max(axis=0)
+                self._extend_limits(int(xmin), int(xmax), int(ymin), int(ymax))
+        self._touch_chunks(unpack(keys))
+
+    def lookup(self, xy: numpy.ndarray, default: int = 0) -> numpy.ndarray:
+        """Get the values of an (n, 2) array of coords, using `default` for missing ones"""
+        found = self._find(pack(xy))
+        values = numpy.full(len(found), default, dtype=numpy.int64)
+        values[found >= 0] = self.data[found[found >= 0]]
+        return values
+
+    # ================ hash table internals ================
+
+    @property
+    def _mask(self) -> int:
+        return len(self.slots) - 1
+
+    def _hash(self, keys: numpy.ndarray) -> numpy.ndarray:
+        shift = numpy.uint64(64 - self._mask.bit_length())
+        return ((keys.view(numpy.uint64) * HASH_MULTIPLIER) >> shift).astype(numpy.int64)
+
+    def _hash_one(self, key: int) -> int:
+        return ((key & MASK_64) * int(HASH_MULTIPLIER) & MASK_64) >> (64 - self._mask.bit_length())
+
+    def _find(self, keys: numpy.ndarray) -> numpy.ndarray:
+        """Get the slot index of each key, or -1 if it's not in the table"""
+        slots = self._hash(keys)
+        result = numpy.full(len(keys), -1, dtype=numpy.int64)
+        pending = numpy.arange(len(keys))
+        # linear probing: step along from each key's home slot until we find it or a gap
+        while len(pending):
+            here = self.slots[slots[pending]]
+            found = here == keys[pending]
+            result[pending[found]] = slots[pending[found]]
+            pending = pending[~(found | (here == EMPTY_KEY))]
+            slots[pending] = (slots[pending] + 1) & self._mask
+        return result
+
+    def _place(self, keys: numpy.ndarray, values: numpy.ndarray):
+        """Put keys that aren't in the table yet into the first free slot after their home"""
+        slots = self._hash(keys)
+        pending = numpy.arange(len(keys))
+        while len(pending):
+            free = pending[self.slots[slots[pending]] == EMPTY_KEY]
+            # if several keys want the same free slot, one of the writes wins; reading the
+            # slots back tells us which, without having to sort
+            self.slots[slots[free]] = keys[free]
+            winners = free[self.slots[slots[free]] == keys[free]]
+            self.data[slots[winners]] = values[winners]
+            placed = numpy.zeros(len(keys), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + 1) & self._mask
+
+    def _reserve(self, num_cells: int):
+        """Make sure the table is big enough for `num_cells`"""
+        capacity = len(self.slots)
+        while num_cells > self.max_load * capacity:
+            capacity *= 2
+        if capacity == len(self.slots):
+            return
+        used = self.slots != EMPTY_KEY
+        keys, values = self.slots[used], self.data[used]
+        self.slots = numpy.full(capacity, EMPTY_KEY, dtype=numpy.int64)
+        self.data = numpy.zeros(capacity, dtype=self.data.dtype)
+        self._place(keys, values)
+
+    def _slot(self, coord: Coord) -> tuple[int, bool]:
+        """Get the slot holding `coord`, or the free slot where it would go"""
+        x, y = coord
+        key = x * X_STRIDE + y + Y_OFFSET  # same as pack
+        slot = self._hash_one(key)
+        slots = self.slots
+        while True:
+            here = slots[slot]
+            if here == key:
+                return slot, True
+            if here == EMPTY_KEY:
+                return slot, False
+            slot = (slot + 1) & self._mask
+
+    def _touch_chunks(self, xy: numpy.ndarray):
+        # sorting packed keys is much faster than numpy.unique(..., axis=0)
+        keys = numpy.sort(pack(xy // self.chunk_size))
+        chunks = unpack(keys[numpy.r_[True, keys[1:] != keys[:-1]]])
+        for cx, cy in chunks.tolist():
+            self.stamps[(cx, cy)] = next(_stamps)
+
+    def _extend_limits(self, xmin: int, xmax: int, ymin: int, ymax: int):
+        if self._limits is None:
+            return  # will be recalculated anyway
+        old = self._limits
+        self._limits = [min(old[0], xmin), max(old[1], xmax), min(old[2], ymin), max(old[3], ymax)]
+
+    # ================ dict interface ================
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Coord]:
+        # snapshot, so that values can be changed while iterating
+        xy = unpack(self.slots[self.slots != EMPTY_KEY])
+        return iter(list(map(tuple, xy.tolist())))
+
+    def __contains__(self, coord: Coord) -> bool:
+        return self._slot(coord)[1]
+
+    def __getitem__(self, coord: Coord) -> int:
+        slot, found = self._slot(coord)
+        if not found:
+            raise KeyError(coord)
+        return self.data[slot].item()
+
+    def get(self, coord: Coord, default: int = None) -> int:
+        slot, found = self._slot(coord)
+        return self.data[slot].item() if found else default
+
+    def __setitem__(self, coord: Coord, value: int):
+        slot, found = self._slot(coord)
+        if not found:
+            if self._len + 1 > self.max_load * len(self.slots):
+                self._reserve(self._len + 1)
+                slot, _ = self._slot(coord)
+            x, y = coord
+            self.slots[slot] = x * X_STRIDE + y + Y_OFFSET
+            self._len += 1
+            self._extend_limits(x, x, y, y)
+        self.data[slot] = value
+        self.stamps[(coord[0] // self.chunk_size, coord[1] // self.chunk_size)] = next(_stamps)
+
+    def __delitem__(self, coord: Coord):
+        slot, found = self._slot(coord)
+        if not found:
+            raise KeyError(coord)
+        # backward shift deletion: move later keys in the same probe run back into the gap, so
+        # that lookups never stop early at it
+        mask = self._mask
+        gap = slot
+        slot = (slot + 1) & mask
+        while (key := self.slots[slot]) != EMPTY_KEY:
+            home = self._hash_one(int(key))
+            # move it back if its home isn't between the gap and where it is now
+            if (slot - home) & mask >= (slot - gap) & mask:
+                self.slots[gap] = key
+                self.data[gap] = self.data[slot]
+                gap = slot
+            slot = (slot + 1) & mask
+        self.slots[gap] = EMPTY_KEY
+        self._len -= 1
+
+        x, y = coord
+        key = (x // self.chunk_size, y // self.chunk_size)
+        self.stamps[key] = next(_stamps)
+        if self._limits and (x in self._limits[:2] or y in self._limits[2:]):
+            self._limits = None  # recalculate lazily
+
+    def items(self):
+        xy, values = self.to_arrays()
+        return list(zip(map(tuple, xy.tolist()), values.tolist()))
+
+    def values(self):
+        return self.data[self.slots != EMPTY_KEY].tolist()
+
+    def update(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], PackedMatrix):
+            self.update_arrays(*args[0].to_arrays())
+        else:
+            self.update_arrays(*cells_to_arrays(dict(*args, **kwargs)))
+
+    def clear(self):
+        self._touch_chunks(self.to_arrays()[0])
+        self.slots = numpy.full(self.min_capacity, EMPTY_KEY, dtype=numpy.int64)
+        self.data = numpy.zeros(self.min_capacity, dtype=self.data.dtype)
+        self._len = 0
+        self._limits = None
+
+    def copy(self) -> "PackedMatrix":
+        new = PackedMatrix.__new__(PackedMatrix)
+        new.slots = self.slots.copy()
+        new.data = self.data.copy()
+        new.stamps = self.stamps.copy()
+        new._len = self._len
+        new._limits = self._limits and self._limits.copy()
+        return new
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())})"
+
+    # ================ SparseMatrix / ChunkedMatrix interface ================
+
+    @property
+    def limits(self) -> tuple[SparseMatrix.Limit, SparseMatrix.Limit]:
+        if not self:
+            return (None, None), (None, None)
+        if self._limits is None:
+            xy, _ = self.to_arrays()
+            (xmin, ymin), (xmax, ymax) = xy.min(axis=0).tolist(), xy.max(axis=0).tolist()
+            self._limits = [xmin, xmax, ymin, ymax]
+        xmin, xmax, ymin, ymax = self._limits
+        return (xmin, xmax), (ymin, ymax)
+
+    size = SparseMatrix.size
+    # same as ChunkedMatrix, because the stamps work the same way
+    dirty_chunks = ChunkedMatrix.dirty_chunks
+
+    def crop(self, rect: Rect) -> SparseMatrix:
+        """Get the cells inside `rect` (in xy coords)"""
+        rect = Rect(rect)
+        xy, values = self.to_arrays()
+        inside = (
+            (xy[:, 0] >= rect.left)
+            & (xy[:, 0] < rect.right)
+            & (xy[:, 1] >= rect.top)
+            & (xy[:, 1] < rect.bottom)
+        )
+        return SparseMatrix(arrays_to_cells(xy[inside], values[inside]))
+
+    def cells_in_chunks(self, chunks: Iterable[Coord]) -> SparseMatrix:
+        """Get the cells in the chunks with coords `chunks`"""
+        chunks = numpy.array(list(chunks), dtype=numpy.int64).reshape(-1, 2)
+        xy, values = self.to_arrays()
+        inside = numpy.isin(pack(xy // self.chunk_size), pack(chunks))
+        return SparseMatrix(arrays_to_cells(xy[inside], values[inside]))
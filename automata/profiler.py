@@ -0,0 +1,122 @@
+"""
+Frame-time profiling for the viewers and backends in a scene.
+
+Every Backend and Viewer times its work (iterate, draw, blit...) as named spans on a shared
+Profiler. The profiler keeps the last `window` durations of each span, for the p50 / p95 / p99
+shown in the debug overlay, and a bounded log of every span which can be dumped in Chrome's
+trace event format (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from itertools import count
+from pathlib import Path
+
+import numpy
+
+from automata.timer import Timer
+
+PERCENTILES = (50, 95, 99)
+
+
+class Span(Timer):
+    """Timer that records itself on a Profiler when it finishes"""
+
+    def __init__(self, profiler: "Profiler", name: str, category: str):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+
+    def __exit__(self, *args):
+        super().__exit__(*args)
+        self.profiler.record(self.name, self.start, self.time, self.category)
+
+
+class Profiler:
+    window: int = 300  # samples per span name, for percentiles
+    max_events: int = 100_000  # trace events kept; the oldest are dropped
+
+    enabled: bool = True
+    samples: defaultdict[str, deque[float]]  # {span name: recent durations in seconds}
+    events: deque[tuple[str, str, float, float, int]]  # (name, category, start, duration, tid)
+
+    def __init__(self, window: int = None, max_events: int = None):
+        self.window = window or self.window
+        self.max_events = max_events or self.max_events
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.events = deque(maxlen=self.max_events)
+        self._names = defaultdict(count)  # for unique_name
+
+    def span(self, name: str, category: str = "") -> Span:
+        """
+        Time a block of code:
+            with profiler.span("viewer.draw") as timer:
+                ...
+        """
+        return Span(self, name, category)
+
+    def record(self, name: str, start: float, duration: float, category: str = ""):
+        """Record a span that started at `start` (time.perf_counter) and took `duration` s"""
+        if not self.enabled:
+            return
+        self.samples[name].append(duration)
+        self.events.append((name, category, start, duration, threading.get_ident()))
+
+    def unique_name(self, prefix: str) -> str:
+        """e.g. "Viewer", then "Viewer2", ... so that spans from different objects don't mix"""
+        number = next(self._names[prefix])
+        return f"{prefix}{number + 1}" if number else prefix
+
+    def percentiles(self, name: str) -> dict[str, float] | None:
+        """The p50 / p95 / p99 of span `name` over the window, in milliseconds"""
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        values = numpy.percentile(numpy.array(samples) * 1000, PERCENTILES)
+        return {f"p{q}": value for q, value in zip(PERCENTILES, values.tolist())}
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Percentiles of every span, slowest (by p99) first"""
+        summary = {name: self.percentiles(name) for name in self.samples if self.samples[name]}
+        return dict(sorted(summary.items(), key=lambda item: -item[1]["p99"]))
+
+    def report(self, prefix: str = "") -> str:
+        """One line per span whose name starts with `prefix`, for the debug overlay"""
+        lines = []
+        for name, stats in self.summary().items():
+            if name.startswith(prefix):
+                values = " ".join(f"{key} {value:0.2f}" for key, value in stats.items())
+                lines.append(f"{name}: {values} ms")
+        return "\n".join(lines)
+
+    def clear(self):
+        self.samples.clear()
+        self.events.clear()
+
+    def dump_trace(self, path: str | Path):
+        """Write the recorded spans to `path` in Chrome's trace event format"""
+        pid = os.getpid()
+        # trace timestamps are in microseconds; make them relative to the first event
+        origin = self.events[0][2] if self.events else time.perf_counter()
+        events = [
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",  # a complete event, with a start and duration
+                "ts": (start - origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, category, start, duration, tid in self.events
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+# shared by all Backends and Viewers unless they're given their own, so that one overlay / trace
+# covers the whole scene
+PROFILER = Profiler()
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+
+import numpy
+from pygame import Rect
+from robingame.utils import SparseMatrix, Coord
+
+from automata.utils import cells_to_arrays, pack
+
+Cells = tuple[numpy.ndarray, numpy.ndarray]  # (n, 2) xy coords, (n,) values
+
+
+class RenderCache:
+    """
+    The work frontends need to do on an automaton's contents before drawing, done at most once
+    per generation however many viewers and frontends are drawing it. The Backend owns one and
+    invalidates it whenever the contents change; Viewers pass it to their frontends.
+
+    Everything is computed lazily:
+    - `arrays`: every cell as arrays, sorted by chunk, with `chunk_keys` as an index. Once
+      these have been built, `crop` and `cells_in_chunks` use them.
+    - `limits`
+    - `color_indices(n)`: values clipped to a colour lookup table with n colours
+    - `crop(rect)`: the cells inside a rect, remembered for the rest of the generation for the
+      `max_crops` most recently used rects (a few viewers' current viewports), so that panning
+      or zooming while paused doesn't keep a copy of the cells for every rect ever drawn.
+      If the arrays haven't been built, this uses the contents' own spatial index instead, so
+      that a zoomed in viewer of a big world doesn't pay for arrays it doesn't need (unless
+      the contents are stored as arrays anyway, like PackedMatrix).
+    """
+
+    contents: SparseMatrix | None  # what the cached data was computed from
+    chunk_size: int
+    _arrays: Cells | None
+    _chunk_keys: numpy.ndarray | None  # packed chunk coord of each cell, sorted
+    _limits: tuple | None
+    _color_indices: dict[int, numpy.ndarray]
+    _crops: OrderedDict[tuple[int, int, int, int], Cells]  # least recently used first
+    max_crops: int = 4
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget everything, e.g. because the contents have changed"""
+        self.contents = None
+        self._arrays = None
+        self._chunk_keys = None
+        self._limits = None
+        self._color_indices = dict()
+        self._crops = OrderedDict()
+
+    def get(self, contents: SparseMatrix) -> "RenderCache":
+        """Use the cache for `contents`. If they're a different object, start again."""
+        if contents is not self.contents:
+            self.invalidate()
+            self.contents = contents
+            self.chunk_size = getattr(contents, "chunk_size", 16)
+        return self
+
+    @property
+    def arrays(self) -> Cells:
+        if self._arrays is None:
+            xy, values = cells_to_arrays(self.contents)
+            chunk_keys = pack(xy // self.chunk_size)
+            order = numpy.argsort(chunk_keys)
+            self._arrays = xy[order], values[order]
+            self._chunk_keys = chunk_keys[order]
+        return self._arrays
+
+    @property
+    def limits(self) -> tuple[SparseMatrix.Limit, SparseMatrix.Limit]:
+        if self._limits is None:
+            self._limits = self.contents.limits
+        return self._limits
+
+    def color_indices(self, num_colors: int) -> numpy.ndarray:
+        """Index into a colour lookup table of length `num_colors` for each cell in `arrays`"""
+        if num_colors not in self._color_indices:
+            _, values = self.arrays
+            self._color_indices[num_colors] = numpy.clip(values, 0, num_colors - 1)
+        return self._color_indices[num_colors]
+
+    def crop(self, rect: Rect) -> Cells:
+        """The cells inside `rect` (in xy coords)"""
+        rect = Rect(rect)
+        key = tuple(rect)
+        if key in self._crops:
+            self._crops.move_to_end(key)
+            return self._crops[key]
+        if self._arrays is None and not hasattr(self.contents, "to_arrays"):
+            cells = cells_to_arrays(self.contents.crop(rect))
+        else:
+            cells = self._crop_arrays(rect)
+        self._crops[key] = cells
+        if len(self._crops) > self.max_crops:
+            self._crops.popitem(last=False)
+        return cells
+
+    def cells_in_chunks(self, chunks: list[Coord]) -> Cells:
+        """The cells in the chunks with coords `chunks`"""
+        if self._arrays is None and not hasattr(self.contents, "to_arrays"):
+            return cells_to_arrays(self.contents.cells_in_chunks(chunks))
+        keys = pack(numpy.array(chunks, dtype=numpy.int64).reshape(-1, 2))
+        return self._select(keys, keys)
+
+    def _crop_arrays(self, rect: Rect) -> Cells:
+        size = self.chunk_size
+        cx_min, cy_min = rect.left // size, rect.top // size
+        cx_max, cy_max = (rect.right - 1) // size, (rect.bottom - 1) // size
+        # chunk keys sort by x then y, so each column of chunks is one contiguous range
+        columns = numpy.arange(cx_min, cx_max + 1)
+        lows = pack(numpy.stack([columns, numpy.full_like(columns, cy_min)], axis=1))
+        highs = pack(numpy.stack([columns, numpy.full_like(columns, cy_max)], axis=1))
+        xy, values = self._select(lows, highs)
+        inside = (
+            (xy[:, 0] >= rect.left)
+            & (xy[:, 0] < rect.right)
+            & (xy[:, 1] >= rect.top)
+            & (xy[:, 1] < rect.bottom)
+        )
+        return xy[inside], values[inside]
+
+    def _select(self, lows: numpy.ndarray, highs: numpy.ndarray) -> Cells:
+        """The cells whose chunk key is in any of the ranges [lows[i], highs[i]]"""
+        xy, values = self.arrays
+        starts = numpy.searchsorted(self._chunk_keys, lows, side="left")
+        ends = numpy.searchsorted(self._chunk_keys, highs, side="right")
+        lengths = ends - starts
+        indices = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+        indices += numpy.arange(lengths.sum())
+        return xy[indices], values[indices]
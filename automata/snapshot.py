@@ -0,0 +1,116 @@
+"""
+Binary snapshots of an automaton's contents, for saving and restoring big worlds quickly.
+
+A snapshot file is:
+
+    MAGIC, then the header length as a little-endian uint32
+    a JSON header: number of cells, array dtypes, and free-form metadata (e.g. the rule)
+    the (n, 2) xy array, then the (n,) values array, each starting on an ALIGNMENT boundary
+
+Because the arrays are stored raw, they can be memory-mapped instead of read, so loading takes
+almost no time and the cells are only read from disk when they're used. Arrays are stored with
+the smallest integer dtype that fits, so a typical game of life world takes 5-9 bytes per cell.
+"""
+
+import json
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy
+from robingame.utils import SparseMatrix
+
+from automata.chunked_matrix import ChunkedMatrix
+from automata.packed_matrix import PackedMatrix
+from automata.utils import cells_to_arrays
+
+MAGIC = b"AUTOMATA"
+VERSION = 1
+ALIGNMENT = 64
+
+
+@dataclass
+class Snapshot:
+    xy: numpy.ndarray  # (n, 2) coords, possibly memory-mapped
+    values: numpy.ndarray  # (n,) values, possibly memory-mapped
+    metadata: dict = field(default_factory=dict)
+
+    def to_matrix(
+        self, matrix_class: type[ChunkedMatrix | PackedMatrix] = PackedMatrix
+    ) -> ChunkedMatrix | PackedMatrix:
+        """Copy the cells into a new matrix, e.g. to use as Automaton.contents"""
+        return matrix_class.from_arrays(self.xy, self.values)
+
+
+def save_snapshot(path: str | Path, contents: SparseMatrix, **metadata):
+    """
+    Save the cells in `contents` to `path`. `metadata` must be JSON serialisable, e.g.
+    rule=str(automaton.rule).
+    """
+    xy, values = cells_to_arrays(contents)
+    xy = xy.astype(_smallest_dtype(xy))
+    values = values.astype(_smallest_dtype(values))
+    header = json.dumps(
+        dict(
+            version=VERSION,
+            cells=len(values),
+            xy_dtype=xy.dtype.str,
+            values_dtype=values.dtype.str,
+            metadata=metadata,
+        )
+    ).encode()
+    with open(path, "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        _pad(file)
+        xy.tofile(file)
+        _pad(file)
+        values.tofile(file)
+
+
+def load_snapshot(path: str | Path, mmap: bool = True) -> Snapshot:
+    """
+    Load a snapshot saved by save_snapshot. If `mmap`, the arrays are memory-mapped read-only
+    instead of being read into memory.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        (header_length,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_length))
+    if header["version"] != VERSION:
+        raise ValueError(f"Unsupported snapshot version {header['version']} in {path}")
+
+    num_cells = header["cells"]
+    xy_dtype = numpy.dtype(header["xy_dtype"])
+    values_dtype = numpy.dtype(header["values_dtype"])
+    xy_offset = _aligned(len(MAGIC) + 4 + header_length)
+    values_offset = _aligned(xy_offset + 2 * num_cells * xy_dtype.itemsize)
+    xy = _read_array(path, xy_dtype, xy_offset, (num_cells, 2), mmap)
+    values = _read_array(path, values_dtype, values_offset, (num_cells,), mmap)
+    return Snapshot(xy=xy, values=values, metadata=header["metadata"])
+
+
+def _read_array(path, dtype, offset: int, shape: tuple, mmap: bool) -> numpy.ndarray:
+    if not shape[0]:
+        return numpy.zeros(shape, dtype=dtype)  # can't memory-map 0 bytes
+    if mmap:
+        return numpy.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    count = int(numpy.prod(shape))
+    return numpy.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def _smallest_dtype(array: numpy.ndarray) -> numpy.dtype:
+    low, high = (int(array.min()), int(array.max())) if array.size else (0, 0)
+    for dtype in ["<i1", "<i2", "<i4"]:
+        info = numpy.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return numpy.dtype(dtype)
+    return numpy.dtype("<i8")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _pad(file):
+    file.write(b"\0" * (_aligned(file.tell()) - file.tell()))
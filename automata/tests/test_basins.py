@@ -0,0 +1,112 @@
+from collections import deque
+from types import SimpleNamespace
+
+import numpy
+import pytest
+from pygame import Color, Surface
+
+from automata.advent_of_code.day9 import engine
+from automata.advent_of_code.day9.classes import Caverns, parse
+
+EXAMPLE = """2199943210
+3987894921
+9856789892
+8767896789
+9899965678"""
+
+
+@pytest.fixture(params=["compiled", "python"])
+def kernel(request, monkeypatch):
+    if request.param == "python":
+        if engine.njit:
+            monkeypatch.setattr(engine, "njit", None)
+            for name in ["label_kernel", "resolve_roots", "_root"]:
+                monkeypatch.setattr(engine, name, getattr(engine, name).py_func)
+    elif not engine.njit:
+        pytest.skip("numba not installed")
+
+
+def flood_fill(heights: numpy.ndarray) -> list[set]:
+    """Every basin as a set of (x, y), by flood filling from each unvisited cell"""
+    height, width = heights.shape
+    seen = set()
+    basins = []
+    for y in range(height):
+        for x in range(width):
+            if heights[y, x] == 9 or (x, y) in seen:
+                continue
+            basin, queue = {(x, y)}, deque([(x, y)])
+            while queue:
+                cx, cy = queue.popleft()
+                for nx, ny in [(cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)]:
+                    if 0 <= nx < width and 0 <= ny < height and heights[ny, nx] != 9:
+                        if (nx, ny) not in basin:
+                            basin.add((nx, ny))
+                            queue.append((nx, ny))
+            seen |= basin
+            basins.append(basin)
+    return basins
+
+
+def test_example(kernel):
+    heights = parse(EXAMPLE)
+    assert engine.low_points(heights).tolist() == [[1, 0], [9, 0], [2, 2], [6, 4]]
+    assert engine.risk_level(heights) == 15
+    _, sizes = engine.label_basins(heights)
+    assert sorted(sizes.tolist()) == [3, 9, 9, 14]
+    assert engine.largest_basins(heights) == 1134
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_labels_match_flood_fill(kernel, seed):
+    heights = numpy.random.default_rng(seed).integers(0, 10, (37, 53))
+    labels, sizes = engine.label_basins(heights)
+    expected = flood_fill(heights)
+    assert len(sizes) == len(expected)
+    for number, basin in enumerate(expected):
+        xs, ys = numpy.array(sorted(basin)).T
+        # numbered in scan order, which is the order flood_fill finds them in
+        assert (labels[ys, xs] == number).all()
+        assert sizes[number] == len(basin)
+    assert (labels[heights == 9] == engine.NO_BASIN).all()
+
+
+def test_all_walls(kernel):
+    labels, sizes = engine.label_basins(numpy.full((3, 4), 9))
+    assert (labels == engine.NO_BASIN).all()
+    assert len(sizes) == 0
+
+
+def test_replay_covers_each_basin_ring_by_ring():
+    heights = parse(EXAMPLE)
+    labels, _ = engine.label_basins(heights)
+    distances = engine.basin_distances(heights)
+    assert distances[heights == 9].tolist() == [engine.NO_BASIN] * (heights == 9).sum()
+    assert (distances[tuple(engine.low_points(heights)[:, ::-1].T)] == 0).all()
+
+    steps = list(engine.replay(labels, distances))
+    shown = numpy.concatenate([xy for _, xy in steps])
+    assert len(shown) == (heights < 9).sum() == len({tuple(xy) for xy in shown.tolist()})
+    basins = [basin for basin, _ in steps]
+    assert basins == sorted(basins)
+    for basin, xy in steps:
+        assert (labels[xy[:, 1], xy[:, 0]] == basin).all()
+        assert len(set(distances[xy[:, 1], xy[:, 0]].tolist())) == 1
+
+
+def test_caverns_replay_and_draw():
+    game = SimpleNamespace(window_width=1000, window_height=1000)
+    heights = numpy.tile(parse(EXAMPLE), (40, 20))
+    caverns = Caverns(game, heights)
+    assert caverns.scaling == 5
+    steps = 0
+    while caverns.replay_step():
+        steps += 1
+        assert not (caverns.explored & caverns.basin).any()
+    assert steps > len(caverns.basin_sizes)
+    assert ((caverns.explored | caverns.basin) == (heights < 9)).all()
+
+    surface = Surface((1000, 1000))
+    caverns.draw(surface)
+    assert tuple(surface.get_at((0, 0)))[:3] == tuple(Color("orange"))[:3]
+    assert tuple(surface.get_at((2 * 5, 0)))[:3] == (0, 0, 0)  # a wall
@@ -0,0 +1,62 @@
+import json
+
+from automata import benchmark
+from automata.maze_solver import benchmark as maze_benchmark
+from automata.maze_solver.generators import GENERATORS
+from automata.maze_solver.solver import SOLVERS
+
+
+def test_benchmark_game_of_life(tmp_path):
+    output = tmp_path / "report.json"
+    benchmark.main(
+        [
+            "game-of-life",
+            *"--rule 3 5 3".split(),
+            "--pattern=ACORN",
+            "-n=20",
+            "--frontend=bitmap",
+            "--frontend=drawrect-minimap",
+            f"--output={output}",
+        ]
+    )
+    report = json.loads(output.read_text())
+    assert report["automaton"] == "GameOfLifeAutomaton"
+    assert report["generations"] == 20
+    assert report["iterate"]["generations_per_second"] > 0
+    assert set(report["draw"]) == {"bitmap", "drawrect-minimap"}
+    assert report["draw"]["bitmap"]["draws"] == 20
+    assert report["args"]["rule"] == [3, 5, 3]
+
+
+def test_benchmark_langtons_ant(tmp_path):
+    output = tmp_path / "report.json"
+    benchmark.main(
+        [
+            "langtons-ant",
+            *"--ant 0 0 rl --ant 5 5 rlllr".split(),
+            *"-n 500 --draw-every 100 --frontend langtons-ant --history --trace-memory".split(),
+            f"--output={output}",
+        ]
+    )
+    report = json.loads(output.read_text())
+    assert report["automaton"] == "LangtonsAntAutomaton"
+    assert report["final_cells"] > 0
+    assert report["draw"]["langtons-ant"]["draws"] == 5
+    assert report["peak_traced_bytes"] > 0
+
+
+def test_benchmark_maze_solvers(tmp_path):
+    output = tmp_path / "report.json"
+    maze_benchmark.main(["--size", "31", "40", "--seed", "0", "1", f"--output={output}"])
+    report = json.loads(output.read_text())
+    results = report["results"]
+    assert len(results) == len(GENERATORS) * len(SOLVERS) * 2
+    for result in results:
+        assert result["solved"]
+        assert result["nodes_expanded"] >= result["path_length"] > 0
+        assert result["peak_traced_bytes"] > 0
+    # both solvers find shortest paths
+    lengths = {}
+    for result in results:
+        lengths.setdefault((result["generator"], result["seed"]), set()).add(result["path_length"])
+    assert all(len(values) == 1 for values in lengths.values())
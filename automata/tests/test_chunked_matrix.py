@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from pygame import Rect
+
+from automata.chunked_matrix import ChunkedMatrix
+
+
+def assert_index_consistent(matrix: ChunkedMatrix):
+    indexed = [coord for chunk in matrix.chunks.values() for coord in chunk]
+    assert sorted(indexed) == sorted(matrix)
+    assert all(matrix.chunks.values()), "empty chunks should be removed"
+    for key, chunk in matrix.chunks.items():
+        assert all(matrix.chunk(coord) == key for coord in chunk)
+
+
+def test_chunked_matrix_index_maintained():
+    matrix = ChunkedMatrix({(0, 0): 1, (-1, -1): 1, (20, 3): 2}, chunk_size=4)
+    assert set(matrix.chunks) == {(0, 0), (-1, -1), (5, 0)}
+    assert_index_consistent(matrix)
+
+    matrix[(1, 1)] = 3
+    matrix[(-20, 7)] = 1
+    del matrix[(20, 3)]
+    matrix.pop((-1, -1))
+    matrix.pop((99, 99), None)
+    matrix.update({(5, 5): 1}, **{})
+    matrix.setdefault((6, 6), 4)
+    assert_index_consistent(matrix)
+
+    copy = matrix.copy()
+    assert isinstance(copy, ChunkedMatrix)
+    copy[(100, 100)] = 1
+    assert (100, 100) not in matrix
+    assert_index_consistent(matrix)
+    assert_index_consistent(copy)
+
+    matrix.clear()
+    assert not matrix.chunks
+
+
+@pytest.mark.parametrize(
+    "rect",
+    [
+        Rect(-10, -10, 20, 20),
+        Rect(0, 0, 1, 1),
+        Rect(-3, 5, 40, 7),
+        Rect(-1000, -1000, 2000, 2000),
+        Rect(500, 500, 10, 10),
+    ],
+)
+def test_chunked_matrix_crop(rect):
+    random.seed(0)
+    contents = {(random.randint(-50, 50), random.randint(-50, 50)): 1 for _ in range(2000)}
+    matrix = ChunkedMatrix(contents, chunk_size=8)
+    expected = {coord: value for coord, value in contents.items() if rect.collidepoint(coord)}
+    assert matrix.crop(rect) == expected
+
+
+def test_chunked_matrix_limits():
+    random.seed(1)
+    contents = {(random.randint(-50, 50), random.randint(-30, 70)): 1 for _ in range(500)}
+    matrix = ChunkedMatrix(contents, chunk_size=8)
+    xs, ys = zip(*contents)
+    assert matrix.limits == ((min(xs), max(xs)), (min(ys), max(ys)))
+    assert ChunkedMatrix().limits == ((None, None), (None, None))
+
+
+def test_chunked_matrix_dirty_chunks():
+    matrix = ChunkedMatrix({(0, 0): 1, (10, 10): 1, (20, 20): 1}, chunk_size=8)
+    stamps = matrix.stamps.copy()
+    assert matrix.dirty_chunks(stamps) == set()
+
+    matrix[(1, 1)] = 1  # new cell
+    matrix[(10, 10)] = 2  # changed value
+    del matrix[(20, 20)]  # chunk emptied
+    assert matrix.dirty_chunks(stamps) == {(0, 0), (1, 1), (2, 2)}
+
+    # a new matrix with the same contents is entirely dirty
+    assert ChunkedMatrix(matrix).dirty_chunks(matrix.stamps) == {(0, 0), (1, 1)}
+    assert matrix.copy().dirty_chunks(matrix.stamps) == set()
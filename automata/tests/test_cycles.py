@@ -0,0 +1,119 @@
+import numpy
+import pytest
+from robingame.utils import SparseMatrix
+
+from automata.backend import Backend
+from automata.cycles import Cycle, CycleDetector, WorldHash
+from automata.game_of_life import patterns
+from automata.game_of_life.automaton import GameOfLifeAutomaton
+from automata.game_of_life.rules import RuleAutomaton
+from automata.history import Diff
+from automata.packed_matrix import PackedMatrix
+from automata.utils import cells_to_arrays
+
+
+def test_world_hash():
+    contents = {(0, 0): 1, (5, -3): 2, (-(10**6), 7): 3}
+    world_hash = WorldHash(contents)
+    assert world_hash.sums == WorldHash(dict(reversed(contents.items()))).sums
+    assert world_hash.sums != WorldHash({**contents, (0, 0): 2}).sums
+    ignoring_values = WorldHash(contents, use_values=False)
+    assert ignoring_values.sums == WorldHash({**contents, (0, 0): 2}, use_values=False).sums
+
+    moved = WorldHash({(x + 3, y - 4): value for (x, y), value in contents.items()})
+    assert moved.sums != world_hash.sums
+    assert moved.normalised(3, -4) == world_hash.normalised(0, 0)
+    world_hash.translate(3, -4)
+    assert moved.sums == world_hash.sums
+
+
+@pytest.mark.parametrize("use_values", [True, False])
+def test_world_hash_incremental(use_values):
+    automaton = GameOfLifeAutomaton(contents=patterns.load(patterns.R_PENTOMINO))
+    world_hash = WorldHash(automaton.contents, use_values=use_values)
+    for _ in range(50):
+        previous = SparseMatrix(automaton.contents)
+        automaton.iterate()
+        world_hash.apply(Diff.between(previous, automaton.contents), automaton.contents)
+        assert world_hash.sums == WorldHash(automaton.contents, use_values=use_values).sums
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (numpy.ones((2, 2)), Cycle(period=1, translation=(0, 0), start=0)),
+        (patterns.SPINNER, Cycle(period=2, translation=(0, 0), start=0)),
+        (patterns.GLIDER, Cycle(period=4, translation=(1, 1), start=0)),
+        (patterns.LIGHTWEIGHT_SPACESHIP, Cycle(period=4, translation=(2, 0), start=0)),
+    ],
+)
+def test_backend_detects_cycles(pattern, expected):
+    automaton = GameOfLifeAutomaton(contents=patterns.load(pattern))
+    backend = Backend(automaton, cycle_detector=CycleDetector(use_values=False))
+    generations = 0
+    while not backend.cycle:
+        backend.iterate()
+        generations += 1
+    assert backend.cycle == expected
+    # confirmed after repeating for a whole period
+    assert generations == 2 * expected.period
+
+
+def test_backend_stops_on_cycle():
+    automaton = RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO), rule="B36/S23")
+    backend = Backend(automaton, CycleDetector(use_values=False), stop_on_cycle=True)
+    backend.iterations_per_update = 1000
+    backend.update()
+    assert backend.paused
+    assert backend.cycle
+    generation = backend.history.generation
+    backend.update()
+    assert backend.history.generation == generation
+
+
+@pytest.mark.parametrize("contents_class", [None, PackedMatrix])
+def test_backend_fast_forward(contents_class):
+    contents = patterns.load(patterns.GLIDER)
+    reference = RuleAutomaton(contents=contents)
+    automaton = RuleAutomaton(contents=contents, contents_class=contents_class)
+    backend = Backend(automaton, CycleDetector(use_values=False))
+    with pytest.raises(ValueError):
+        backend.fast_forward(100)
+
+    for _ in range(8):
+        backend.iterate()
+    backend.fast_forward(1003)
+    for _ in range(8 + 1003):
+        reference.iterate()
+    assert set(backend.automaton.contents) == set(reference.contents)
+    assert backend.cycle == Cycle(period=4, translation=(1, 1), start=0)
+
+    # the cycle carries on being detected after skipping
+    for _ in range(10):
+        backend.iterate()
+        reference.iterate()
+        assert backend.cycle
+    assert set(backend.automaton.contents) == set(reference.contents)
+
+
+def test_cycle_detector_forgets_on_rewind():
+    automaton = GameOfLifeAutomaton(contents=patterns.load(patterns.SPINNER))
+    backend = Backend(automaton, CycleDetector(use_values=False))
+    for _ in range(10):
+        backend.iterate()
+    assert backend.cycle
+    backend.rewind(3)
+    assert not backend.cycle
+    for _ in range(4):
+        backend.iterate()
+    assert backend.cycle.period == 2
+
+
+def test_cycle_detector_max_period():
+    # the spinner's period is 2, so it can't be found if only 1 generation is remembered
+    detector = CycleDetector(use_values=False, max_period=1, confirm_periods=0)
+    automaton = RuleAutomaton(contents=patterns.load(patterns.SPINNER))
+    detector.reset(automaton.contents)
+    for _ in range(10):
+        automaton.iterate()
+        assert not detector.record_arrays(*cells_to_arrays(automaton.contents))
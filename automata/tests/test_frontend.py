@@ -0,0 +1,109 @@
+import numpy
+import pytest
+from pygame import Color, Surface
+from robingame.utils import SparseMatrix
+
+from automata.frontend import (
+    BitmapFrontend,
+    BitmapMinimap,
+    ColormapMixin,
+    DrawRectFrontend,
+    DrawRectMinimap,
+)
+from automata.game_of_life import patterns
+from automata.game_of_life.automaton import GameOfLifeAutomaton
+from automata.game_of_life.rules import RuleAutomaton
+from automata.langtons_ant.automaton import LangtonsAntAutomaton
+from automata.packed_matrix import PackedMatrix
+from automata.render_cache import RenderCache
+from automata.utils import cells_to_arrays
+
+
+def test_cells_to_arrays():
+    contents = SparseMatrix({(0, 0): 1, (-5, 3): 2, (7, -1): 3})
+    xy, values = cells_to_arrays(contents)
+    assert xy.tolist() == [[0, 0], [-5, 3], [7, -1]]
+    assert values.tolist() == [1, 2, 3]
+
+    xy, values = cells_to_arrays(SparseMatrix())
+    assert xy.shape == (0, 2)
+    assert values.shape == (0,)
+
+
+@pytest.mark.parametrize("value", [0, 1, 2, 99])
+def test_get_colors_matches_get_color(value):
+    mixin = ColormapMixin(colors=[Color("red"), Color("green"), Color("blue")])
+    rgb = mixin.get_colors(numpy.array([value]))
+    assert tuple(rgb[0]) == tuple(mixin.get_color(value))[:3]
+
+
+def test_bitmap_frontend_draw():
+    automaton = GameOfLifeAutomaton(contents={(0, 0): 1, (2, 1): 5, (100, 100): 1})
+    frontend = BitmapFrontend()
+    surface = Surface((100, 100))
+    frontend.draw(surface, automaton, viewport=(-5, -5, 10, 10))
+
+    # viewport is centred on (0, 0) with 10 pixels per cell
+    assert surface.get_at((55, 55))[:3] == frontend.get_color(1)[:3]
+    assert surface.get_at((75, 65))[:3] == frontend.get_color(5)[:3]
+    assert surface.get_at((85, 85))[:3] == frontend.background_color[:3]
+
+
+def test_bitmap_minimap_draw():
+    automaton = GameOfLifeAutomaton(contents={(-1, -1): 1, (1, 1): 1})
+    surface = Surface((3, 3))
+    BitmapMinimap().draw(surface, automaton, viewport=(0, 0, 1, 1))
+    assert surface.get_at((0, 0)) == Color("white")
+    assert surface.get_at((1, 1)) == Color("black")
+    assert surface.get_at((2, 2)) == Color("white")
+
+
+@pytest.mark.parametrize(
+    "automaton_class", [GameOfLifeAutomaton, RuleAutomaton, LangtonsAntAutomaton]
+)
+def test_draw_rect_minimap_cache_matches_contents(automaton_class):
+    if automaton_class is GameOfLifeAutomaton:
+        automaton = GameOfLifeAutomaton(contents=patterns.load(patterns.R_PENTOMINO))
+    elif automaton_class is RuleAutomaton:
+        automaton = RuleAutomaton(
+            contents=patterns.load(patterns.R_PENTOMINO), contents_class=PackedMatrix
+        )
+    else:
+        automaton = LangtonsAntAutomaton()
+        automaton.add_ant((0, 0), "rl", 0)
+    minimap = DrawRectMinimap(colors=[Color("red"), Color("green"), Color("blue")])
+    surface = Surface((200, 200))
+
+    for _ in range(200):
+        automaton.iterate()
+        minimap.draw(surface, automaton, viewport=(0, 0, 10, 10))
+
+    minimap.refresh(RenderCache().get(automaton.contents), image_size=200)
+    assert minimap.downsample == 1
+    x0, y0 = minimap.world_rect.topleft
+    for (x, y), value in automaton.contents.items():
+        assert tuple(minimap.pixels[x - x0, y - y0]) == tuple(minimap.get_color(value))[:3]
+    background = (minimap.pixels == minimap.background_color[:3]).all(axis=2)
+    assert (~background).sum() == len(automaton.contents)
+
+
+@pytest.mark.parametrize(
+    "lod_mode, expected_color",
+    [
+        ("max", Color("blue")),  # max value is 2
+        ("density", Color("green")),  # 8 of 16 cells per pixel are full
+    ],
+)
+def test_draw_rect_frontend_aggregates_when_zoomed_out(lod_mode, expected_color):
+    contents = {(x, y): 1 for x in range(4) for y in range(2)}
+    contents[(3, 1)] = 2
+    automaton = GameOfLifeAutomaton(contents=contents)
+    frontend = DrawRectFrontend(colors=[Color("red"), Color("green"), Color("blue")])
+    frontend.lod_mode = lod_mode
+    surface = Surface((10, 10))
+
+    # 4 cells per pixel in each direction
+    frontend.draw(surface, automaton, viewport=(-20, -20, 40, 40))
+    assert surface.get_at((5, 5)) == expected_color
+    assert surface.get_at((4, 4)) == frontend.background_color
+    assert surface.get_at((6, 5)) == frontend.background_color
@@ -0,0 +1,98 @@
+import pytest
+from robingame.utils import SparseMatrix
+
+from automata.backend import Backend
+from automata.game_of_life import patterns
+from automata.game_of_life.automaton import GameOfLifeAutomaton
+from automata.history import Diff, History
+from automata.langtons_ant.automaton import LangtonsAntAutomaton
+
+
+@pytest.mark.parametrize(
+    "old, new, expected_size",
+    [
+        ({(0, 0): 1, (1, 0): 1}, {(0, 0): 2, (1, 0): 2}, 0),  # everything aged by 1
+        ({(0, 0): 1, (1, 0): 1}, {(0, 0): 2, (2, 0): 1}, 2),  # 1 birth, 1 death
+        ({(0, 0): 1, (1, 0): 1, (2, 0): 5}, {(0, 0): 2, (1, 0): 2, (2, 0): 5}, 1),
+        ({(0, 0): 3, (1, 0): 1}, {(0, 0): 4, (1, 0): 1}, 1),
+        ({}, {(0, 0): 1}, 1),
+    ],
+)
+def test_diff_undo(old, new, expected_size):
+    old = SparseMatrix(old)
+    new = SparseMatrix(new)
+    diff = Diff.between(old, new)
+    assert diff.size == expected_size
+    diff.undo(new)
+    assert new == old
+
+
+@pytest.mark.parametrize("generations", [1, 7, 100, 150, 299])
+def test_backend_rewind_game_of_life(generations):
+    backend = Backend(GameOfLifeAutomaton(contents=patterns.load(patterns.R_PENTOMINO)))
+    snapshots = []
+    for _ in range(300):
+        snapshots.append(backend.automaton.contents.copy())
+        backend.iterate()
+
+    backend.rewind(generations)
+    assert backend.automaton.contents == snapshots[-generations]
+    assert backend.history.generation == 300 - generations
+
+
+def test_backend_back_one_langtons_ant():
+    automaton = LangtonsAntAutomaton()
+    automaton.add_ant((0, 0), "rl", 0)
+    backend = Backend(automaton)
+    snapshots = []
+    for _ in range(50):
+        snapshots.append(backend.automaton.contents.copy())
+        backend.iterate()
+
+    for snapshot in reversed(snapshots):
+        backend.back_one()
+        assert backend.automaton.contents == snapshot
+
+
+def test_history_memory_budget():
+    history = History(max_cells=1000, keyframe_interval=10)
+    automaton = GameOfLifeAutomaton(contents=patterns.load(patterns.ACORN))
+    for _ in range(500):
+        previous = automaton.contents.copy()
+        automaton.iterate()
+        history.record(previous, automaton.contents)
+        assert history.size <= 1000
+
+    assert 0 < len(history) < 500
+    assert history.oldest_generation == 500 - len(history)
+    assert all(gen >= history.oldest_generation for gen in history.keyframes)
+
+    # can't rewind further than the oldest generation
+    history.rewind(automaton.contents, 1000)
+    assert len(history) == 0
+
+
+def test_history_keeps_diffs_of_worlds_bigger_than_the_budget():
+    history = History(max_cells=200, keyframe_interval=10)
+    automaton = GameOfLifeAutomaton(contents=patterns.load(patterns.ACORN))
+    for _ in range(300):  # the acorn grows past 200 cells
+        automaton.iterate()
+    snapshots = []
+    for _ in range(25):
+        snapshots.append(automaton.contents.copy())
+        previous = automaton.contents.copy()
+        automaton.iterate()
+        history.record(previous, automaton.contents)
+        assert history.size <= 200
+        assert len(history) > 0  # not wiped out by making room for a keyframe
+
+    assert len(automaton.contents) > 200
+    assert not history.keyframes
+    oldest = history.oldest_generation
+    assert history.rewind(automaton.contents, len(history)) == snapshots[oldest]
+
+
+def test_history_arguments_of_zero_are_not_defaults():
+    assert History(max_cells=0).max_cells == 0
+    with pytest.raises(ValueError):
+        History(keyframe_interval=0)
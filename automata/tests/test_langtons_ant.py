@@ -0,0 +1,103 @@
+import pytest
+from robingame.utils import SparseMatrix
+
+from automata.langtons_ant import automaton as automaton_module
+from automata.langtons_ant.automaton import Ant, LangtonsAntAutomaton
+
+
+@pytest.fixture(params=["compiled", "python"])
+def kernel(request, monkeypatch):
+    if request.param == "python":
+        if automaton_module.njit:
+            monkeypatch.setattr(automaton_module, "njit", None)
+            monkeypatch.setattr(automaton_module, "step_ants", automaton_module.step_ants.py_func)
+    elif not automaton_module.njit:
+        pytest.skip("numba not installed")
+
+
+def reference(ants: list[tuple], steps: int, contents: dict = None):
+    """Step Ant objects one at a time"""
+    contents = SparseMatrix(contents or {})
+    ants = [Ant(ruleset, xy, facing) for xy, ruleset, facing in ants]
+    for _ in range(steps):
+        for ant in ants:
+            ant.iterate(contents)
+    return contents, ants
+
+
+def make_automaton(ants: list[tuple], contents: dict = None, **settings):
+    automaton = LangtonsAntAutomaton(contents)
+    for ant in ants:
+        automaton.add_ant(*ant)
+    for name, value in settings.items():
+        setattr(automaton, name, value)
+    return automaton
+
+
+def assert_same(automaton: LangtonsAntAutomaton, contents: SparseMatrix, ants: list[Ant]):
+    assert automaton.contents == contents
+    assert automaton.ants == ants
+
+
+@pytest.mark.parametrize(
+    "ants, steps_per_iteration",
+    [
+        ([((0, 0), "rl", 0)], 1),
+        ([((0, 0), "rl", 0)], 37),
+        ([((0, 0), "lrrrl", 0), ((-30, 0), "rlllr", 0), ((5, 5), "rrl", 1)], 1),
+        ([((0, 0), "lrrrl", 0), ((-30, 0), "rlllr", 0), ((5, 5), "rrl", 1)], 50),
+        ([((100, -100), "rrlllrlrrr", 3), ((0, 0), "rl", 2)], 200),
+    ],
+)
+def test_langtons_ant_matches_reference(kernel, ants, steps_per_iteration):
+    automaton = make_automaton(ants, steps_per_iteration=steps_per_iteration)
+    for _ in range(4000 // steps_per_iteration):
+        automaton.iterate()
+    steps = 4000 // steps_per_iteration * steps_per_iteration
+    assert_same(automaton, *reference(ants, steps))
+
+
+def test_langtons_ant_skips_highway(kernel, monkeypatch):
+    skipped = []
+    skip_highway = LangtonsAntAutomaton.skip_highway
+    monkeypatch.setattr(
+        LangtonsAntAutomaton,
+        "skip_highway",
+        lambda self, max_steps: skipped.append(skip_highway(self, max_steps)) or skipped[-1],
+    )
+    ants = [((0, 0), "rl", 0)]
+    # obstacles in the path of the highway, which should stop it being extrapolated past them
+    contents = {(50 + x, 30 + y): 1 for x in range(-5, 5) for y in range(-5, 5)}
+    automaton = make_automaton(ants, contents, steps_per_iteration=20_000)
+    automaton.highway_check_interval = 1000
+    for _ in range(3):
+        automaton.iterate()
+    assert sum(skipped) > 10_000
+    assert automaton.steps == 60_000
+    assert_same(automaton, *reference(ants, 60_000, contents))
+
+
+def test_langtons_ant_grid_recentres(kernel):
+    ants = [((0, 0), "rl", 0)]
+    automaton = make_automaton(ants, steps_per_iteration=1000, max_grid_cells=64 * 64)
+    automaton.skip_highways = False
+    for _ in range(20):
+        automaton.iterate()
+    assert automaton.grid.size <= 64 * 64
+    assert_same(automaton, *reference(ants, 20_000))
+
+
+def test_langtons_ant_syncs_external_changes():
+    ants = [((0, 0), "rl", 0)]
+    automaton = make_automaton(ants, steps_per_iteration=100)
+    contents, [ant] = reference(ants, 0)
+    for ii in range(20):
+        automaton.iterate()
+        for _ in range(100):
+            ant.iterate(contents)
+        # e.g. Backend rewinding the history
+        automaton.contents[(ii, -ii)] = 1
+        contents[(ii, -ii)] = 1
+        automaton.contents.pop((1, 1), None)
+        contents.pop((1, 1), None)
+    assert_same(automaton, contents, [ant])
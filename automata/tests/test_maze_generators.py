@@ -0,0 +1,61 @@
+import numpy
+import pytest
+
+from automata.maze_solver import generators
+from automata.maze_solver.generators import GENERATORS, kruskal, random_fill, recursive_backtracker
+from automata.maze_solver.solver import UNREACHABLE, breadth_first_search, distance_map
+
+
+@pytest.fixture(params=["compiled", "python"])
+def kernel(request, monkeypatch):
+    if request.param == "python":
+        if generators.njit:
+            monkeypatch.setattr(generators, "njit", None)
+            for name in ["backtrack", "join_sets", "_root"]:
+                monkeypatch.setattr(generators, name, getattr(generators, name).py_func)
+    elif not generators.njit:
+        pytest.skip("numba not installed")
+
+
+@pytest.mark.parametrize("name", GENERATORS)
+@pytest.mark.parametrize("size", [(1, 1), (2, 3), (21, 21), (40, 31)])
+def test_generated_mazes_are_connected(kernel, name, size):
+    grid = GENERATORS[name](*size, seed=1)
+    assert grid.shape == size
+    assert grid[0, 0] and grid[-1, -1]
+    assert breadth_first_search(grid).solved
+    # every open cell can be reached from the start
+    assert ((distance_map(grid) != UNREACHABLE) == grid).all()
+
+
+@pytest.mark.parametrize("name", GENERATORS)
+def test_generators_are_seeded(kernel, name):
+    generate = GENERATORS[name]
+    assert (generate(31, 41, seed=5) == generate(31, 41, seed=5)).all()
+    assert (generate(31, 41, seed=5) != generate(31, 41, seed=6)).any()
+
+
+@pytest.mark.parametrize("generate", [recursive_backtracker, kruskal])
+def test_perfect_mazes_are_trees(kernel, generate):
+    grid = generate(31, 41, seed=2)
+    cells = grid[::2, ::2]
+    assert cells.all()
+    # a tree joining every cell has one fewer passage than it has cells
+    assert grid.sum() - cells.size == cells.size - 1
+
+
+def test_compiled_and_python_mazes_agree(monkeypatch):
+    if not generators.njit:
+        pytest.skip("numba not installed")
+    compiled = [recursive_backtracker(25, 25, seed=3), kruskal(25, 25, seed=3)]
+    for name in ["backtrack", "join_sets", "_root"]:
+        monkeypatch.setattr(generators, name, getattr(generators, name).py_func)
+    python = [recursive_backtracker(25, 25, seed=3), kruskal(25, 25, seed=3)]
+    for a, b in zip(compiled, python):
+        assert (a == b).all()
+
+
+def test_random_fill_density():
+    grid = random_fill(200, 200, density=0.2, seed=0)
+    assert 0.75 < grid.mean() < 0.85
+    assert not random_fill(20, 20, density=1, seed=0)[1:, 1:].all()
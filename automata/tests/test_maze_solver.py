@@ -0,0 +1,202 @@
+import time
+from types import SimpleNamespace
+
+import numpy
+import pygame.surfarray
+import pytest
+from pygame import Color, Surface
+
+from automata.maze_solver import solver
+from automata.maze_solver.objects import Maze
+from automata.maze_solver.solver import (
+    UNREACHABLE,
+    a_star,
+    breadth_first_search,
+    distance_map,
+    parse_maze,
+)
+from automata.maze_solver.test_mazes import MAZES
+
+
+@pytest.fixture(params=["compiled", "python"])
+def kernel(request, monkeypatch):
+    if request.param == "python":
+        if solver.njit:
+            monkeypatch.setattr(solver, "njit", None)
+            monkeypatch.setattr(solver, "bfs_kernel", solver.bfs_frontier)
+            monkeypatch.setattr(solver, "astar_kernel", solver.astar_kernel.py_func)
+            monkeypatch.setattr(solver, "trace_path", solver.trace_path.py_func)
+    elif not solver.njit:
+        pytest.skip("numba not installed")
+
+
+def make_game():
+    return SimpleNamespace(window_width=1000, window_height=500, screen_color=Color("white"))
+
+
+def serpentine(size: int) -> numpy.ndarray:
+    """A maze whose only path zig-zags along every other row"""
+    grid = numpy.zeros((size, size), dtype=bool)
+    grid[::2] = True
+    grid[1::4, -1] = True
+    grid[3::4, 0] = True
+    return grid
+
+
+def assert_valid_path(grid, path, start, goal):
+    assert tuple(path[0]) == start and tuple(path[-1]) == goal
+    assert grid[path[:, 0], path[:, 1]].all()
+    assert (numpy.abs(numpy.diff(path, axis=0)).sum(axis=1) == 1).all()
+
+
+@pytest.mark.parametrize("rows, solvable", MAZES)
+def test_solvers_on_mazes(kernel, rows, solvable):
+    grid = parse_maze("\n".join(rows))
+    bfs, astar = breadth_first_search(grid), a_star(grid)
+    assert bfs.solved == astar.solved == solvable
+    if solvable:
+        goal = (grid.shape[0] - 1, grid.shape[1] - 1)
+        assert_valid_path(grid, bfs.path, (0, 0), goal)
+        assert_valid_path(grid, astar.path, (0, 0), goal)
+        assert len(bfs.path) == len(astar.path)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_solvers_agree_on_random_grids(kernel, seed):
+    rng = numpy.random.default_rng(seed)
+    grid = rng.random((40, 60)) < 0.65
+    start, goal = (0, 0), (39, 59)
+    grid[start] = grid[goal] = True
+    distances = distance_map(grid, start)
+    bfs, astar = breadth_first_search(grid, start, goal), a_star(grid, start, goal)
+
+    assert bfs.solved == astar.solved == (distances[goal] != UNREACHABLE)
+    if bfs.solved:
+        assert len(bfs.path) == len(astar.path) == distances[goal] + 1
+        assert_valid_path(grid, bfs.path, start, goal)
+        assert_valid_path(grid, astar.path, start, goal)
+    # walls are unreachable, and every open cell's distance is one more than a neighbour's
+    assert (distances[~grid] == UNREACHABLE).all()
+    reached = numpy.argwhere(distances > 0)
+    padded = numpy.pad(distances, 1, constant_values=UNREACHABLE)
+    for row, col in reached.tolist():
+        neighbours = padded[[row, row + 2, row + 1, row + 1], [col + 1, col + 1, col, col + 2]]
+        assert distances[row, col] - 1 in neighbours
+
+
+def test_exploration_order(kernel):
+    grid = numpy.ones((5, 5), dtype=bool)
+    bfs = breadth_first_search(grid)
+    # one ring of equal distance per step
+    assert bfs.steps.tolist() == [1, 3, 6, 10, 15, 19, 22, 24, 25]
+    rings = numpy.split(bfs.explored, bfs.steps[:-1])
+    for distance, ring in enumerate(rings):
+        assert (ring.sum(axis=1) == distance).all()
+    # A* heads straight for the goal along the first row
+    astar = a_star(grid)
+    assert len(astar.explored) == len(astar.path) == 9
+
+
+def test_unsolvable(kernel):
+    grid = parse_maze("..W\nWWW\n...")
+    assert not breadth_first_search(grid).solved
+    assert not a_star(grid).solved
+    assert distance_map(grid).tolist() == [[0, 1, -1], [-1, -1, -1], [-1, -1, -1]]
+    walled_in = parse_maze("W.\n..")
+    assert not breadth_first_search(walled_in).solved
+    assert not a_star(walled_in).solved
+
+
+def test_parse_maze_pads_short_rows():
+    assert parse_maze("..\n.").tolist() == [[True, True], [True, False]]
+
+
+def test_large_maze_is_fast(kernel):
+    if not solver.njit:
+        pytest.skip("only fast when compiled")
+    grid = serpentine(999)
+    breadth_first_search(grid[:4, :4]), a_star(grid[:4, :4])  # compile
+    for solve in [breadth_first_search, a_star]:
+        start = time.perf_counter()
+        solution = solve(grid)
+        assert time.perf_counter() - start < 1
+        # every row but the last is walked end to end; the last is entered at the goal
+        assert len(solution.path) == 499 * 999 + 499 + 1
+
+
+@pytest.mark.parametrize("algorithm", ["bfs", "astar"])
+def test_maze_replays_solution(algorithm):
+    rows, _ = MAZES[0]
+    game = make_game()
+    maze = Maze("\n".join(rows), game=game, algorithm=algorithm)
+    updates = 0
+    while not maze.is_solved:
+        maze.update()
+        updates += 1
+    assert updates == len(maze.solution.steps)
+    explored = set(zip(*maze.explored.nonzero()))
+    assert explored == set(map(tuple, maze.solution.explored.tolist()))
+    assert maze.path == list(map(tuple, maze.solution.path.tolist()))
+    assert maze.can_find_path()
+
+
+@pytest.mark.parametrize("algorithm", ["dfs", "bfs"])
+def test_maze_only_redraws_changed_cells(algorithm, monkeypatch):
+    rows, _ = MAZES[0]
+    maze = Maze("\n".join(rows), game=make_game(), x=20, y=10, algorithm=algorithm)
+    surface = Surface((1000, 500))
+    redrawn = []
+    cell_rect = maze.cell_rect
+    monkeypatch.setattr(
+        maze, "cell_rect", lambda row, col: redrawn.append(1) or cell_rect(row, col)
+    )
+
+    maze.draw(surface)
+    assert len(redrawn) == len(maze.path)  # the rest is rendered in one go
+    redrawn.clear()
+    maze.draw(surface)
+    assert not redrawn
+
+    def num_explored():
+        return maze.explored.sum()
+
+    while not maze.is_solved:
+        old_path, explored = list(maze.path), num_explored()
+        maze.update()
+        maze.draw(surface)
+        # newly explored cells, plus cells joining or leaving the path
+        assert len(redrawn) <= num_explored() - explored + len(old_path) + len(maze.path)
+        redrawn.clear()
+
+    # the same as drawing everything from scratch
+    expected = maze.render()
+    for cell in maze.path:
+        expected.fill(Color("red"), cell_rect(*cell))
+    assert (pygame.surfarray.array2d(maze.image) == pygame.surfarray.array2d(expected)).all()
+    drawn = surface.subsurface((20, 10, *maze.image.get_size()))
+    assert (pygame.surfarray.array2d(drawn) == pygame.surfarray.array2d(expected)).all()
+
+
+@pytest.mark.parametrize("window_width", [1000, 32])  # cells with and without a gap
+def test_maze_render_matches_drawing_each_cell(window_width):
+    rows, _ = MAZES[0]
+    game = make_game()
+    game.window_width = window_width
+    maze = Maze("\n".join(rows), game=game, algorithm="bfs")
+    for _ in range(5):
+        maze.update()
+
+    expected = Surface(maze.render().get_size())
+    expected.fill(game.screen_color)
+    for cell in numpy.ndindex(maze.grid.shape):
+        expected.fill(maze.cell_color(cell), maze.cell_rect(*cell))
+    rendered = maze.render()
+    assert (pygame.surfarray.array2d(rendered) == pygame.surfarray.array2d(expected)).all()
+
+
+def test_large_maze_is_quick_to_set_up():
+    string = "\n".join(["." * 1001] * 1001)
+    start = time.perf_counter()
+    maze = Maze(string, game=make_game(), algorithm="bfs")
+    assert time.perf_counter() - start < 1
+    assert maze.explored.shape == (1001, 1001) and not maze.explored.any()
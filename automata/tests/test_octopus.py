@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import numpy
+import pytest
+from pygame import Surface
+
+from automata.advent_of_code.day11 import engine
+from automata.advent_of_code.day11.classes import OctopusBoard
+
+EXAMPLE = """5483143223
+2745854711
+5264556173
+6141336146
+6357385478
+4167524645
+2176841721
+6882881134
+4846848554
+5283751526"""
+
+
+def parse(text: str) -> numpy.ndarray:
+    return numpy.array([list(map(int, row)) for row in text.splitlines()])
+
+
+def reference_step(energy: list[list[int]], max_energy: int) -> int:
+    """Flash one octopus at a time, like the old object-based board"""
+    height, width = len(energy), len(energy[0])
+    ready = []
+    for y in range(height):
+        for x in range(width):
+            energy[y][x] += 1
+            if energy[y][x] > max_energy:
+                ready.append((x, y))
+    flashed = set(ready)
+    while ready:
+        x, y = ready.pop()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                if (dx or dy) and 0 <= nx < width and 0 <= ny < height:
+                    energy[ny][nx] += 1
+                    if energy[ny][nx] > max_energy and (nx, ny) not in flashed:
+                        flashed.add((nx, ny))
+                        ready.append((nx, ny))
+    for x, y in flashed:
+        energy[y][x] = 0
+    return len(flashed)
+
+
+def test_example():
+    energy, flashes = engine.simulate(parse(EXAMPLE), 100)
+    assert flashes[:10].sum() == 204
+    assert flashes.sum() == 1656
+    assert engine.first_synchronised_step(parse(EXAMPLE)) == 195
+
+
+@pytest.mark.parametrize("max_energy", [9, 12])
+def test_matches_reference(max_energy):
+    rng = numpy.random.default_rng(max_energy)
+    energy = rng.integers(0, max_energy + 1, (23, 31))
+    expected = energy.tolist()
+    for _ in range(50):
+        energy, flashed = engine.step(energy, max_energy)
+        assert flashed.sum() == reference_step(expected, max_energy)
+        assert energy.tolist() == expected
+
+
+def test_board_step_and_draw():
+    game = SimpleNamespace(window_width=1000, window_height=1000)
+    board = OctopusBoard(game, size=500)
+    assert board.scaling == 2
+    for _ in range(3):
+        flashed = board.step()
+        assert (board.energy[flashed] == 0).all()
+    assert len(board.flashes) == 3
+    assert board.energy.max() < board.energy_levels
+    surface = Surface((1000, 1000))
+    board.draw(surface)
+    x, y = 3, 7
+    expected = tuple(board.colours[board.energy[y, x]])
+    assert tuple(surface.get_at((x * 2, y * 2)))[:3] == expected
@@ -0,0 +1,105 @@
+import random
+import tracemalloc
+
+import numpy
+import pytest
+from pygame import Rect
+
+from automata.backend import Backend
+from automata.chunked_matrix import ChunkedMatrix
+from automata.game_of_life import patterns
+from automata.game_of_life.rules import RuleAutomaton
+from automata.packed_matrix import PackedMatrix
+
+
+def test_packed_matrix_behaves_like_dict():
+    random.seed(0)
+    matrix = PackedMatrix()
+    expected = dict()
+    for _ in range(5000):
+        coord = (random.randint(-20, 20), random.randint(-20, 20))
+        operation = random.random()
+        if operation < 0.5:
+            value = random.randint(1, 9)
+            matrix[coord] = value
+            expected[coord] = value
+        elif operation < 0.8:
+            assert matrix.pop(coord, None) == expected.pop(coord, None)
+        else:
+            assert matrix.get(coord) == expected.get(coord)
+            assert (coord in matrix) == (coord in expected)
+
+    assert len(matrix) == len(expected)
+    assert dict(matrix.items()) == expected
+    xs, ys = zip(*expected)
+    assert matrix.limits == ((min(xs), max(xs)), (min(ys), max(ys)))
+    with pytest.raises(KeyError):
+        matrix[(100, 100)]
+
+    copy = matrix.copy()
+    copy[(100, 100)] = 1
+    assert (100, 100) not in matrix
+    matrix.clear()
+    assert not matrix
+    assert matrix.limits == ((None, None), (None, None))
+
+
+def test_packed_matrix_arrays():
+    xy = numpy.array([[0, 0], [-5, 3], [2**20, -(2**20)], [0, 0]])
+    values = numpy.array([1, 2, 3, 4])
+    matrix = PackedMatrix.from_arrays(xy, values)
+    assert dict(matrix.items()) == {(0, 0): 4, (-5, 3): 2, (2**20, -(2**20)): 3}
+
+    matrix.update_arrays(numpy.array([[-5, 3], [7, 7]]), numpy.array([5, 6]))
+    assert matrix.lookup(numpy.array([[-5, 3], [7, 7], [1, 1]]), default=-1).tolist() == [5, 6, -1]
+    assert matrix.limits == ((-5, 2**20), (-(2**20), 7))
+
+    xy, values = matrix.to_arrays()
+    assert dict(zip(map(tuple, xy.tolist()), values.tolist())) == dict(matrix.items())
+
+
+def test_packed_matrix_matches_chunked_matrix():
+    random.seed(1)
+    contents = {(random.randint(-50, 50), random.randint(-50, 50)): 1 for _ in range(2000)}
+    packed = PackedMatrix(contents)
+    chunked = ChunkedMatrix(contents)
+    for rect in [Rect(-10, -10, 20, 20), Rect(0, 0, 1, 1), Rect(-1000, -1000, 2000, 2000)]:
+        assert packed.crop(rect) == chunked.crop(rect)
+    assert packed.stamps.keys() == chunked.stamps.keys()
+    assert packed.cells_in_chunks([(0, 0), (-1, 2)]) == chunked.cells_in_chunks([(0, 0), (-1, 2)])
+
+    stamps = packed.stamps.copy()
+    packed[(0, 0)] = 2
+    packed[(100, 100)] = 1
+    assert packed.dirty_chunks(stamps) == {(0, 0), (6, 6)}
+
+
+def test_packed_matrix_uses_less_memory():
+    rng = numpy.random.default_rng(0)
+    xy = rng.integers(-500, 500, size=(50_000, 2))
+    values = numpy.ones(len(xy), dtype=int)
+    sizes = []
+    for matrix_class in [ChunkedMatrix, PackedMatrix]:
+        tracemalloc.start()
+        matrix = matrix_class.from_arrays(xy, values)
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del matrix
+    chunked, packed = sizes
+    assert packed * 4 < chunked
+
+
+def test_packed_rule_automaton_history():
+    contents = patterns.load(patterns.R_PENTOMINO)
+    chunked = RuleAutomaton(contents=contents)
+    backend = Backend(RuleAutomaton(contents=contents, contents_class=PackedMatrix))
+    states = []
+    for _ in range(50):
+        states.append(dict(backend.automaton.contents.items()))
+        assert states[-1] == dict(chunked.contents)
+        backend.iterate()
+        chunked.iterate()
+    assert isinstance(backend.automaton.contents, PackedMatrix)
+
+    backend.rewind(20)
+    assert dict(backend.automaton.contents.items()) == states[30]
@@ -0,0 +1,74 @@
+import json
+import time
+
+from pygame import Color, Rect, Surface
+
+from automata.backend import Backend
+from automata.frontend import DrawRectFrontend, DrawRectMinimap
+from automata.game_of_life import patterns
+from automata.game_of_life.rules import RuleAutomaton
+from automata.profiler import Profiler
+from automata.viewer import Viewer
+
+
+def test_profiler_percentiles():
+    profiler = Profiler(window=100)
+    for duration in range(1, 201):
+        profiler.record("span", start=duration, duration=duration / 1000)
+    stats = profiler.percentiles("span")
+    # only the last 100 samples (101..200 ms) count
+    assert stats["p50"] == 150.5
+    assert 195 < stats["p95"] < stats["p99"] < 200
+    assert profiler.percentiles("missing") is None
+
+    with profiler.span("slow") as timer:
+        time.sleep(0.01)
+    assert timer.time >= 0.01
+    assert list(profiler.summary()) == ["span", "slow"]
+    assert profiler.report(prefix="sl").startswith("slow: p50 ")
+
+    profiler.enabled = False
+    with profiler.span("disabled"):
+        pass
+    assert "disabled" not in profiler.samples
+
+
+def test_profiler_covers_shared_backend(tmp_path):
+    profiler = Profiler(max_events=1000)
+    automaton = RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO))
+    backend = Backend(automaton, profiler=profiler)
+    colors = [Color("red"), Color("green")]
+    viewers = [
+        Viewer(Rect(0, 0, 100, 100), backend, DrawRectFrontend(colors), profiler=profiler),
+        Viewer(Rect(0, 0, 50, 50), backend, DrawRectMinimap(colors), profiler=profiler),
+        Viewer(Rect(0, 0, 50, 50), backend, DrawRectMinimap(colors), profiler=profiler),
+    ]
+    assert [viewer.name for viewer in viewers] == [
+        "DrawRectFrontend",
+        "DrawRectMinimap",
+        "DrawRectMinimap2",
+    ]
+
+    surface = Surface((200, 200))
+    for _ in range(10):
+        backend.update()
+        for viewer in viewers:
+            viewer.draw(surface)
+    names = set(profiler.samples)
+    assert {"RuleAutomaton.update", "RuleAutomaton.iterate", "RuleAutomaton.history"} <= names
+    for viewer in viewers:
+        assert {f"{viewer.name}.draw", f"{viewer.name}.blit"} <= names
+        assert len(profiler.samples[f"{viewer.name}.draw"]) == 10
+
+    path = tmp_path / "trace.json"
+    profiler.dump_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert len(events) == len(profiler.events)
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    # iterate is nested inside update
+    update, iterate = (
+        next(event for event in events if event["name"] == f"RuleAutomaton.{name}")
+        for name in ("update", "iterate")
+    )
+    assert update["ts"] <= iterate["ts"]
+    assert iterate["ts"] + iterate["dur"] <= update["ts"] + update["dur"]
@@ -0,0 +1,104 @@
+import random
+
+import numpy
+import pygame.surfarray
+import pytest
+from pygame import Color, Rect, Surface
+
+import automata.render_cache
+from automata.backend import Backend
+from automata.chunked_matrix import ChunkedMatrix
+from automata.frontend import BitmapFrontend, BitmapMinimap, DrawRectFrontend, DrawRectMinimap
+from automata.game_of_life import patterns
+from automata.game_of_life.rules import RuleAutomaton
+from automata.packed_matrix import PackedMatrix
+from automata.render_cache import RenderCache
+from automata.utils import arrays_to_cells
+from automata.viewer import Viewer
+from automata.viewport_handler import DefaultViewportHandler
+
+
+@pytest.mark.parametrize("matrix_class", [ChunkedMatrix, PackedMatrix])
+@pytest.mark.parametrize("build_arrays", [False, True])
+def test_render_cache_crop(matrix_class, build_arrays):
+    random.seed(0)
+    contents = {(random.randint(-50, 50), random.randint(-50, 50)): 1 for _ in range(2000)}
+    matrix = matrix_class(contents)
+    cache = RenderCache().get(matrix)
+    if build_arrays:
+        xy, values = cache.arrays
+        assert arrays_to_cells(xy, values) == contents
+
+    for rect in [Rect(-10, -10, 20, 20), Rect(0, 0, 1, 1), Rect(-3, 5, 40, 7), Rect(500, 0, 5, 5)]:
+        expected = {coord: value for coord, value in contents.items() if rect.collidepoint(coord)}
+        assert arrays_to_cells(*cache.crop(rect)) == expected
+        assert cache.crop(rect) is cache.crop(rect)  # remembered
+
+    chunks = [(0, 0), (-1, 2), (1, 1), (9, 9)]
+    expected = matrix.cells_in_chunks(chunks)
+    assert arrays_to_cells(*cache.cells_in_chunks(chunks)) == expected
+    assert cache.limits == matrix.limits
+
+    # a new contents object starts again
+    assert cache.get(matrix_class()).crop(Rect(0, 0, 10, 10))[0].shape == (0, 2)
+
+
+def test_render_cache_keeps_only_recent_crops():
+    cache = RenderCache().get(ChunkedMatrix({(x, 0): 1 for x in range(100)}))
+    first = cache.crop(Rect(0, 0, 10, 10))
+    # panning while paused: every frame has a new viewport rect
+    for x in range(50):
+        cache.crop(Rect(x, 0, 10, 10))
+        assert len(cache._crops) <= cache.max_crops
+    assert cache.crop(Rect(0, 0, 10, 10)) is not first
+    # the most recently used rects are kept
+    recent = [cache.crop(Rect(x, 0, 10, 10)) for x in range(cache.max_crops)]
+    assert cache.crop(Rect(0, 0, 10, 10)) is recent[0]
+
+
+def test_render_cache_shared_by_viewers(monkeypatch):
+    calls = []
+    original = automata.render_cache.cells_to_arrays
+    monkeypatch.setattr(
+        automata.render_cache, "cells_to_arrays", lambda *args: calls.append(1) or original(*args)
+    )
+    colors = [Color("red"), Color("green"), Color("blue")]
+    backend = Backend(RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO)))
+    zoomed_out = DefaultViewportHandler(x=0, y=0, width=400, height=400)
+    viewers = [
+        Viewer(Rect(0, 0, 100, 100), backend, DrawRectFrontend(colors), zoomed_out),
+        Viewer(Rect(0, 0, 50, 50), backend, DrawRectMinimap(colors, redraw_interval=1)),
+        Viewer(Rect(0, 0, 50, 50), backend, BitmapMinimap()),
+    ]
+    surface = Surface((200, 200))
+    for generation in range(1, 21):
+        backend.iterate()
+        for viewer in viewers:
+            viewer.draw(surface)
+        assert len(calls) == generation  # once per generation, not once per viewer
+
+
+@pytest.mark.parametrize(
+    "frontend_class", [DrawRectFrontend, DrawRectMinimap, BitmapFrontend, BitmapMinimap]
+)
+@pytest.mark.parametrize("viewport", [(-20, -20, 40, 40), (-500, -500, 1000, 1000)])
+def test_frontends_draw_the_same_with_shared_cache(frontend_class, viewport):
+    colors = [Color("red"), Color("green"), Color("blue")]
+    make = lambda: (
+        frontend_class() if "Bitmap" in frontend_class.__name__ else frontend_class(colors)
+    )
+    automaton = RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO))
+    for _ in range(50):
+        automaton.iterate()
+
+    cache = RenderCache()
+    cache.get(automaton.contents).arrays  # as if another frontend had already built them
+    with_cache, without_cache = Surface((100, 100)), Surface((100, 100))
+    make().draw(with_cache, automaton, viewport, cache=cache)
+    make().draw(without_cache, automaton, viewport)
+    with_cache, without_cache = map(pygame.surfarray.array3d, (with_cache, without_cache))
+    if frontend_class is DrawRectFrontend and viewport[2] < 100:
+        # cells are drawn one by one and neighbours can overlap by a pixel, so the colours at
+        # the edges depend on the order the cells come out in
+        with_cache, without_cache = with_cache.any(axis=2), without_cache.any(axis=2)
+    assert numpy.array_equal(with_cache, without_cache)
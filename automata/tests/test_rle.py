@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from automata.game_of_life import patterns
+from automata.game_of_life.rle import read_rle, load_rle, write_rle
+from automata.game_of_life.rules import CONWAY, Rule
+
+GLIDER_RLE = """\
+#N Glider
+#C A comment
+x = 3, y = 3, rule = B3/S23
+bob$2bo$
+3o!
+"""
+
+
+def test_read_rle():
+    xy, rule = read_rle(io.StringIO(GLIDER_RLE))
+    assert rule == CONWAY
+    assert load_rle(io.StringIO(GLIDER_RLE)) == patterns.load(patterns.GLIDER)
+    assert sorted(map(tuple, xy.tolist())) == sorted(patterns.load(patterns.GLIDER))
+
+    xy, rule = read_rle(io.StringIO("#P -5 10\nx = 4, y = 3\n4o2$o2bo!"))
+    assert rule is None
+    assert sorted(map(tuple, xy.tolist())) == [
+        (-5, 10),
+        (-5, 12),
+        (-4, 10),
+        (-3, 10),
+        (-2, 10),
+        (-2, 12),
+    ]
+
+    with pytest.raises(ValueError):
+        read_rle(io.StringIO("bob$2bo$3o!"))
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        patterns.load(patterns.R_PENTOMINO),
+        patterns.load(patterns.BLOCK, shift=(-100, 37)),
+        {(x, y): 1 for x in range(-300, 300, 7) for y in range(0, 50, 3)},
+        {},
+    ],
+)
+def test_write_rle_round_trip(contents, tmp_path):
+    path = tmp_path / "pattern.rle"
+    write_rle(path, contents, rule=Rule.from_string("B36/S23"), name="test")
+    assert all(len(line) <= 70 for line in path.read_text().splitlines())
+
+    xy, rule = read_rle(path)
+    assert str(rule) == "B36/S23"
+    assert sorted(map(tuple, xy.tolist())) == sorted(contents)
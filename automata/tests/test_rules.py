@@ -0,0 +1,104 @@
+import numpy
+import pytest
+
+from automata.cycles import Cycle, CycleDetector
+from automata.game_of_life import patterns
+from automata.game_of_life.automaton import GameOfLifeAutomaton
+from automata.game_of_life.rules import Rule, RuleAutomaton
+from automata.game_of_life.sweep import run_rule, sweep, threshold_rules
+from automata.utils import pack, unpack
+
+
+@pytest.mark.parametrize(
+    "string, birth, survival",
+    [
+        ("B3/S23", {3}, {2, 3}),
+        ("b36s23", {3, 6}, {2, 3}),
+        ("S23/B3", {3}, {2, 3}),
+        ("23/3", {3}, {2, 3}),
+        ("B2/S", {2}, set()),
+        ("B1357/S02468", {1, 3, 5, 7}, {0, 2, 4, 6, 8}),
+    ],
+)
+def test_rule_from_string(string, birth, survival):
+    rule = Rule.from_string(string)
+    assert rule.birth == birth
+    assert rule.survival == survival
+    assert Rule.from_string(str(rule)) == rule
+
+
+@pytest.mark.parametrize("string", ["", "B9/S23", "B3/S23/X", "life", "B0/S23"])
+def test_rule_from_string_invalid(string):
+    with pytest.raises(ValueError):
+        Rule.from_string(string)
+
+
+def test_rule_table():
+    table = Rule.from_string("B3/S23").table
+    assert table.shape == (9, 2)
+    counts, alive = table.nonzero()
+    assert list(zip(counts, alive)) == [(2, 1), (3, 0), (3, 1)]
+
+
+def test_pack_unpack():
+    xy = [[0, 0], [-1, 5], [7, -3], [-(2**31), 2**31 - 1], [2**30, -(2**31)]]
+    assert unpack(pack(xy)).tolist() == xy
+
+
+@pytest.mark.parametrize("thresholds", [(2, 3, 3), (3, 5, 3), (0, 4, 2), (1, 6, 3), (2, 4, 1)])
+def test_rule_automaton_matches_game_of_life_automaton(thresholds):
+    legacy = GameOfLifeAutomaton(patterns.load(patterns.R_PENTOMINO), *thresholds)
+    automaton = RuleAutomaton(
+        patterns.load(patterns.R_PENTOMINO), Rule.from_thresholds(*thresholds)
+    )
+    for _ in range(50):
+        legacy.iterate()
+        automaton.iterate()
+        assert automaton.contents == legacy.contents
+
+
+def test_rule_automaton_survival_with_no_neighbours():
+    automaton = RuleAutomaton({(0, 0): 1, (10, 10): 1}, rule="B/S0")
+    automaton.iterate()
+    assert automaton.contents == {(0, 0): 2, (10, 10): 2}
+
+
+@pytest.mark.parametrize(
+    "rule, pattern, classification, period",
+    [
+        ("B3/S23", numpy.ones((2, 2)), "static", 1),
+        ("B3/S23", patterns.SPINNER, "periodic", 2),
+        ("B3/S", patterns.SPINNER, "extinct", None),
+        ("B3/S23", patterns.GLIDER, "moving", 4),
+        ("B1/S012345678", patterns.SPINNER, "growing", None),
+    ],
+)
+def test_run_rule(rule, pattern, classification, period):
+    result = run_rule(rule, patterns.load(pattern), generations=40)
+    assert result.classification == classification
+    assert result.period == period
+    assert len(result.population) == result.generations + 1
+
+
+def test_run_rule_rejects_hash_collisions(monkeypatch):
+    """A matching hash is only a cycle if the cells really match"""
+    record_arrays = CycleDetector.record_arrays
+
+    def colliding_record_arrays(self, xy, values):
+        cycle = record_arrays(self, xy, values)
+        if self.generation == 3:  # pretend generation 3 hashed the same as generation 2
+            return Cycle(period=1, translation=(0, 0), start=2)
+        return cycle
+
+    monkeypatch.setattr(CycleDetector, "record_arrays", colliding_record_arrays)
+    result = run_rule("B3/S23", patterns.load(patterns.GLIDER), generations=40)
+    assert result.classification == "moving"
+    assert result.period == 4
+
+
+def test_sweep():
+    rules = threshold_rules()[:6]
+    contents = patterns.load(patterns.R_PENTOMINO)
+    results = list(sweep(rules, contents, generations=20, processes=2))
+    assert [result.rule for result in results] == [str(rule) for rule in rules]
+    assert results == [run_rule(rule, contents, 20) for rule in rules]
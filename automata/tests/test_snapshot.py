@@ -0,0 +1,89 @@
+import time
+
+import numpy
+import pytest
+
+from automata.backend import Backend
+from automata.chunked_matrix import ChunkedMatrix
+from automata.game_of_life import patterns
+from automata.game_of_life.rules import RuleAutomaton
+from automata.input_handler import KeyboardHandler
+from automata.langtons_ant.automaton import LangtonsAntAutomaton
+from automata.packed_matrix import PackedMatrix
+from automata.snapshot import save_snapshot, load_snapshot
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_snapshot_round_trip(mmap, tmp_path):
+    automaton = RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO), rule="B36/S23")
+    for _ in range(30):
+        automaton.iterate()
+    automaton.contents[(10**6, -(10**6))] = 1000  # needs bigger dtypes
+
+    path = tmp_path / "world.snapshot"
+    save_snapshot(path, automaton.contents, rule=str(automaton.rule), generation=30)
+    snapshot = load_snapshot(path, mmap=mmap)
+    assert snapshot.metadata == dict(rule="B36/S23", generation=30)
+    assert isinstance(snapshot.xy, numpy.memmap) == mmap
+
+    restored = RuleAutomaton(rule=snapshot.metadata["rule"])
+    restored.contents = snapshot.to_matrix(ChunkedMatrix)
+    assert restored.contents == automaton.contents
+    assert dict(snapshot.to_matrix(PackedMatrix).items()) == automaton.contents
+
+    restored.iterate()
+    automaton.iterate()
+    assert restored.contents == automaton.contents
+
+
+def test_snapshot_empty_and_invalid(tmp_path):
+    path = tmp_path / "empty.snapshot"
+    save_snapshot(path, {})
+    snapshot = load_snapshot(path)
+    assert snapshot.xy.shape == (0, 2)
+    assert not snapshot.to_matrix()
+
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        load_snapshot(path)
+
+
+def test_snapshot_is_fast(tmp_path):
+    rng = numpy.random.default_rng(0)
+    xy = numpy.unique(rng.integers(-1000, 1000, size=(1_000_000, 2)), axis=0)
+    contents = PackedMatrix.from_arrays(xy, rng.integers(1, 100, size=len(xy)))
+    path = tmp_path / "world.snapshot"
+
+    start = time.perf_counter()
+    save_snapshot(path, contents)
+    restored = load_snapshot(path).to_matrix(PackedMatrix)
+    assert time.perf_counter() - start < 2
+    assert len(restored) == len(contents)
+    assert path.stat().st_size < 6 * len(contents) + 1000
+
+
+def test_keyboard_handler_restores_rule(tmp_path):
+    handler = KeyboardHandler(snapshot_path=tmp_path / "saves" / "world.snapshot")
+    saved = Backend(RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO), rule="B36/S23"))
+    handler.save(saved)
+
+    backend = Backend(RuleAutomaton())
+    assert handler.load(backend)
+    assert str(backend.automaton.rule) == "B36/S23"
+    assert backend.automaton.table.tolist() == saved.automaton.table.tolist()
+    assert backend.automaton.contents == saved.automaton.contents
+
+
+def test_keyboard_handler_rejects_rule_for_automaton_without_rules(tmp_path):
+    handler = KeyboardHandler(snapshot_path=tmp_path / "world.snapshot")
+    handler.save(Backend(RuleAutomaton(contents=patterns.load(patterns.R_PENTOMINO))))
+
+    backend = Backend(LangtonsAntAutomaton())
+    assert not handler.load(backend)
+    assert dict(backend.automaton.contents) == {}
+
+
+def test_keyboard_handler_default_paths_are_absolute():
+    handler = KeyboardHandler()
+    assert handler.snapshot_path.is_absolute()
+    assert handler.trace_path.is_absolute()
@@ -0,0 +1,51 @@
+from itertools import chain
+
+import numpy
+from robingame.utils import SparseMatrix
+
+
+def cells_to_arrays(contents: SparseMatrix) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Convert {(x, y): value} to an (n, 2) array of xy coords and an (n,) array of values, so that
+    cells can be processed without a python loop.
+    """
+    if hasattr(contents, "to_arrays"):
+        return contents.to_arrays()  # e.g. PackedMatrix, which is already stored as arrays
+    num_cells = len(contents)
+    # flattening the keys is much faster than letting numpy unpack each tuple
+    xy = numpy.fromiter(chain.from_iterable(contents), dtype=numpy.int64, count=2 * num_cells)
+    xy = xy.reshape(num_cells, 2)
+    values = numpy.fromiter(contents.values(), dtype=numpy.int64, count=num_cells)
+    return xy, values
+
+
+def arrays_to_cells(xy: numpy.ndarray, values: numpy.ndarray) -> dict:
+    """Inverse of cells_to_arrays"""
+    return dict(zip(zip(xy[:, 0].tolist(), xy[:, 1].tolist()), values.tolist()))
+
+
+# Coordinates can be packed into a single int64 so that sets of cells can be sorted, searched
+# and compared as 1D arrays. x goes in the high 32 bits and y (offset to be positive) in the
+# low 32 bits, so packing is linear: pack(a + b) == pack(a) + pack(b) - Y_OFFSET, and sorting
+# the keys sorts by x then y.
+Y_OFFSET = 2**31
+X_STRIDE = 2**32
+
+
+def pack(xy: numpy.ndarray) -> numpy.ndarray:
+    """Pack an (n, 2) array of xy coords into an (n,) array of int64 keys"""
+    xy = numpy.asarray(xy, dtype=numpy.int64)
+    return xy[..., 0] * X_STRIDE + (xy[..., 1] + Y_OFFSET)
+
+
+def unpack(keys: numpy.ndarray) -> numpy.ndarray:
+    """Unpack an (n,) array of int64 keys into an (n, 2) array of xy coords"""
+    keys = numpy.asarray(keys, dtype=numpy.int64)
+    y = (keys & (X_STRIDE - 1)) - Y_OFFSET
+    x = (keys - (y + Y_OFFSET)) // X_STRIDE
+    return numpy.stack([x, y], axis=-1)
+
+
+def pack_offset(dx: int, dy: int) -> int:
+    """The amount to add to a packed key to move it by (dx, dy)"""
+    return dx * X_STRIDE + dy
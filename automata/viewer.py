@@ -6,7 +6,7 @@ from robingame.text.font import fonts
 from automata.backend import Backend
 from automata.input_handler import InputHandler
 from automata.frontend import Frontend
-from automata.timer import Timer
+from automata.profiler import Profiler, PROFILER
 from automata.viewport_handler import ViewportHandler, DefaultViewportHandler
 
 
@@ -16,6 +16,8 @@ class Viewer(Entity):
     The Backend does the iterating (multiple viewers can listen to the same Backend)
     The Frontend does the drawing
     The Controller handles user inputs / interaction with the automaton
+    The Profiler records draw / blit times as "<name>.draw" etc. (shared with the Backend by
+    default, so that the debug overlay and trace cover the whole scene)
 
     Based on the choice of backend/frontend/controller the user can compose various types of
     viewer -- e.g. a non-interactive minimap or a fully interactive main map.
@@ -45,6 +47,8 @@ class Viewer(Entity):
     controller: InputHandler  # handles user input
 
     rect: Rect  # to store own position
+    profiler: Profiler
+    name: str  # prefix for profiler spans
 
     def __init__(
         self,
@@ -53,8 +57,12 @@ class Viewer(Entity):
         frontend: Frontend,
         viewport_handler: ViewportHandler = None,
         controller: InputHandler = None,
+        profiler: Profiler = None,
+        name: str = None,
     ):
         super().__init__()
+        self.profiler = profiler or PROFILER
+        self.name = name or self.profiler.unique_name(type(frontend).__name__)
         self.rect = Rect(rect)
         self.image = Surface(self.rect.size)
         self.backend = backend
@@ -77,27 +85,32 @@ class Viewer(Entity):
             self.controller.update(viewport_handler=self.viewport_handler, backend=self.backend)
 
     def draw(self, surface: Surface, debug: bool = False):
-        with Timer() as draw_timer:
+        with self.profiler.span(f"{self.name}.draw", "viewer"):
             super().draw(surface, debug)
             self.frontend.draw(
                 surface=self.image,
                 automaton=self.backend.automaton,
                 viewport=self.viewport_handler.viewport,
                 debug=debug,
+                cache=self.backend.render_cache,
             )
             pygame.draw.rect(self.image, Color("white"), self.image.get_rect(), 1)
-        surface.blit(self.image, self.rect)
+        with self.profiler.span(f"{self.name}.blit", "viewer"):
+            surface.blit(self.image, self.rect)
         if debug:
             text = "\n".join(
                 [
                     f"tick: {self.tick}",  # more introspection could be a problem...
-                    f"draw time: {draw_timer.time:0.5f}",
-                    f"update time: {self.backend._update_time:0.5f}",
+                    # p50 / p95 / p99 of this viewer's and its backend's spans
+                    self.profiler.report(prefix=f"{self.name}."),
+                    self.profiler.report(prefix=f"{self.backend.name}."),
                     f"ticks_per_update: {self.backend.ticks_per_update}",
                     f"iterations_per_update: {self.backend.iterations_per_update}",
                     f"world size: {self.backend.automaton.contents.size}",
                     f"world limits: {self.backend.automaton.contents.limits}",
                     f"matrix len: {len(self.backend.automaton.contents)}",
+                    f"history: {len(self.backend.history)} generations",
+                    f"cycle: {self.backend.cycle}",
                 ]
             )
             fonts.cellphone_white.render(surface, text, x=self.rect.x, y=self.rect.y, scale=1.5)
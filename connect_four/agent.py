@@ -0,0 +1,35 @@
+from connect_four.solver import Solver, TranspositionTable
+from tic_tac_toe.agent import Agent
+from tic_tac_toe.team import Team
+
+
+class NegamaxAgent(Agent):
+    """Plays the best move found by the negamax solver within `time_budget` seconds a move. The
+    transposition table is kept between moves, so later searches reuse the earlier ones."""
+
+    time_budget: float
+
+    def __init__(self, team: Team, time_budget: float = 1.0, table_size: int = (1 << 20) + 7):
+        self.time_budget = time_budget
+        self.solver = Solver(TranspositionTable(table_size))
+        super().__init__(team)
+
+    def choose_move(self, state) -> int:
+        move, self.score, self.depth = self.solver.search(state, time_budget=self.time_budget)
+        return move
+
+
+class NegamaxCliAgent(NegamaxAgent):
+    def choose_move(self, state) -> int:
+        move = super().choose_move(state)
+        WINNING = "I will end you, puny human"
+        LOSING = "How is this possible! I never lose!"
+        DRAW = "You can never defeat me"
+        if self.score > 0:
+            message = WINNING
+        elif self.score < 0:
+            message = LOSING
+        else:
+            message = DRAW
+        print(f"AI: {message!r} (searched {self.depth} moves ahead)")
+        return move
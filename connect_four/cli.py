@@ -1,6 +1,7 @@
+from connect_four.agent import NegamaxCliAgent
 from connect_four.state import State
 from connect_four.team import TEAM_RED, TEAM_YELLOW
-from tic_tac_toe.agent import MinimaxCliAgent, HumanCliAgent
+from tic_tac_toe.agent import HumanCliAgent
 from tic_tac_toe.controller import CliController
 from tic_tac_toe.match import Match
 
@@ -8,7 +9,7 @@ from tic_tac_toe.match import Match
 def main():
     controller = CliController(
         agent_1=HumanCliAgent(team=TEAM_YELLOW),
-        agent_2=MinimaxCliAgent(team=TEAM_RED, depth=7),
+        agent_2=NegamaxCliAgent(team=TEAM_RED, time_budget=2),
         match=Match(initial_state=State.initial()),
     )
     controller.run_match()
@@ -0,0 +1,245 @@
+"""
+Alpha-beta negamax search for connect four, working directly on the State bitboards.
+
+Scores are from the point of view of the player to move: a win with the player's own k-th
+piece scores 22 - k, so quicker wins score higher; a loss scores the negative of the
+opponent's win, and a draw (or an unfinished search) scores 0.
+
+To keep the search small:
+- moves that hand the opponent an immediate win are never tried (see `non_losing_moves`), and
+  a player who can win at once does so
+- moves are tried centre first, then by how many threats they make, so that cutoffs come early
+- a fixed-size transposition table remembers each position's score and the depth it was
+  searched to, under the same key as the position's mirror image (see State.canonical), so
+  that a position and its mirror image are only searched once
+- iterative deepening searches one more move ahead at a time until the time budget runs out,
+  or the search reaches the end of the game and the score is exact
+"""
+
+import time
+
+from connect_four.constants import YELLOW
+from connect_four.state import BOARD_MASK, COLUMNS, State, bottom_mask, canonical_key
+
+WIDTH, HEIGHT = State.width, State.height
+NUM_CELLS = WIDTH * HEIGHT
+BOTTOM = sum(bottom_mask(column) for column in range(WIDTH))
+COLUMN_MASKS = tuple(((1 << HEIGHT) - 1) * bottom_mask(column) for column in range(WIDTH))
+CENTRE_FIRST = tuple(sorted(range(WIDTH), key=lambda column: abs(2 * column - WIDTH + 1)))
+
+EXACT, LOWER, UPPER = 0, 1, 2  # kinds of transposition table entry
+
+
+class OutOfTime(Exception):
+    pass
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results, keyed by State keys. Each key has one slot (its key
+    modulo the table size), and a new entry simply replaces whatever was there, so the table
+    never grows. The full key is kept to recognise collisions.
+    """
+
+    def __init__(self, size: int = (1 << 20) + 7):
+        self.size = size  # odd, so that keys that differ by a column's bit don't collide
+        self.clear()
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size
+
+    def get(self, key: int) -> tuple[int, int, int, int] | None:
+        """(depth, kind, score, best move) stored for `key`, or None"""
+        index = key % self.size
+        if self.keys[index] == key:
+            return self.entries[index]
+
+    def put(self, key: int, depth: int, kind: int, score: int, move: int):
+        index = key % self.size
+        self.keys[index] = key
+        self.entries[index] = (depth, kind, score, move)
+
+
+class Solver:
+    def __init__(self, table: TranspositionTable = None, symmetry: bool = True):
+        self.table = table or TranspositionTable()
+        self.symmetry = symmetry
+        self.nodes = 0
+        self.deadline = None
+
+    def search(
+        self, state: State, time_budget: float = None, max_depth: int = None
+    ) -> tuple[int, int, int]:
+        """
+        Iteratively deepen from `state` until the score is exact, `max_depth` moves ahead have
+        been searched, or `time_budget` seconds have passed. Returns the best move, its score,
+        and the depth of the last complete search (which equals the moves left in the game if
+        the score is exact).
+        """
+        if state.is_game_over:
+            raise ValueError("The game is over")
+        current, mask = _current(state), state.mask
+        remaining = NUM_CELLS - state.num_moves
+        max_depth = min(max_depth or remaining, remaining)
+        self.deadline = None if time_budget is None else time.perf_counter() + time_budget
+        self.nodes = 0
+        best = (next(c for c in CENTRE_FIRST if c in state.available_moves), 0, 0)
+        for depth in range(1, max_depth + 1):
+            try:
+                move, score = self.root(current, mask, depth)
+            except OutOfTime:
+                break
+            best = (move, score, depth)
+            if score:
+                # unfinished lines score 0, so a win or loss is forced, and there is no
+                # quicker win or slower loss to find by looking further ahead
+                break
+        return best
+
+    def solve(self, state: State) -> int:
+        """The exact score of `state` with perfect play from both sides"""
+        if state.is_game_over:
+            return -((NUM_CELLS + 2 - state.num_moves) // 2) if state.winner else 0
+        return self.search(state)[1]
+
+    def root(self, current: int, mask: int, depth: int) -> tuple[int, int]:
+        moves = mask.bit_count()
+        possible = (mask + BOTTOM) & BOARD_MASK
+        wins = winning_cells(current, mask) & possible
+        if wins:
+            return _column(wins & -wins), (NUM_CELLS + 1 - moves) // 2
+        candidates = non_losing_moves(current, mask)
+        if not candidates:
+            return _column(possible & -possible), -((NUM_CELLS - moves) // 2)
+        key, columns = self.key(current, mask)
+        entry = self.table.get(key)
+        previous = columns[entry[3]] if entry else None
+        alpha, beta = -NUM_CELLS, NUM_CELLS
+        best_move = None
+        for move in self.order(current, mask, candidates, previous):
+            score = -self.negamax(current ^ mask, mask | move, -beta, -alpha, depth - 1)
+            if best_move is None or score > alpha:
+                alpha, best_move = score, _column(move)
+        self.table.put(key, depth, EXACT, alpha, columns.index(best_move))
+        return best_move, alpha
+
+    def negamax(self, current: int, mask: int, alpha: int, beta: int, depth: int) -> int:
+        """
+        Score of the position where `current` holds the pieces of the player to move, assuming
+        they can't win at once (the caller checks). The score is exact if it lies strictly
+        between `alpha` and `beta`; otherwise it is only a bound on the side of the window it
+        falls.
+        """
+        self.nodes += 1
+        if self.deadline and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise OutOfTime
+        moves = mask.bit_count()
+        candidates = non_losing_moves(current, mask)
+        if not candidates:
+            return -((NUM_CELLS - moves) // 2)  # the opponent wins next move, whatever we do
+        if moves >= NUM_CELLS - 2:
+            return 0  # neither player can win with the last two pieces
+        if depth == 0:
+            return 0
+
+        # a bound on the score from how soon either player could win
+        lowest = -((NUM_CELLS - 2 - moves) // 2)
+        highest = (NUM_CELLS - 1 - moves) // 2
+        alpha, beta = max(alpha, lowest), min(beta, highest)
+        if alpha >= beta:
+            return alpha
+
+        key, columns = self.key(current, mask)
+        entry = self.table.get(key)
+        previous = None
+        if entry:
+            stored_depth, kind, score, previous = entry
+            previous = columns[previous]
+            if stored_depth >= min(depth, NUM_CELLS - moves):
+                if (
+                    kind == EXACT
+                    or (kind == LOWER and score >= beta)
+                    or (kind == UPPER and score <= alpha)
+                ):
+                    return score
+
+        original_alpha = alpha
+        best_score, best_move = -NUM_CELLS, None
+        for move in self.order(current, mask, candidates, previous):
+            score = -self.negamax(current ^ mask, mask | move, -beta, -alpha, depth - 1)
+            if score > best_score:
+                best_score, best_move = score, move
+            if score >= beta:
+                break
+            alpha = max(alpha, score)
+
+        if best_score <= original_alpha:
+            kind = UPPER
+        elif best_score >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        best_move = columns.index(_column(best_move))
+        self.table.put(key, min(depth, NUM_CELLS - moves), kind, best_score, best_move)
+        return best_score
+
+    def key(self, current: int, mask: int) -> tuple[int, tuple[int]]:
+        """Transposition table key, and the columns that its moves correspond to"""
+        if self.symmetry:
+            return canonical_key(current + mask)
+        return current + mask, COLUMNS
+
+    def order(self, current: int, mask: int, candidates: int, previous: int = None) -> list[int]:
+        """
+        Move bits of `candidates` in the order to try them: the best move from an earlier search
+        first, then by the number of cells where the move leaves the player one piece short of
+        four, centre columns first among equals.
+        """
+        moves = []
+        for column in CENTRE_FIRST:
+            move = candidates & COLUMN_MASKS[column]
+            if move:
+                threats = winning_cells(current | move, mask | move).bit_count()
+                moves.append((column == previous, threats, move))
+        moves.sort(key=lambda item: item[:2], reverse=True)  # stable, so centre first is kept
+        return [move for *_, move in moves]
+
+
+def winning_cells(position: int, mask: int) -> int:
+    """Empty cells that would complete four in a row for the pieces in `position`"""
+    # vertical: only the cell above three in a column
+    cells = (position << 1) & (position << 2) & (position << 3)
+    for shift in (HEIGHT + 1, HEIGHT, HEIGHT + 2):  # horizontal and the two diagonals
+        pair = (position << shift) & (position << 2 * shift)
+        cells |= pair & (position << 3 * shift)  # three on one side
+        cells |= pair & (position >> shift)  # two on one side, one on the other
+        pair = (position >> shift) & (position >> 2 * shift)
+        cells |= pair & (position << shift)
+        cells |= pair & (position >> 3 * shift)
+    return cells & (BOARD_MASK ^ mask)
+
+
+def non_losing_moves(current: int, mask: int) -> int:
+    """
+    Bits of the moves that don't let the opponent win next turn: if the opponent threatens to
+    win somewhere we can play, we must play there (and lose anyway if there are two such cells),
+    and we mustn't play right under a cell where the opponent would win.
+    """
+    possible = (mask + BOTTOM) & BOARD_MASK
+    opponent_wins = winning_cells(current ^ mask, mask)
+    forced = possible & opponent_wins
+    if forced:
+        if forced & (forced - 1):
+            return 0
+        possible = forced
+    return possible & ~(opponent_wins >> 1)
+
+
+def _current(state: State) -> int:
+    """Bitboard of the pieces of the player to move"""
+    return state.position if state.player_to_move == YELLOW else state.mask ^ state.position
+
+
+def _column(move: int) -> int:
+    return (move.bit_length() - 1) // (HEIGHT + 1)
@@ -2,31 +2,109 @@ from connect_four.team import TEAM_YELLOW, TEAM_RED
 from connect_four.constants import YELLOW, RED, EMPTY
 
 
-class State(str):
+class State:
     """
     Immutable class representing a state of connect-4.
-    Connect-4 has 7 columns of height 6. We represent each column as a 6-length string of either
-    empty / red / yellow values. The columns are joined by slashes.
-
-    For example, the empty "board" would be represented as:
+    Connect-4 has 7 columns of height 6. The board is stored as two bitboards (python ints):
+    `mask` has a bit set for every occupied cell, and `position` for every yellow piece (the red
+    pieces are `mask ^ position`). Each column takes `height + 1` bits, bottom cell first, and
+    the extra bit on top of each column is always empty, so that a shifted board never carries
+    pieces from the top of one column into the bottom of the next:
+
+        .  .  .  .  .  .  .     <- always empty
+        5 12 19 26 33 40 47
+        4 11 18 25 32 39 46
+        3 10 17 24 31 38 45
+        2  9 16 23 30 37 44
+        1  8 15 22 29 36 43
+        0  7 14 21 28 35 42
+
+    As a string, each column is a 6-length string of either empty / red / yellow values, bottom
+    first, and the columns are joined by slashes -- so the character at index i of the string is
+    bit i of the bitboards. For example, the empty "board" would be represented as:
     "....../....../....../....../....../....../......"
+
+    Any character other than yellow or empty in a string counts as a red piece.
+    States only compare equal to other States; compare `str(state)` with a string instead.
     """
 
     height = 6
     width = 7
 
-    def __init__(self, string):
+    def __init__(self, string: str):
+        self._string = string
+        self._set_bitboards(
+            position=_bitboard(string, lambda char: char == YELLOW),
+            mask=_bitboard(string, lambda char: char not in (EMPTY, "/")),
+        )
+
+    @classmethod
+    def from_bitboards(cls, position: int, mask: int) -> "State":
+        state = cls.__new__(cls)
+        state._string = None
+        state._set_bitboards(position, mask)
+        return state
+
+    def _set_bitboards(self, position: int, mask: int):
+        self.position = position
+        self.mask = mask
         self.player_to_move = player_to_move(self)
         self.available_moves = available_moves(self)
         self.is_game_over, self.winner = is_game_over(self)
 
     @classmethod
     def initial(cls):
-        return cls("/".join(["." * cls.height] * cls.width))
+        return cls.from_bitboards(0, 0)
+
+    @property
+    def key(self) -> int:
+        """
+        A unique integer for this position (while all the pieces have fallen to the bottom of
+        their columns), e.g. for transposition tables: adding `mask` to `position` sets the bit
+        above each column's top piece, which marks the column's height.
+        """
+        return self.position + self.mask
+
+    def canonical(self) -> tuple[int, tuple[int]]:
+        """
+        The same key for this position and its mirror image, for search caches: the smaller of
+        the two keys. Also returns the columns that the canonical position's moves correspond to
+        on this board: `columns[canonical_move]`.
+        """
+        return canonical_key(self.key)
+
+    @property
+    def num_moves(self) -> int:
+        return self.mask.bit_count()
+
+    def __str__(self):
+        if self._string is None:
+            self._string = "/".join(
+                "".join(self._cell(column * (self.height + 1) + row) for row in range(self.height))
+                for column in range(self.width)
+            )
+        return self._string
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({str(self)!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, State):
+            return self.position == other.position and self.mask == other.mask
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def _cell(self, index: int) -> str:
+        bit = 1 << index
+        if not self.mask & bit:
+            return EMPTY
+        return YELLOW if self.position & bit else RED
 
     def to_string(self):
         return "\n".join(
-            " ".join(column[row] for column in self.split("/"))
+            " ".join(column[row] for column in str(self).split("/"))
             for row in reversed(range(self.height))
         )
 
@@ -34,16 +112,69 @@ class State(str):
         print(self.to_string())
 
     def do_move(self, move: int):
-        columns = [[char for char in col if char != EMPTY] for col in self.split("/")]
-        columns[move].append(self.player_to_move)
-        new_string = "/".join("".join(col).ljust(State.height, ".") for col in columns)
-        return State(new_string)
+        """Drop a piece in column `move`: adding the column's bottom bit to `mask` carries up to
+        the column's first empty cell"""
+        if self.mask & top_mask(move):
+            raise ValueError(f"Column {move} is full")
+        mask = self.mask | (self.mask + bottom_mask(move))
+        position = (
+            self.position | (mask ^ self.mask) if self.player_to_move == YELLOW else self.position
+        )
+        return State.from_bitboards(position, mask)
+
+
+def bottom_mask(column: int) -> int:
+    return 1 << column * (State.height + 1)
+
+
+def top_mask(column: int) -> int:
+    return 1 << (State.height - 1) + column * (State.height + 1)
+
+
+BOARD_MASK = sum(((1 << State.height) - 1) * bottom_mask(column) for column in range(State.width))
+COLUMNS = tuple(range(State.width))
+MIRRORED_COLUMNS = COLUMNS[::-1]
+COLUMN_BITS = (1 << State.height + 1) - 1
+# bit shifts between neighbouring cells: vertical, horizontal, and the two diagonals
+DIRECTIONS = (1, State.height + 1, State.height, State.height + 2)
+
+
+def _bitboard(string: str, condition) -> int:
+    """Bitboard of the cells of `string` (in the State string format) whose character meets
+    `condition`"""
+    return sum(1 << index for index, char in enumerate(string) if condition(char))
+
+
+def mirror(board: int) -> int:
+    """`board` (or a key) with the columns in reverse order"""
+    mirrored = 0
+    for column in range(State.width):
+        mirrored = mirrored << State.height + 1 | board >> column * (State.height + 1) & COLUMN_BITS
+    return mirrored
+
+
+def canonical_key(key: int) -> tuple[int, tuple[int]]:
+    """See State.canonical"""
+    mirrored = mirror(key)
+    if mirrored < key:
+        return mirrored, MIRRORED_COLUMNS
+    return key, COLUMNS
+
+
+def four_in_a_row(board: int) -> bool:
+    """Whether `board` has four set bits in a line: each shift pairs every cell with its
+    neighbour in one direction, and a second shift pairs those pairs"""
+    for shift in DIRECTIONS:
+        pairs = board & (board >> shift)
+        if pairs & (pairs >> 2 * shift):
+            return True
+    return False
 
 
 def player_to_move(state: State) -> str | None:
     """Yellow goes first"""
-    reds = state.count(RED)
-    yellows = state.count(YELLOW)
+    yellows = state.position.bit_count()
+    reds = (state.mask ^ state.position).bit_count()
     if reds < yellows:
         return RED
     if yellows == reds:
@@ -52,8 +183,7 @@ def player_to_move(state: State) -> str | None:
 
 def available_moves(state: State) -> tuple[int]:
     """Players can put a piece in any of the columns that are not full"""
-    columns = state.split("/")
-    return tuple(index for index, column in enumerate(columns) if column[-1] == EMPTY)
+    return tuple(column for column in range(State.width) if not state.mask & top_mask(column))
 
 
 def get_diagonal_win_vectors():
@@ -94,11 +224,12 @@ WIN_VECTORS = (*get_row_win_vectors(), *get_diagonal_win_vectors())
 
 
 def is_game_over(state: State) -> (bool, int):
-    for vector in WIN_VECTORS:
-        values = "".join(state[i] for i in vector)
-        for team in TEAM_YELLOW, TEAM_RED:
-            if team.symbol * 4 in values:
-                return True, team.win_value
-    if EMPTY not in state:
+    for team, board in (
+        (TEAM_YELLOW, state.position),
+        (TEAM_RED, state.mask ^ state.position),
+    ):
+        if four_in_a_row(board):
+            return True, team.win_value
+    if state.mask == BOARD_MASK:
         return True, 0
     return False, 0
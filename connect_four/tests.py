@@ -1,19 +1,32 @@
+import random
+import time
+
 import pytest
 
+from connect_four.agent import NegamaxAgent
+from connect_four.solver import CENTRE_FIRST, NUM_CELLS, Solver, TranspositionTable
 from connect_four.state import (
+    COLUMNS,
+    EMPTY,
     State,
+    WIN_VECTORS,
     available_moves,
     get_diagonal_win_vectors,
     get_row_win_vectors,
     is_game_over,
+    mirror,
     YELLOW,
     RED,
 )
 from connect_four.team import TEAM_YELLOW, TEAM_RED
+from tic_tac_toe.agent import AlphaBeta, RandomAgent, preferred_order
+from tic_tac_toe.controller import HeadlessController
+from tic_tac_toe.match import Match
+from tic_tac_toe.mcts import MCTSAgent
 
 
 def test_state_initial():
-    assert State.initial() == "....../....../....../....../....../....../......"
+    assert str(State.initial()) == "....../....../....../....../....../....../......"
 
 
 def test_state_to_string():
@@ -222,13 +235,207 @@ def test_is_game_over(state, expected_result):
 def test_state_do_move():
     state = State.initial()
     state = state.do_move(0)
-    assert state == "x...../....../....../....../....../....../......"
+    assert str(state) == "x...../....../....../....../....../....../......"
     state = state.do_move(0)
-    assert state == "xo..../....../....../....../....../....../......"
+    assert str(state) == "xo..../....../....../....../....../....../......"
     state = state.do_move(0)
-    assert state == "xox.../....../....../....../....../....../......"
+    assert str(state) == "xox.../....../....../....../....../....../......"
     state = state.do_move(6)
-    assert state == "xox.../....../....../....../....../....../o....."
+    assert str(state) == "xox.../....../....../....../....../....../o....."
+
+
+def test_state_only_equals_states():
+    state = State.initial().do_move(3)
+    assert state == State(str(state))
+    assert state != str(state)
+    assert len({state, State(str(state)), str(state)}) == 2
+
+
+def reference_is_game_over(string: str) -> (bool, int):
+    """The old string scan over WIN_VECTORS, to check the bitboards against"""
+    for vector in WIN_VECTORS:
+        values = "".join(string[i] for i in vector)
+        for team in TEAM_YELLOW, TEAM_RED:
+            if team.symbol * 4 in values:
+                return True, team.win_value
+    if EMPTY not in string:
+        return True, 0
+    return False, 0
+
+
+def reference_do_move(string: str, move: int, player: str) -> str:
+    columns = [[char for char in col if char != EMPTY] for col in string.split("/")]
+    columns[move].append(player)
+    return "/".join("".join(col).ljust(State.height, EMPTY) for col in columns)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bitboards_match_string_rules(seed):
+    rng = random.Random(seed)
+    state, string, keys = State.initial(), str(State.initial()), set()
+    while not state.is_game_over:
+        assert str(state) == string and State(string) == state
+        assert hash(State(string)) == hash(state)
+        assert state.key not in keys
+        keys.add(state.key)
+        assert (state.is_game_over, state.winner) == reference_is_game_over(string)
+        move = rng.choice(state.available_moves)
+        string = reference_do_move(string, move, state.player_to_move)
+        state = state.do_move(move)
+    assert str(state) == string
+    assert (state.is_game_over, state.winner) == reference_is_game_over(string)
+
+
+def test_state_bitboards():
+    state = State.initial().do_move(3).do_move(3).do_move(4)
+    assert state.mask == 0b11 << 21 | 0b1 << 28
+    assert state.position == 0b01 << 21 | 0b1 << 28
+    assert state.num_moves == 3
+    assert State.from_bitboards(state.position, state.mask) == state
+    assert repr(state) == "State('....../....../....../xo..../x...../....../......')"
+
+
+def test_do_move_in_full_column():
+    state = State.initial()
+    for _ in range(State.height):
+        state = state.do_move(0)
+    assert state.available_moves == (1, 2, 3, 4, 5, 6)
+    with pytest.raises(ValueError):
+        state.do_move(0)
+
+
+def test_random_match():
+    controller = HeadlessController(
+        agent_1=RandomAgent(team=TEAM_YELLOW),
+        agent_2=RandomAgent(team=TEAM_RED),
+        match=Match(initial_state=State.initial()),
+    )
+    controller.run_match()
+    final = controller.match.current_state
+    assert final.is_game_over
+    assert (final.is_game_over, final.winner) == reference_is_game_over(str(final))
+
+
+def brute_force_score(state: State) -> int:
+    """Negamax score without any pruning, to check the solver against"""
+    if state.is_game_over:
+        return -((NUM_CELLS + 2 - state.num_moves) // 2) if state.winner else 0
+    return max(-brute_force_score(state.do_move(move)) for move in state.available_moves)
+
+
+def random_state(rng: random.Random, num_moves: int) -> State:
+    while True:
+        state = State.initial()
+        for _ in range(num_moves):
+            state = state.do_move(rng.choice(state.available_moves))
+            if state.is_game_over:
+                break
+        else:
+            return state
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_solver_endgames(seed):
+    state = random_state(random.Random(seed), 32)
+    expected = brute_force_score(state)
+    move, score, depth = Solver().search(state)
+    assert score == expected
+    assert -brute_force_score(state.do_move(move)) == expected
+    assert Solver().solve(state) == expected
+
+
+def test_solver_scores():
+    # yellow wins with its 4th piece
+    state = State("xxx.../ooo.../....../....../....../....../......")
+    assert Solver().search(state) == (0, 18, 1)
+    assert Solver().solve(state.do_move(0)) == -18
+    # red can only block one end of yellow's open three, and loses to yellow's 4th piece
+    state = State("o...../....../x...../x...../x...../....../o.....")
+    assert state.player_to_move == RED
+    assert Solver().search(state)[1] == -18
+
+
+def test_solver_blocks_vertical_four():
+    # from the todo below: red must block column 4
+    state = State("....../o...../o...../xox.../xxx.../xo..../o.....")
+    assert state.player_to_move == RED
+    assert NegamaxAgent(team=TEAM_RED, time_budget=0.5).choose_move(state) == 4
+
+
+def test_solver_time_budget():
+    solver = Solver()
+    start = time.perf_counter()
+    move, score, depth = solver.search(State.initial(), time_budget=0.2)
+    assert time.perf_counter() - start < 1
+    assert move == 3 and 0 < depth < NUM_CELLS
+
+
+def test_transposition_table_is_fixed_size():
+    table = TranspositionTable(size=11)
+    for key in range(100):
+        table.put(key, depth=1, kind=0, score=key, move=0)
+    assert len(table.keys) == len(table.entries) == 11
+    assert table.get(99) == (1, 0, 99, 0)
+    assert table.get(88) is None  # replaced by 99
+
+
+def test_negamax_agent_beats_random_agent():
+    random.seed(0)
+    controller = HeadlessController(
+        agent_1=RandomAgent(team=TEAM_YELLOW),
+        agent_2=NegamaxAgent(team=TEAM_RED, time_budget=0.05),
+        match=Match(initial_state=State.initial()),
+    )
+    controller.run_match()
+    assert controller.match.current_state.winner == TEAM_RED.win_value
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_generic_alpha_beta_on_connect_four(seed):
+    state = random_state(random.Random(seed), 30)
+    yellow_to_move = state.player_to_move == YELLOW
+    score = Solver().solve(state)
+    outcome = (score > 0) - (score < 0)
+    search = AlphaBeta(order_moves=preferred_order(CENTRE_FIRST))
+    result = search.minimax(state, depth=NUM_CELLS, team=yellow_to_move)
+    assert result == (outcome if yellow_to_move else -outcome)
+
+
+def test_canonical_mirror():
+    state = State.initial().do_move(0).do_move(1).do_move(1).do_move(5)
+    mirrored = State.initial().do_move(6).do_move(5).do_move(5).do_move(1)
+    assert mirror(mirror(state.key)) == state.key
+    assert mirror(state.key) == mirrored.key
+    assert mirror(state.position) == mirrored.position
+    key, columns = state.canonical()
+    other_key, other_columns = mirrored.canonical()
+    assert key == other_key == min(state.key, mirrored.key)
+    assert {columns, other_columns} == {COLUMNS, COLUMNS[::-1]}
+    # symmetric positions are their own canonical form
+    assert State.initial().do_move(3).canonical() == (State.initial().do_move(3).key, COLUMNS)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_solver_with_and_without_symmetry(seed):
+    state = random_state(random.Random(seed), 28)
+    assert Solver(symmetry=True).search(state) == Solver(symmetry=False).search(state)
+
+
+def test_mcts_agent_plays_connect_four():
+    # yellow wins in column 0, or must block red in column 1
+    state = State("xxx.../ooo.../....../....../....../....../......")
+    assert MCTSAgent(team=TEAM_YELLOW, iterations=500, seed=0).choose_move(state) == 0
+    state = State("xx..../ooo.../x...../....../....../....../......")
+    assert MCTSAgent(team=TEAM_YELLOW, iterations=500, seed=0).choose_move(state) == 1
+
+    controller = HeadlessController(
+        agent_1=RandomAgent(team=TEAM_YELLOW),
+        agent_2=MCTSAgent(team=TEAM_RED, iterations=300, seed=0),
+        match=Match(initial_state=State.initial()),
+    )
+    random.seed(0)
+    controller.run_match()
+    assert controller.match.current_state.winner == TEAM_RED.win_value
 
 
 """
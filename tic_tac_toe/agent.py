@@ -1,7 +1,11 @@
 import random
+from collections import OrderedDict
+from dataclasses import dataclass
 from functools import lru_cache
 from math import inf
+from typing import Callable, Iterable, Sequence
 
+from . import database
 from .state import State
 from .team import Team
 
@@ -63,27 +67,185 @@ def evaluate_moves(state: State, depth: int, team: bool) -> dict[int:int]:
     return moves
 
 
+# kinds of cached score: exact, or only a lower / upper bound because the search was cut off
+EXACT, LOWER, UPPER = 0, 1, 2
+
+MoveOrdering = Callable[[State], Iterable[int]]
+
+
+def preferred_order(preference: Sequence[int]) -> MoveOrdering:
+    """Move ordering that tries moves in the order of `preference` (moves not in it go last).
+    For example, centre, then corners, then edges for tic-tac-toe."""
+    rank = {move: index for index, move in enumerate(preference)}
+
+    def order_moves(state: State) -> list[int]:
+        return sorted(state.available_moves, key=lambda move: rank.get(move, len(rank)))
+
+    return order_moves
+
+
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    cutoffs: int = 0
+    cache_lookups: int = 0
+    cache_hits: int = 0  # lookups whose cached score could be used without searching
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.cache_lookups if self.cache_lookups else 0.0
+
+
+class AlphaBeta:
+    """
+    Minimax with alpha-beta pruning, for any State with `available_moves`, `do_move`,
+    `is_game_over` and `winner` that is hashable. Like `minimax`, team True wins with positive
+    scores and team False with negative scores.
+
+    Scores are cached by state alone, in a least-recently-used cache of at most `cache_size`
+    states. Each entry records the depth it was searched to, so a deeper result can answer a
+    shallower search, and the best move found, which is tried first next time. The player to
+    move has to follow from the state, as it does in a normal game.
+
+    If the State has a `canonical()` method, returning a key shared by all the symmetric
+    versions of the state and the table from the canonical orientation's moves to this
+    state's, that key is cached instead, so that each position is only searched once in any
+    orientation (pass `symmetry=False` to turn this off).
+    """
+
+    def __init__(
+        self, order_moves: MoveOrdering = None, cache_size: int = 100_000, symmetry: bool = True
+    ):
+        self.order_moves = order_moves or (lambda state: state.available_moves)
+        self.cache_size = cache_size
+        self.symmetry = symmetry
+        self.cache = OrderedDict()
+        self.stats = SearchStats()
+
+    def clear(self):
+        self.cache.clear()
+        self.stats = SearchStats()
+
+    def minimax(
+        self, state: State, depth: int, team: bool, alpha: float = -inf, beta: float = inf
+    ) -> int:
+        """Score of `state` with `team` to move. The score is exact if it lies strictly between
+        `alpha` and `beta`; otherwise it is only a bound on the side of the window it falls."""
+        self.stats.nodes += 1
+        if state.is_game_over or depth == 0:
+            return state.winner
+
+        self.stats.cache_lookups += 1
+        key, moves = self.key(state)
+        best_move = None
+        if entry := self.cache.get(key):
+            self.cache.move_to_end(key)
+            cached_depth, kind, score, best_move = entry
+            if moves is not None and best_move is not None:
+                best_move = moves[best_move]
+            if cached_depth >= depth and (
+                kind == EXACT
+                or (kind == LOWER and score >= beta)
+                or (kind == UPPER and score <= alpha)
+            ):
+                self.stats.cache_hits += 1
+                return score
+
+        original_alpha, original_beta = alpha, beta
+        best_score = -inf if team else inf
+        for move in self._moves(state, best_move):
+            score = self.minimax(state.do_move(move), depth - 1, not team, alpha, beta)
+            if team and score > best_score or not team and score < best_score:
+                best_score, best_move = score, move
+            if team:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                self.stats.cutoffs += 1
+                break
+
+        if best_score <= original_alpha:
+            kind = UPPER
+        elif best_score >= original_beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        if moves is not None:
+            best_move = moves.index(best_move)
+        self.cache[key] = (depth, kind, best_score, best_move)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return best_score
+
+    def evaluate_moves(self, state: State, depth: int, team: bool) -> dict[int:int]:
+        """Like `evaluate_moves`: the exact score of every move, or {} if the game is over"""
+        moves = {}
+        if not state.is_game_over:
+            for move in self._moves(state):
+                moves[move] = self.minimax(state.do_move(move), depth - 1, not team)
+        return moves
+
+    def key(self, state: State) -> tuple:
+        """Cache key for `state`, and its moves table (None without symmetry)"""
+        if self.symmetry and hasattr(state, "canonical"):
+            return state.canonical()
+        return state, None
+
+    def _moves(self, state: State, first: int = None) -> list[int]:
+        moves = list(self.order_moves(state))
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+
 class MinimaxAgent(Agent):
+    """Plays one of the best moves found by alpha-beta search `depth` moves ahead. Each agent
+    has its own search cache, so agents don't grow a shared cache for the whole process.
+    Tic-tac-toe states are looked up in the perfect-play database instead (when `depth` reaches
+    the end of the game), so they need no search at all."""
+
     depth: int
 
-    def __init__(self, team: Team, depth=10):
+    def __init__(
+        self,
+        team: Team,
+        depth=10,
+        order_moves: MoveOrdering = None,
+        cache_size: int = 100_000,
+        use_database: bool = True,
+    ):
         self.depth = depth
+        self.search = AlphaBeta(order_moves=order_moves, cache_size=cache_size)
+        self.use_database = use_database
         super().__init__(team)
 
-    def choose_move(self, state: State) -> int:
-        moves = evaluate_moves(state=state, depth=self.depth, team=self.team.boolean)
+    def evaluate(self, state: State) -> tuple[int, list[int]]:
+        """The best score, and the moves that achieve it"""
+        if (
+            self.use_database
+            and isinstance(state, State)
+            and self.depth >= len(state.available_moves)
+            and (solved := database.lookup(state))
+            and solved[1]
+        ):
+            score, best_moves = solved
+            return score, list(best_moves)
+        moves = self.search.evaluate_moves(state=state, depth=self.depth, team=self.team.boolean)
         func = max if self.team.boolean else min
         best_outcome = func(moves.values())
-        best_moves = [k for k, v in moves.items() if v == best_outcome]
+        return best_outcome, [k for k, v in moves.items() if v == best_outcome]
+
+    def choose_move(self, state: State) -> int:
+        _, best_moves = self.evaluate(state)
         return random.choice(best_moves)
 
 
 class MinimaxCliAgent(MinimaxAgent):
     def choose_move(self, state: State) -> int:
-        moves = evaluate_moves(state=state, depth=self.depth, team=self.team.boolean)
-        func = max if self.team.boolean else min
-        best_outcome = func(moves.values())
-        best_moves = [k for k, v in moves.items() if v == best_outcome]
+        best_outcome, best_moves = self.evaluate(state)
         WINNING = "I will end you, puny human"
         LOSING = "How is this possible! I never lose!"
         DRAW = "You can never defeat me"
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 
 from tic_tac_toe.agent import Agent
 from .match import Match
@@ -55,3 +56,25 @@ class CliController(Controller):
         else:
             winner = "no-one"
         print(f"congratulations to {winner}!")
+
+
+@dataclass
+class HeadlessController(Controller):
+    """Runs a match without any output, e.g. for benchmarks and tests. Records how long each
+    agent took over each move in `move_times`, by team symbol."""
+
+    move_times: dict[str, list[float]] = field(default_factory=dict)
+
+    def run_turn(self):
+        player = self.match.player_to_move
+        agent = self.get_agent(player)
+        start = time.perf_counter()
+        move = agent.choose_move(self.match.current_state)
+        self.move_times.setdefault(player, []).append(time.perf_counter() - start)
+        self.match.do_move(move)
+
+    def display_turn(self):
+        pass
+
+    def handle_match_end(self):
+        pass
@@ -0,0 +1,109 @@
+"""
+Perfect-play database for tic-tac-toe.
+
+Every reachable state is solved once, and the result stored as one 16-bit entry in a table with
+a slot for every possible board, so that looking a state up is just working out its index:
+the board read as a base-3 number (empty = 0, O = 1, X = 2; square 0 is the lowest digit).
+Each entry holds:
+- bits 0-8: the moves that achieve the best score, one bit per square
+- bits 9-10: the score with perfect play (1 if O wins, -1 if X wins, 0 for a draw), plus 1
+- bit 11: set if the state can be reached in a game; unreachable boards are all zeros
+
+The table is saved zlib-compressed next to this module. Rebuild it after changing the rules:
+
+    python -m tic_tac_toe.database
+"""
+
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+from tic_tac_toe.constants import EMPTY, O, X
+from tic_tac_toe.state import State
+
+PATH = Path(__file__).parent / "perfect_play.bin"
+DIGITS = {EMPTY: 0, O: 1, X: 2}
+NUM_BOARDS = 3**9
+MOVES_MASK = (1 << 9) - 1
+SCORE_SHIFT = 9
+REACHABLE = 1 << 11
+
+
+def index(state: State) -> int:
+    result = 0
+    for char in reversed(state):
+        result = result * 3 + DIGITS[char]
+    return result
+
+
+def reachable_states() -> list[State]:
+    """Every state that can come up in a game, ending at the first win"""
+    states, frontier = {State.initial()}, [State.initial()]
+    while frontier:
+        state = frontier.pop()
+        for move in () if state.is_game_over else state.available_moves:
+            child = state.do_move(move)
+            if child not in states:
+                states.add(child)
+                frontier.append(child)
+    return sorted(states)
+
+
+def build() -> array:
+    """Solve every reachable state"""
+    from tic_tac_toe.agent import AlphaBeta
+
+    search = AlphaBeta()
+    table = array("H", bytes(2 * NUM_BOARDS))
+    for state in reachable_states():
+        team = state.player_to_move == O
+        if state.is_game_over:
+            score, best_moves = state.winner, ()
+        else:
+            moves = search.evaluate_moves(state, depth=len(state.available_moves), team=team)
+            score = (max if team else min)(moves.values())
+            best_moves = [move for move, value in moves.items() if value == score]
+        table[index(state)] = (
+            REACHABLE | (score + 1) << SCORE_SHIFT | sum(1 << m for m in best_moves)
+        )
+    return table
+
+
+def save(table: array, path: Path = PATH):
+    if sys.byteorder != "little":
+        table = array("H", table)
+        table.byteswap()
+    path.write_bytes(zlib.compress(table.tobytes(), 9))
+
+
+@lru_cache(maxsize=None)
+def load(path: Path = PATH) -> array:
+    """The saved table, read the first time it's needed (or built, if it hasn't been saved)"""
+    if not path.exists():
+        return build()
+    table = array("H", zlib.decompress(path.read_bytes()))
+    if sys.byteorder != "little":
+        table.byteswap()
+    return table
+
+
+def lookup(state: State) -> tuple[int, tuple[int]] | None:
+    """The perfect-play score of `state` and the moves that achieve it, or None if `state`
+    can't come up in a game"""
+    entry = load()[index(state)]
+    if not entry & REACHABLE:
+        return None
+    moves = tuple(move for move in range(9) if entry >> move & 1)
+    return (entry >> SCORE_SHIFT & 0b11) - 1, moves
+
+
+def main():
+    table = build()
+    save(table)
+    print(f"Saved {sum(1 for entry in table if entry & REACHABLE)} states to {PATH}")
+
+
+if __name__ == "__main__":
+    main()
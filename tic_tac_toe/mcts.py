@@ -0,0 +1,161 @@
+"""
+Monte Carlo tree search, for any State with `available_moves`, `do_move`, `is_game_over` and
+`winner` (so both tic-tac-toe and connect four).
+
+Each iteration walks down the tree picking the child with the best UCT score (its win rate
+plus a bonus for being little explored), adds one new child, plays random moves from it to the
+end of the game, and counts the result in every node on the way back up. The move played is
+the root's most visited child.
+
+With `workers` > 1 the search is root-parallel: each worker process grows its own tree from the
+current state with its own random seed, and their root children's visits are added up. Each
+tree is kept between moves: after the agent's move and the opponent's reply, the node for the
+new state becomes the root, along with everything already searched under it.
+"""
+
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import log, sqrt
+
+from .agent import Agent
+from .state import State
+from .team import Team
+
+
+class Node:
+    def __init__(self, state: State, team: bool, parent: "Node" = None, move: int = None):
+        self.state = state
+        self.team = team  # the team that moved into this state
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.untried = [] if state.is_game_over else list(state.available_moves)
+        self.visits = 0
+        self.wins = 0.0  # for `team`: 1 per win and 0.5 per draw
+
+    def select(self, exploration: float) -> "Node":
+        """The child with the best upper confidence bound (UCT)"""
+        log_visits = log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits
+            + exploration * sqrt(log_visits / child.visits),
+        )
+
+    def expand(self, rng: random.Random) -> "Node":
+        move = self.untried.pop(rng.randrange(len(self.untried)))
+        child = Node(self.state.do_move(move), team=not self.team, parent=self, move=move)
+        self.children.append(child)
+        return child
+
+    def find(self, state: State) -> "Node | None":
+        return next((child for child in self.children if child.state == state), None)
+
+
+def search(
+    root: Node,
+    iterations: int = None,
+    time_budget: float = None,
+    exploration: float = sqrt(2),
+    seed: int = None,
+) -> Node:
+    """Grow the tree under `root` for `iterations` iterations or `time_budget` seconds, whichever
+    runs out first. Returns `root`, so that it can be sent back from a worker process."""
+    rng = random.Random(seed)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    iteration = 0
+    while (iterations is None or iteration < iterations) and (
+        deadline is None or time.perf_counter() < deadline
+    ):
+        iteration += 1
+        node = root
+        while not node.untried and node.children:
+            node = node.select(exploration)
+        if node.untried:
+            node = node.expand(rng)
+        winner = rollout(node.state, rng)
+        while node is not None:
+            node.visits += 1
+            node.wins += 0.5 + 0.5 * (winner if node.team else -winner)
+            node = node.parent
+    return root
+
+
+def rollout(state: State, rng: random.Random) -> int:
+    """The winner at the end of a game of random moves from `state`"""
+    while not state.is_game_over:
+        state = state.do_move(rng.choice(state.available_moves))
+    return state.winner
+
+
+class MCTSAgent(Agent):
+    """
+    Plays the most visited move after `iterations` iterations or `time_budget` seconds of Monte
+    Carlo tree search (whichever runs out first; each worker gets the full budget). Call
+    `close` to shut down the worker processes.
+    """
+
+    def __init__(
+        self,
+        team: Team,
+        iterations: int = 1000,
+        time_budget: float = None,
+        workers: int = 1,
+        exploration: float = sqrt(2),
+        reuse_tree: bool = True,
+        seed: int = None,
+    ):
+        if iterations is None and time_budget is None:
+            raise ValueError("MCTSAgent needs an iteration or time budget")
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.workers = workers
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        # without a seed, draw from the `random` module, so that seeding it seeds the agent
+        self.rng = random if seed is None else random.Random(seed)
+        self.roots = [None] * workers
+        self.visits = {}
+        self.pool = None
+        super().__init__(team)
+
+    def choose_move(self, state: State) -> int:
+        roots = [self.reuse_root(root, state) for root in self.roots]
+        seeds = [self.rng.getrandbits(64) for _ in roots]
+        args = (self.iterations, self.time_budget, self.exploration)
+        if self.workers == 1:
+            roots = [search(roots[0], *args, seeds[0])]
+        else:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+            futures = [
+                self.pool.submit(search, root, *args, seed) for root, seed in zip(roots, seeds)
+            ]
+            roots = [future.result() for future in futures]
+
+        self.visits = {}
+        for root in roots:
+            for child in root.children:
+                self.visits[child.move] = self.visits.get(child.move, 0) + child.visits
+        move = max(self.visits, key=self.visits.get)
+        # keep the subtree under the chosen move for next time
+        self.roots = [
+            next((child for child in root.children if child.move == move), None) for root in roots
+        ]
+        return move
+
+    def reuse_root(self, root: Node | None, state: State) -> Node:
+        """The node for `state` under the subtree kept from the last move, detached from the
+        rest of the tree, or a new node if it isn't there"""
+        if self.reuse_tree and root is not None:
+            node = root if root.state == state else root.find(state)
+            if node is not None:
+                node.parent = None
+                return node
+        return Node(state, team=not self.team.boolean)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
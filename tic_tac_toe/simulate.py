@@ -0,0 +1,180 @@
+"""
+Headless match simulator for benchmarking agents.
+
+Plays many matches between two agents in a pool of worker processes, with nothing printed along
+the way, and reports a JSON summary: agent 1's win / draw / loss rates, each agent's mean time
+per move, and games per second. Every game is seeded from `--seed`, so the same command plays
+the same games however they're shared out between workers. For example:
+
+    python -m tic_tac_toe.simulate --agent-1 mcts --agent-2 random --games 2000
+    python -m tic_tac_toe.simulate --game connect-four --agent-1 mcts --agent-2 negamax -n 100
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+from typing import Callable
+
+from tic_tac_toe.agent import Agent, MinimaxAgent, RandomAgent
+from tic_tac_toe.controller import HeadlessController
+from tic_tac_toe.match import Match
+from tic_tac_toe.mcts import MCTSAgent
+
+AgentFactory = Callable[[], Agent]
+
+
+def play_games(agent_1: AgentFactory, agent_2: AgentFactory, initial_state, seeds: list[int]):
+    """
+    Play one game per seed, seeding `random` with it first. The agents are made once, and kept
+    for all the games (as they would be by a player), and each game's result is a dict of:
+    - outcome: 1 if agent 1 won, 0 for a draw, or -1 if agent 2 won
+    - moves: the number of moves in the game
+    - agent_1 / agent_2: (total seconds spent choosing moves, number of moves)
+    """
+    agents = agent_1(), agent_2()
+    results = []
+    for seed in seeds:
+        random.seed(seed)
+        controller = HeadlessController(*agents, match=Match(initial_state))
+        controller.run_match()
+        winner = controller.match.current_state.winner
+        result = {
+            "outcome": winner * agents[0].team.win_value,
+            "moves": len(controller.match.history) - 1,
+        }
+        for name, agent in zip(["agent_1", "agent_2"], agents):
+            times = controller.move_times.get(agent.team.symbol, [])
+            result[name] = (sum(times), len(times))
+        results.append(result)
+    for agent in agents:
+        if hasattr(agent, "close"):
+            agent.close()
+    return results
+
+
+def simulate(
+    agent_1: AgentFactory,
+    agent_2: AgentFactory,
+    games: int = 1000,
+    initial_state=None,
+    workers: int = None,
+    seed: int = 0,
+    batch_size: int = None,
+) -> dict:
+    """
+    Play `games` games between the agents made by `agent_1` and `agent_2` (which must be
+    picklable, e.g. `functools.partial(RandomAgent, team=TEAM_O)`), sharing them out in batches
+    between `workers` processes (default: one per CPU; 1 plays them all in this process).
+    """
+    workers = workers or os.cpu_count()
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(games)]
+    batch_size = batch_size or max(1, -(-games // (4 * workers)))  # a few batches per worker
+    batches = [seeds[start : start + batch_size] for start in range(0, games, batch_size)]
+    play = partial(play_games, agent_1, agent_2, initial_state)
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(chain.from_iterable(map(play, batches)))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(chain.from_iterable(pool.map(play, batches)))
+    seconds = time.perf_counter() - start
+    return summarise(results, seconds)
+
+
+def summarise(results: list[dict], seconds: float) -> dict:
+    games = len(results)
+    outcomes = [result["outcome"] for result in results]
+    report = {
+        "games": games,
+        "seconds": seconds,
+        "games_per_second": games / seconds if seconds else None,
+        "mean_moves_per_game": sum(result["moves"] for result in results) / games,
+        "agent_1_win_rate": outcomes.count(1) / games,
+        "draw_rate": outcomes.count(0) / games,
+        "agent_1_loss_rate": outcomes.count(-1) / games,
+    }
+    for name in ["agent_1", "agent_2"]:
+        total_time = sum(result[name][0] for result in results)
+        moves = sum(result[name][1] for result in results)
+        report[f"{name}_moves"] = moves
+        report[f"{name}_mean_move_ms"] = 1000 * total_time / moves if moves else None
+    return report
+
+
+def games() -> dict:
+    """(initial state, team of the player who moves first, the other team) for each game"""
+    from connect_four.state import State as ConnectFourState
+    from connect_four.team import TEAM_RED, TEAM_YELLOW
+    from tic_tac_toe.state import State
+    from tic_tac_toe.team import TEAM_O, TEAM_X
+
+    return {
+        "tic-tac-toe": (State.initial(), TEAM_O, TEAM_X),
+        "connect-four": (ConnectFourState.initial(), TEAM_YELLOW, TEAM_RED),
+    }
+
+
+def agent_factory(name: str, team, args: argparse.Namespace) -> AgentFactory:
+    if name == "random":
+        return partial(RandomAgent, team=team)
+    if name == "minimax":
+        return partial(MinimaxAgent, team=team, depth=args.depth)
+    if name == "mcts":
+        return partial(
+            MCTSAgent, team=team, iterations=args.iterations, time_budget=args.time_budget
+        )
+    if name == "negamax":
+        from connect_four.agent import NegamaxAgent
+
+        return partial(NegamaxAgent, team=team, time_budget=args.time_budget or 1.0)
+    raise ValueError(f"Unknown agent {name!r}")
+
+
+AGENTS = ["random", "minimax", "mcts", "negamax"]
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--game", choices=["tic-tac-toe", "connect-four"], default="tic-tac-toe")
+    parser.add_argument("--agent-1", choices=AGENTS, default="minimax", help="moves first")
+    parser.add_argument("--agent-2", choices=AGENTS, default="random")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="processes. Default: one per CPU")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=10, help="minimax search depth")
+    parser.add_argument("--iterations", type=int, default=1000, help="MCTS iterations per move")
+    parser.add_argument("--time-budget", type=float, help="seconds per move for MCTS / negamax")
+    parser.add_argument("-o", "--output", help="write the report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    initial_state, first, second = games()[args.game]
+    report = simulate(
+        agent_factory(args.agent_1, first, args),
+        agent_factory(args.agent_2, second, args),
+        games=args.games,
+        initial_state=initial_state,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    report["args"] = {key: value for key, value in vars(args).items() if key != "output"}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -46,6 +46,14 @@ class State(str):
     def is_empty(self):
         return self == EMPTY * 9
 
+    def canonical(self) -> tuple[str, tuple[int]]:
+        """
+        The same key for all 8 rotations and reflections of the board, for search caches: the
+        smallest of the transformed strings. Also returns the symmetry used, which maps a move
+        on the canonical board to the same move on this one: `symmetry[canonical_move]`.
+        """
+        return min(("".join(self[i] for i in symmetry), symmetry) for symmetry in SYMMETRIES)
+
 
 def player_to_move(state: State) -> str | None:
     os = state.count(O)
@@ -72,6 +80,26 @@ WIN_VECTORS = (
 )
 
 
+def _symmetry(rotations: int, reflect: bool) -> tuple[int]:
+    """Index permutation for a transformed board: square i of the new board is square
+    symmetry[i] of the old one"""
+    symmetry = [0] * 9
+    for index in range(9):
+        row, col = divmod(index, 3)
+        for _ in range(rotations):
+            row, col = col, 2 - row
+        if reflect:
+            col = 2 - col
+        symmetry[row * 3 + col] = index
+    return tuple(symmetry)
+
+
+# the rotations and reflections of the board, which all map WIN_VECTORS onto WIN_VECTORS
+SYMMETRIES = tuple(
+    _symmetry(rotations, reflect) for reflect in (False, True) for rotations in range(4)
+)
+
+
 def is_game_over(state: State) -> (bool, int):
     """
     is_over, winner = is_game_over(state)
@@ -1,8 +1,23 @@
+import json
+from functools import partial
+
 import pytest
+from . import database
 from .match import Match
-from .state import State, player_to_move, available_moves, is_game_over
-from .controller import CliController
-from .agent import RandomAgent, minimax, evaluate_moves, MinimaxCliAgent, MinimaxAgent
+from .mcts import MCTSAgent
+from .simulate import main as simulate_main, play_games, simulate
+from .state import SYMMETRIES, WIN_VECTORS, State, player_to_move, available_moves, is_game_over
+from .controller import CliController, HeadlessController
+from .agent import (
+    AlphaBeta,
+    RandomAgent,
+    SearchStats,
+    minimax,
+    evaluate_moves,
+    preferred_order,
+    MinimaxCliAgent,
+    MinimaxAgent,
+)
 
 from .constants import X, O
 from .team import TEAM_O, TEAM_X
@@ -315,3 +330,251 @@ def test_minimax(state_string, expected_score):
 def test_evaluate_moves(state_string, expected_score):
     state = State(state_string)
     assert evaluate_moves(state=state, depth=10, team=True) == expected_score
+
+
+CENTRE_FIRST = preferred_order((4, 0, 2, 6, 8, 1, 3, 5, 7))
+
+
+@pytest.mark.parametrize("order_moves", [None, CENTRE_FIRST])
+def test_alpha_beta_matches_minimax(order_moves):
+    search = AlphaBeta(order_moves=order_moves)
+    states = database.reachable_states()
+    assert len(states) == 5478
+    for state in states:
+        team = state.player_to_move == TEAM_O.symbol
+        assert search.minimax(state, depth=10, team=team) == minimax(state, depth=10, team=team)
+
+
+def test_alpha_beta_evaluate_moves():
+    search = AlphaBeta(order_moves=CENTRE_FIRST)
+    state = State("o.......x")
+    assert search.evaluate_moves(state, depth=10, team=True) == evaluate_moves(
+        state, depth=10, team=True
+    )
+    assert search.evaluate_moves(State("oox" "xoo" "xox"), depth=10, team=True) == {}
+
+
+def test_alpha_beta_stores_depth():
+    # O can set up two threats next move, but it takes 3 more moves to win
+    state = State("o.......x")
+    search = AlphaBeta()
+    assert search.minimax(state, depth=1, team=True) == 0
+    assert search.cache[search.key(state)[0]][0] == 1
+    assert search.minimax(state, depth=10, team=True) == 1
+    assert search.cache[search.key(state)[0]][0] == 10
+    # the deeper result answers shallower searches
+    search.stats = SearchStats()
+    assert search.minimax(state, depth=5, team=True) == 1
+    assert search.stats.nodes == search.stats.cache_hits == 1
+
+
+def test_alpha_beta_stats_and_bounded_cache():
+    search = AlphaBeta(cache_size=100)
+    search.evaluate_moves(State.initial(), depth=10, team=True)
+    assert len(search.cache) == 100
+    assert search.stats.nodes > search.stats.cache_lookups > search.stats.cache_hits > 0
+    assert search.stats.cutoffs > 0
+    assert 0 < search.stats.hit_rate < 1
+    # pruning and ordering visit fewer nodes than plain minimax
+    ordered = AlphaBeta(order_moves=CENTRE_FIRST)
+    ordered.evaluate_moves(State.initial(), depth=10, team=True)
+    assert ordered.stats.nodes < search.stats.nodes < 549946
+    search.clear()
+    assert not search.cache and search.stats.nodes == 0
+
+
+def test_alpha_beta_move_ordering():
+    ordered = []
+
+    def order_moves(state):
+        ordered.append(state)
+        return reversed(state.available_moves)
+
+    search = AlphaBeta(order_moves=order_moves)
+    moves = search.evaluate_moves(State("ox.o.x..."), depth=10, team=True)
+    assert list(moves) == [8, 7, 6, 4, 2]
+    assert ordered
+
+
+def test_symmetries():
+    assert len(set(SYMMETRIES)) == 8
+    assert SYMMETRIES[0] == tuple(range(9))
+    win_vectors = {frozenset(vector) for vector in WIN_VECTORS}
+    for symmetry in SYMMETRIES:
+        assert sorted(symmetry) == list(range(9))
+        assert {frozenset(symmetry[i] for i in vector) for vector in WIN_VECTORS} == win_vectors
+
+
+@pytest.mark.parametrize("state_string", ["o.......x", "ox.......", "o...x..xo", "oxo.x...."])
+def test_canonical(state_string):
+    state = State(state_string)
+    key, symmetry = state.canonical()
+    orientations = {State("".join(state[i] for i in other)) for other in SYMMETRIES}
+    assert all(other.canonical()[0] == key for other in orientations)
+    assert key == min(orientations)
+    # moves on the canonical board map back to the same moves on this one
+    canonical = State(key)
+    for move in canonical.available_moves:
+        assert (
+            state.do_move(symmetry[move]).canonical()[0] == canonical.do_move(move).canonical()[0]
+        )
+
+
+def test_alpha_beta_symmetry_shrinks_cache():
+    plain = AlphaBeta(symmetry=False)
+    plain.evaluate_moves(State.initial(), depth=10, team=True)
+    symmetric = AlphaBeta()
+    assert symmetric.evaluate_moves(State.initial(), depth=10, team=True) == plain.evaluate_moves(
+        State.initial(), depth=10, team=True
+    )
+    assert len(symmetric.cache) < len(plain.cache) / 4
+    assert symmetric.stats.nodes < plain.stats.nodes / 4
+
+
+def test_database_is_up_to_date():
+    database.load.cache_clear()
+    assert database.load() == database.build()
+
+
+def test_database_lookup():
+    for state in database.reachable_states():
+        team = state.player_to_move == TEAM_O.symbol
+        score, best_moves = database.lookup(state)
+        assert score == minimax(state, depth=10, team=team)
+        moves = evaluate_moves(state, depth=10, team=team)
+        assert set(best_moves) == {move for move, value in moves.items() if value == score}
+    assert database.lookup(State("xxx......")) is None
+    assert database.lookup(State("ooo.xx...")) == (1, ())
+    assert database.lookup(State.initial()) == (0, tuple(range(9)))
+    assert database.index(State.initial()) == 0
+    assert database.index(State("........x")) == 2 * 3**8
+
+
+def test_minimax_agent_uses_database():
+    state = State("o.......x")
+    agent = MinimaxAgent(team=TEAM_O)
+    assert agent.evaluate(state) == (1, [2, 6])
+    assert agent.search.stats.nodes == 0
+    searching = MinimaxAgent(team=TEAM_O, use_database=False)
+    assert searching.evaluate(state) == (1, [2, 6])
+    assert searching.search.stats.nodes > 0
+    # a shallower search can't use perfect play
+    assert MinimaxAgent(team=TEAM_O, depth=2).evaluate(state) == (0, [1, 2, 3, 4, 5, 6, 7])
+
+
+def play_headless(agent_1, agent_2, initial_state=None) -> State:
+    controller = HeadlessController(agent_1=agent_1, agent_2=agent_2, match=Match(initial_state))
+    controller.run_match()
+    return controller.match.current_state
+
+
+@pytest.mark.parametrize(
+    "state_string, team, expected_move",
+    [
+        ("oo.xx....", TEAM_O, 2),  # win
+        ("o..xx.o..", TEAM_O, 5),  # block
+        ("oo.x.....", TEAM_X, 2),  # block
+    ],
+)
+def test_mcts_agent_finds_tactics(state_string, team, expected_move):
+    agent = MCTSAgent(team=team, iterations=1000, seed=0)
+    assert agent.choose_move(State(state_string)) == expected_move
+    assert sum(agent.visits.values()) == 1000
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_mcts_agent_draws_with_minimax(seed):
+    final = play_headless(MCTSAgent(team=TEAM_O, iterations=2000, seed=seed), MinimaxAgent(TEAM_X))
+    assert final.winner == 0
+
+
+def test_mcts_agent_is_seeded():
+    moves = [
+        play_headless(
+            MCTSAgent(TEAM_O, iterations=50, seed=1), MCTSAgent(TEAM_X, iterations=50, seed=2)
+        )
+        for _ in range(2)
+    ]
+    assert moves[0] == moves[1]
+
+
+def test_mcts_agent_reuses_subtree():
+    agent = MCTSAgent(team=TEAM_O, iterations=500, seed=0)
+    move = agent.choose_move(State.initial())
+    state = State.initial().do_move(move)
+    reply = next(m for m in state.available_moves)
+    state = state.do_move(reply)
+    root = agent.reuse_root(agent.roots[0], state)
+    assert root.state == state and root.parent is None
+    assert root.visits > 0
+    visits = root.visits
+    agent.choose_move(state)
+    assert agent.roots[0].parent is root
+    assert sum(child.visits for child in root.children) == visits - 1 + 500
+    assert MCTSAgent(team=TEAM_O, reuse_tree=False).reuse_root(agent.roots[0], state).visits == 0
+
+
+def test_mcts_agent_root_parallel():
+    agent = MCTSAgent(team=TEAM_O, iterations=300, workers=2, seed=0)
+    try:
+        assert agent.choose_move(State("oo.xx....")) == 2
+        assert sum(agent.visits.values()) == 2 * 300
+        assert len(agent.roots) == 2 and all(root.move == 2 for root in agent.roots)
+        # the workers' trees come back, to be reused next move
+        state = State.initial().do_move(agent.choose_move(State.initial()))
+        state = state.do_move(state.available_moves[0])
+        assert all(agent.reuse_root(root, state).visits > 0 for root in agent.roots)
+        assert agent.choose_move(state) in state.available_moves
+        assert sum(agent.visits.values()) > 2 * 300
+    finally:
+        agent.close()
+    assert agent.pool is None
+
+
+def test_mcts_agent_needs_a_budget():
+    with pytest.raises(ValueError):
+        MCTSAgent(team=TEAM_O, iterations=None)
+
+
+def test_headless_controller_times_moves():
+    controller = HeadlessController(
+        agent_1=RandomAgent(team=TEAM_O), agent_2=MinimaxAgent(team=TEAM_X), match=Match()
+    )
+    controller.run_match()
+    moves = len(controller.match.history) - 1
+    assert len(controller.move_times["o"]) == (moves + 1) // 2
+    assert len(controller.move_times["x"]) == moves // 2
+    assert all(seconds >= 0 for seconds in controller.move_times["o"] + controller.move_times["x"])
+
+
+def test_play_games():
+    results = play_games(
+        partial(MinimaxAgent, team=TEAM_O), partial(RandomAgent, team=TEAM_X), None, [1, 2, 3]
+    )
+    assert len(results) == 3
+    for result in results:
+        assert result["outcome"] in (0, 1)
+        assert result["agent_1"][1] + result["agent_2"][1] == result["moves"]
+
+
+def test_simulate_is_reproducible_across_workers():
+    agents = partial(MCTSAgent, team=TEAM_O, iterations=20), partial(RandomAgent, team=TEAM_X)
+    serial = simulate(*agents, games=40, workers=1, seed=3, batch_size=7)
+    parallel = simulate(*agents, games=40, workers=2, seed=3)
+    for report in serial, parallel:
+        assert report["games"] == 40
+        assert report["games_per_second"] > 0
+        assert report["agent_1_win_rate"] + report["draw_rate"] + report["agent_1_loss_rate"] == 1
+        assert report["agent_1_mean_move_ms"] > report["agent_2_mean_move_ms"] > 0
+    for key in ["agent_1_win_rate", "draw_rate", "mean_moves_per_game", "agent_1_moves"]:
+        assert serial[key] == parallel[key]
+    other_seed = simulate(*agents, games=40, workers=1, seed=4)
+    assert other_seed["agent_1_moves"] != serial["agent_1_moves"]
+
+
+def test_simulate_cli(tmp_path):
+    output = tmp_path / "report.json"
+    simulate_main(["-n", "50", "--workers", "2", "-o", str(output)])
+    report = json.loads(output.read_text())
+    assert report["games"] == 50 and report["agent_1_loss_rate"] == 0
+    assert report["args"]["agent_1"] == "minimax"